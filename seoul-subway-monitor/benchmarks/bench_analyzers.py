@@ -0,0 +1,168 @@
+"""
+[벤치마크] 분석 1~4 - 합성 위치 로그 규모별 실행 시간/최대 메모리
+
+synthetic.py 로 만든 위치 로그를 SharedFrame 에 올려 공통 정렬과 분석별 계산(compute_*)을 따로 측정합니다.
+- 시간: 같은 SharedFrame 으로 repeat 번 실행한 최솟값 (정렬은 처음 한 번만 만들어 재사용)
+- 메모리: tracemalloc 으로 단계별 최대 할당량을 따로 측정 (시간 측정과 섞이지 않도록 별도 실행)
+- --json 으로 결과를 저장하고, --baseline 으로 이전 결과와 비교해 느려진/커진 단계를 표시
+
+실행 예:
+    python benchmarks/bench_analyzers.py --days 1
+    python benchmarks/bench_analyzers.py --days 7 --json bench_7d.json
+    python benchmarks/bench_analyzers.py --days 7 --baseline bench_7d.json
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from frames import SharedFrame
+from analyzer1 import compute_interval_stats
+from analyzer2 import compute_dwell_stats
+from analyzer3 import compute_turnarounds
+from analyzer4 import compute_express_headways
+from synthetic import generate
+
+# 측정 단계 (이름, SharedFrame 을 받는 함수)
+STAGES = [
+    ("sort_by_train", lambda frame: frame.by_train),
+    ("sort_by_station", lambda frame: frame.by_station),
+    ("interval_stats", compute_interval_stats),
+    ("dwell_stats", compute_dwell_stats),
+    ("turnarounds", compute_turnarounds),
+    ("express_headways", compute_express_headways),
+]
+
+# 기준 결과 대비 이 배율을 넘으면 회귀로 표시
+REGRESSION_RATIO = 1.2
+
+def _reset_sorts(frame: SharedFrame):
+    """정렬 캐시(cached_property)를 지워 정렬 단계를 다시 측정할 수 있게 함"""
+    frame.__dict__.pop("by_train", None)
+    frame.__dict__.pop("by_station", None)
+
+def time_stages(df, repeat: int):
+    """
+    단계별 최소 실행 시간(초)과 결과 행 수를 측정합니다.
+    """
+    frame = SharedFrame(df, normalized=True)
+    results = {}
+    for name, func in STAGES:
+        best = float("inf")
+        rows = None
+        for _ in range(repeat):
+            if name.startswith("sort_"):
+                _reset_sorts(frame)
+            started = time.perf_counter()
+            out = func(frame)
+            best = min(best, time.perf_counter() - started)
+            rows = len(out)
+        # 뒤 단계가 정렬 비용 없이 측정되도록 정렬 결과를 채워 둠
+        frame.by_train, frame.by_station
+        results[name] = {"sec": round(best, 4), "rows": rows}
+    return results
+
+def measure_memory(df):
+    """
+    단계별 최대 추가 할당량(MB)을 측정합니다. (정렬 결과는 앞 단계에서 만든 것을 재사용)
+    """
+    frame = SharedFrame(df, normalized=True)
+    peaks = {}
+    tracemalloc.start()
+    try:
+        for name, func in STAGES:
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            func(frame)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks[name] = round((peak - base) / 1e6, 1)
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+def compare(current: dict, baseline: dict):
+    """
+    기준 결과 대비 단계별 시간/메모리 배율. REGRESSION_RATIO 를 넘는 단계 목록을 함께 반환합니다.
+    """
+    ratios, regressions = {}, []
+    for name, stage in current["stages"].items():
+        before = baseline.get("stages", {}).get(name)
+        if not before:
+            continue
+        sec_ratio = stage["sec"] / before["sec"] if before["sec"] else None
+        mem_ratio = stage["peak_mb"] / before["peak_mb"] if stage["peak_mb"] and before.get("peak_mb") else None
+        ratios[name] = (sec_ratio, mem_ratio)
+        if any(r is not None and r > REGRESSION_RATIO for r in (sec_ratio, mem_ratio)):
+            regressions.append(name)
+    return ratios, regressions
+
+def print_report(report: dict, ratios: dict = None):
+    print(f"\n{'단계':<18}{'시간(초)':>10}{'최대 메모리(MB)':>16}{'결과 행':>12}" + ("   기준 대비(시간/메모리)" if ratios else ""))
+    for name, stage in report["stages"].items():
+        peak = "-" if stage["peak_mb"] is None else f"{stage['peak_mb']:.1f}"
+        line = f"{name:<18}{stage['sec']:>10.3f}{peak:>16}{stage['rows']:>12,}"
+        if ratios and name in ratios:
+            line += "   " + " / ".join("-" if r is None else f"{r:.2f}x" for r in ratios[name])
+        print(line)
+    print(f"{'합계(분석)':<18}{report['analysis_sec']:>10.3f}")
+    print(f"-> 프로세스 최대 RSS {report['max_rss_mb']:.0f} MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="분석 1~4 벤치마크 (합성 데이터)")
+    parser.add_argument("--days", type=float, default=1.0, help="합성 데이터 기간(일), 1~30")
+    parser.add_argument("--lines", default="", help="호선 (쉼표 구분, 기본: 전체)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-memory", action="store_true", help="tracemalloc 메모리 측정은 건너뜀")
+    parser.add_argument("--json", default=None, help="결과를 저장할 JSON 경로")
+    parser.add_argument("--baseline", default=None, help="비교할 이전 결과 JSON 경로")
+    args = parser.parse_args()
+
+    lines = [l.strip() for l in args.lines.split(",") if l.strip()] or None
+    started = time.perf_counter()
+    df = generate(args.days, lines, seed=args.seed)
+    generate_sec = time.perf_counter() - started
+    print(f"-> 합성 데이터 {len(df):,}행, 열차 {df['train_number'].nunique():,}개, "
+          f"{df.memory_usage(deep=True).sum() / 1e6:.1f} MB (생성 {generate_sec:.1f}초)")
+
+    stages = time_stages(df, args.repeat)
+    peaks = {} if args.skip_memory else measure_memory(df)
+    for name, stage in stages.items():
+        stage["peak_mb"] = peaks.get(name)
+
+    report = {
+        "days": args.days,
+        "lines": lines or "all",
+        "seed": args.seed,
+        "rows": len(df),
+        "frame_mb": round(df.memory_usage(deep=True).sum() / 1e6, 1),
+        "generate_sec": round(generate_sec, 3),
+        "stages": stages,
+        "analysis_sec": round(sum(s["sec"] for s in stages.values()), 4),
+        # Linux 는 KB 단위
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+    ratios, regressions = None, []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("rows") != report["rows"]:
+            print(f"[주의] 기준 결과와 데이터 규모가 다릅니다. ({baseline.get('rows'):,}행 vs {report['rows']:,}행)")
+        ratios, regressions = compare(report, baseline)
+
+    print_report(report, ratios)
+    if regressions:
+        print(f"[회귀] 기준 대비 {REGRESSION_RATIO}배를 넘은 단계: {', '.join(regressions)}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"-> 저장: {args.json}")
+
+    sys.exit(1 if regressions else 0)
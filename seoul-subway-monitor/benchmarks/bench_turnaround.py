@@ -0,0 +1,117 @@
+"""
+[벤치마크] 회차 탐지(분석 3) - 열차별 반복문 vs 벡터화 구현 비교
+
+실행 예:
+    python benchmarks/bench_turnaround.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from frames import SharedFrame
+from analyzer3 import compute_turnarounds, MAX_TURNAROUND_SEC
+
+def make_frame(rows: int, trains: int = 500, leg_length: int = 40, seed: int = 0):
+    """
+    열차마다 leg_length 틱씩 같은 방향으로 달리다가 방향을 바꾸는 합성 데이터를 만듭니다.
+    """
+    rng = np.random.default_rng(seed)
+    ticks = rows // trains
+    train_idx = np.repeat(np.arange(trains), ticks)
+    tick = np.tile(np.arange(ticks), trains)
+    offset = rng.integers(0, leg_length, size=trains)[train_idx]
+    direction = ((tick + offset) // leg_length) % 2
+    position = (tick + offset) % leg_length
+    station = np.where(direction == 0, position, leg_length - 1 - position)
+
+    start = pd.Timestamp("2024-01-01 05:00", tz="UTC")
+    created_at = start + pd.to_timedelta(tick * 60 + rng.integers(0, 10, size=len(tick)), unit="s")
+
+    # 수집 순서처럼 시간순으로 섞어 둠 (정렬은 SharedFrame 이 담당)
+    df = pd.DataFrame({
+        "line_name": "2호선",
+        "train_number": pd.Series(train_idx).map("{:04d}".format),
+        "station_name": pd.Series(station).map("S{}".format),
+        "direction_type": direction.astype(str),
+        "created_at": created_at,
+    })
+    return df.sort_values("created_at", kind="stable").reset_index(drop=True)
+
+def compute_turnarounds_loop(frame: SharedFrame):
+    """
+    기존(열차별 groupby + iterrows) 구현. 비교용으로만 남겨 둠. (기준 시각은 벡터화 구현과 같은 event_time)
+    """
+    df = frame.by_train
+    analyzed_data = []
+    for train_no, train_df in df.groupby('train_number'):
+        train_df = train_df.copy()
+        train_df['prev_dir'] = train_df['direction_type'].shift(1)
+        turnaround_points = train_df[
+            (train_df['prev_dir'].notnull()) &
+            (train_df['direction_type'] != train_df['prev_dir'])
+        ]
+        for idx, row in turnaround_points.iterrows():
+            prev_logs = train_df.loc[:idx-1]
+            if prev_logs.empty:
+                continue
+            last_arrival = prev_logs.iloc[-1]
+            analyzed_data.append({
+                'line_name': row['line_name'],
+                'train_number': train_no,
+                'station_name': row['station_name'],
+                'prev_direction': last_arrival['direction_type'],
+                'new_direction': row['direction_type'],
+                'turnaround_time_sec': (row['event_time'] - last_arrival['event_time']).total_seconds(),
+                'detected_at': row['event_time']
+            })
+    result_df = pd.DataFrame(analyzed_data)
+    return result_df[result_df['turnaround_time_sec'] < MAX_TURNAROUND_SEC]
+
+def _normalized(result: pd.DataFrame):
+    # 범주형/코드 타입 차이는 비교하지 않도록 값만 남김
+    result = result.reset_index(drop=True)
+    return result.astype({c: object for c in result.columns if isinstance(result[c].dtype, pd.CategoricalDtype)})
+
+def results_match(loop_result: pd.DataFrame, vec_result: pd.DataFrame):
+    """두 구현의 회차 결과가 값 기준으로 같은지 (dtype 차이는 무시)"""
+    try:
+        pd.testing.assert_frame_equal(_normalized(loop_result), _normalized(vec_result),
+                                      check_dtype=False, check_categorical=False)
+    except AssertionError:
+        return False
+    return True
+
+def bench(func, frame, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(frame)
+        best = min(best, time.perf_counter() - started)
+    return result, best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="회차 탐지 벤치마크")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--trains", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-loop", action="store_true", help="기존 반복문 구현은 측정하지 않음")
+    args = parser.parse_args()
+
+    frame = SharedFrame(make_frame(args.rows, args.trains))
+    frame.by_train  # 정렬 비용은 두 구현 공통이므로 미리 만들어 둠
+    print(f"-> 합성 데이터 {len(frame.df):,}행, 열차 {args.trains}대")
+
+    vec_result, vec_sec = bench(compute_turnarounds, frame, args.repeat)
+    print(f"[벡터화] {vec_sec:.3f}초, 회차 {len(vec_result):,}건")
+
+    if not args.skip_loop:
+        loop_result, loop_sec = bench(compute_turnarounds_loop, frame, 1)
+        print(f"[반복문] {loop_sec:.3f}초, 회차 {len(loop_result):,}건")
+        same = results_match(loop_result, vec_result)
+        print(f"-> 속도 향상 {loop_sec / vec_sec:.1f}배, 결과 일치: {same}")
@@ -0,0 +1,295 @@
+"""
+[벤치마크용] 합성 열차 위치 로그 생성기
+
+data/stations.json 의 실제 역 순서를 따라 열차를 운행시켜, 변경분 저장으로 쌓이는 것과 같은 형태의
+위치 로그(DataLoader/normalize_frame 결과와 같은 컬럼/타입)를 만듭니다.
+- 시간대별 배차 간격(출퇴근 시간 단축, 심야 연장), 구간 운행 시간과 역별 정차 시간의 변동, 가끔의 지연
+- 종점 회차(같은 열차번호로 방향 전환), 2호선 순환, 1호선/5호선 분기 운행, 2호선 지선 셔틀
+- 9호선 급행(급행역만 정차, 더 빠른 운행으로 일반 열차 추월)
+
+실행 예:
+    python benchmarks/synthetic.py --days 1 --lines 2호선,9호선
+"""
+import argparse
+import json
+import os
+from collections import deque
+import numpy as np
+import pandas as pd
+
+STATIONS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "stations.json")
+
+# 운행 시간대 (KST, 시) 와 시간대별 배차 간격 배율
+SERVICE_START_HOUR = 5.5
+SERVICE_END_HOUR = 24.0
+PEAK_HOURS = ((7, 9), (18, 20))
+LATE_HOUR = 22
+LATE_HEADWAY_FACTOR = 1.5
+
+# 운행 속도(km/h, 가감속 포함 평균), 급행 배율, 정차 시간(초)
+AVG_SPEED_KMH = 33.0
+EXPRESS_SPEED_FACTOR = 1.25
+BASE_DWELL_SEC = 25.0
+PEAK_DWELL_FACTOR = 1.4
+# 진입 상태가 도착보다 먼저 보이는 시간(초), 종점 회차 대기 시간 범위(초)
+APPROACH_SEC = 15.0
+LAYOVER_SEC = (240, 600)
+# 구간마다 지연이 생길 확률과 평균 지연(초)
+INCIDENT_PROB = 0.002
+INCIDENT_MEAN_SEC = 180.0
+# DB 적재 시각(created_at)이 수신 시각보다 늦는 범위(초) - 폴링 주기 안에서 고르게
+INGEST_DELAY_SEC = (1.0, 30.0)
+
+# 상태 코드 (API trainSttus)
+APPROACH, ARRIVE, DEPART, PREV_DEPART = 0, 1, 2, 3
+
+def load_lines(path: str = STATIONS_PATH):
+    """stations.json 의 호선별 역 순서/분기/운행 계통"""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["lines"]
+
+def _line_graph(line: dict):
+    """
+    역 인접 그래프 {역명: {인접 역명: km}} 와 역명 → station_id 를 만듭니다. (분기/순환 포함)
+    """
+    adjacency = {}
+    station_ids = {}
+
+    def link(a, b, km):
+        adjacency.setdefault(a, {})[b] = km
+        adjacency.setdefault(b, {})[a] = km
+
+    for branch in line["branches"]:
+        stations = branch["stations"]
+        for i, name in enumerate(stations):
+            station_ids.setdefault(name, line["line_id"] * 1_000_000 + branch["first_code"] + i)
+            adjacency.setdefault(name, {})
+        chain = ([branch["from"]] if "from" in branch else []) + stations
+        if branch.get("loop"):
+            chain = chain + chain[:1]
+        km = branch["length_km"] / max(len(chain) - 1, 1)
+        for a, b in zip(chain, chain[1:]):
+            link(a, b, km)
+    return adjacency, station_ids
+
+def _shortest_path(adjacency: dict, start: str, end: str):
+    previous = {start: None}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        if node == end:
+            break
+        for nxt in adjacency[node]:
+            if nxt not in previous:
+                previous[nxt] = node
+                queue.append(nxt)
+    path = [end]
+    while previous[path[-1]] is not None:
+        path.append(previous[path[-1]])
+    return path[::-1]
+
+def _service_route(line: dict, adjacency: dict, service: dict):
+    """
+    운행 계통의 (정차역 목록, 구간 거리 km 배열, 방향 코드, 왕복 여부)
+    - 일반 계통: from → to 최단 경로, 하행(1)으로 출발해 종점에서 회차(상행 0)
+    - 순환 계통: 순환 구간을 from 부터 한 바퀴 (방향 0 은 목록 순서)
+    """
+    if service.get("loop"):
+        loop = next(b for b in line["branches"] if b.get("loop") and service["from"] in b["stations"])
+        stations = loop["stations"]
+        start = stations.index(service["from"])
+        path = stations[start:] + stations[:start]
+        if service["direction"] == 1:
+            path = path[:1] + path[1:][::-1]
+        path = path + path[:1]
+        direction, round_trip = service["direction"], False
+    else:
+        path = _shortest_path(adjacency, service["from"], service["to"])
+        direction, round_trip = 1, True
+
+    km = np.array([adjacency[a][b] for a, b in zip(path, path[1:])])
+    stops = np.ones(len(path), dtype=bool)
+    if service.get("express"):
+        express = set(line.get("express_stops", []))
+        stops = np.array([name in express for name in path])
+        stops[0] = stops[-1] = True
+    # 통과역은 앞 구간에 합쳐 정차역 사이 거리로 만듦
+    stop_idx = np.flatnonzero(stops)
+    cum_km = np.concatenate([[0.0], np.cumsum(km)])
+    return [path[i] for i in stop_idx], np.diff(cum_km[stop_idx]), direction, round_trip
+
+def _is_peak(hours: np.ndarray):
+    peak = np.zeros(len(hours), dtype=bool)
+    for start, end in PEAK_HOURS:
+        peak |= (hours >= start) & (hours < end)
+    return peak
+
+def _headway_sec(hours: np.ndarray, line: dict):
+    peak = _is_peak(hours)
+    headway = np.where(peak, line["peak_headway_min"], line["offpeak_headway_min"]) * 60.0
+    return np.where(hours >= LATE_HOUR, headway * LATE_HEADWAY_FACTOR, headway)
+
+def _departures(line: dict, day_start: pd.Timestamp, share: float):
+    """
+    운행 계통의 하루 출발 시각(epoch 초)과 시각별 첨두 여부
+    - 시간대별 호선 배차 간격을 share 로 나눈 간격으로 누적 (share 0.5 면 두 배 간격)
+    """
+    times = []
+    t = SERVICE_START_HOUR * 3600
+    while t < SERVICE_END_HOUR * 3600:
+        times.append(t)
+        t += float(_headway_sec(np.array([t / 3600]), line)[0]) / share
+    seconds = np.array(times)
+    return day_start.timestamp() + seconds, _is_peak(seconds / 3600)
+
+def _leg_events(rng, starts, peak, km, station_codes, dwell_factor, speed_factor):
+    """
+    여러 열차의 한 방향 운행(정차역 목록 순서)을 한꺼번에 계산합니다.
+
+    Returns:
+        (시각, 역 코드, 상태, 열차 인덱스) 배열과 각 열차의 종점 출발 시각
+    """
+    n, m = len(starts), len(km)
+    run = km / (AVG_SPEED_KMH * speed_factor) * 3600 * rng.lognormal(0.0, 0.08, size=(n, m))
+    dwell = BASE_DWELL_SEC * dwell_factor * rng.lognormal(0.0, 0.25, size=(n, m + 1))
+    dwell[peak] *= PEAK_DWELL_FACTOR
+    incidents = rng.random((n, m + 1)) < INCIDENT_PROB
+    dwell[incidents] += rng.exponential(INCIDENT_MEAN_SEC, size=incidents.sum())
+
+    arrive = starts[:, None] + np.concatenate(
+        [np.zeros((n, 1)), np.cumsum(dwell[:, :-1] + run, axis=1)], axis=1
+    )
+    depart = arrive + dwell
+    approach = arrive[:, 1:] - np.minimum(APPROACH_SEC, run * 0.3)
+
+    train = np.arange(n)
+    parts = [
+        (arrive, np.broadcast_to(station_codes, (n, m + 1)), ARRIVE),
+        (depart, np.broadcast_to(station_codes, (n, m + 1)), DEPART),
+        (approach, np.broadcast_to(station_codes[1:], (n, m)), APPROACH),
+        (depart[:, :-1], np.broadcast_to(station_codes[1:], (n, m)), PREV_DEPART),
+    ]
+    times = np.concatenate([p[0].ravel() for p in parts])
+    stations = np.concatenate([p[1].ravel() for p in parts])
+    status = np.concatenate([np.full(p[0].size, p[2], dtype=np.int8) for p in parts])
+    trains = np.concatenate([np.repeat(train, p[0].shape[1]) for p in parts])
+    return times, stations, status, trains, depart[:, -1]
+
+def generate(days: float = 1.0, lines: list = None, start: str = "2024-01-01", seed: int = 0):
+    """
+    합성 위치 로그를 만듭니다.
+
+    Args:
+        days (float): 생성할 기간(일)
+        lines (list): 호선명 목록 (기본: stations.json 의 전체 호선)
+        start (str): 시작 날짜 (KST)
+        seed (int): 난수 시드
+
+    Returns:
+        pd.DataFrame: created_at 순으로 정렬된 위치 로그 (normalize_frame 후와 같은 타입)
+    """
+    rng = np.random.default_rng(seed)
+    catalog = load_lines()
+    lines = lines or list(catalog.keys())
+    first_day = pd.Timestamp(start, tz="Asia/Seoul")
+    end_sec = (first_day + pd.Timedelta(days=days)).timestamp()
+
+    station_names, station_code = [], {}
+    train_code = {}
+    columns = {key: [] for key in ("line", "station", "station_id", "train", "direction",
+                                    "status", "express", "dest", "time")}
+
+    for line_idx, line_name in enumerate(lines):
+        line = catalog[line_name]
+        adjacency, station_ids = _line_graph(line)
+        for name in station_ids:
+            station_code.setdefault(name, len(station_code))
+        station_names = list(station_code.keys())
+        # 역마다 고정된 혼잡도(정차 시간 배율) - 일부 역이 지속적인 지연 구간이 되도록
+        dwell_factor = {name: f for name, f in zip(station_ids, rng.lognormal(0.0, 0.3, size=len(station_ids)))}
+        routes = [_service_route(line, adjacency, service) for service in line["services"]]
+
+        for day in range(int(np.ceil(days))):
+            day_start = first_day + pd.Timedelta(days=day)
+            # 열차번호: 호선 번호 + 그날의 출발 순번 (실제 API 처럼 날마다 다시 사용)
+            counter = 0
+            for s_idx, (stops, km, direction, round_trip) in enumerate(routes):
+                departures, peak = _departures(line, day_start, line["services"][s_idx]["share"])
+                numbers = [f"{line['line_id'] % 100}{counter + i:03d}" for i in range(len(departures))]
+                counter += len(departures)
+                for number in numbers:
+                    train_code.setdefault(number, len(train_code))
+                number_codes = np.array([train_code[n] for n in numbers])
+                express = bool(line["services"][s_idx].get("express"))
+                speed = EXPRESS_SPEED_FACTOR if express else 1.0
+                legs = [(stops, km, direction, departures + rng.uniform(-20, 20, size=len(departures)))]
+                while legs:
+                    leg_stops, leg_km, leg_direction, starts = legs.pop()
+                    codes = np.array([station_code[name] for name in leg_stops])
+                    factors = np.array([dwell_factor[name] for name in leg_stops])
+                    times, stations, status, trains, arrive_end = _leg_events(
+                        rng, starts, peak, leg_km, codes, factors, speed)
+                    ids = np.array([station_ids[name] for name in leg_stops])
+
+                    columns["line"].append(np.full(len(times), line_idx, dtype=np.int16))
+                    columns["station"].append(stations)
+                    columns["station_id"].append(_lookup(codes, ids, stations))
+                    columns["train"].append(number_codes[trains])
+                    columns["direction"].append(np.full(len(times), leg_direction, dtype=np.int8))
+                    columns["status"].append(status)
+                    columns["express"].append(np.full(len(times), 1 if express else 0, dtype=np.int8))
+                    columns["dest"].append(np.full(len(times), codes[-1]))
+                    columns["time"].append(times)
+
+                    if round_trip and leg_direction == direction:
+                        # 종점 회차: 같은 열차번호로 반대 방향 운행
+                        back_starts = arrive_end + rng.uniform(*LAYOVER_SEC, size=len(departures))
+                        legs.append((leg_stops[::-1], leg_km[::-1], 1 - direction, back_starts))
+
+    merged = {key: np.concatenate(values) for key, values in columns.items()}
+    keep = merged["time"] < end_sec
+    merged = {key: values[keep] for key, values in merged.items()}
+
+    event_time = merged["time"]
+    created_at = event_time + rng.uniform(*INGEST_DELAY_SEC, size=len(event_time))
+    order = np.argsort(created_at, kind="stable")
+
+    line_ids = np.array([catalog[name]["line_id"] for name in lines])
+    df = pd.DataFrame({
+        "id": np.arange(1, len(order) + 1),
+        "line_id": pd.array(line_ids[merged["line"][order]], dtype="Int16"),
+        "line_name": pd.Categorical.from_codes(merged["line"][order], categories=lines),
+        "station_id": pd.array(merged["station_id"][order], dtype="Int32"),
+        "station_name": pd.Categorical.from_codes(merged["station"][order], categories=station_names),
+        "train_number": pd.Categorical.from_codes(merged["train"][order], categories=list(train_code)),
+        "direction_type": merged["direction"][order],
+        "train_status": merged["status"][order],
+        "is_express": merged["express"][order],
+        "dest_station_name": pd.Categorical.from_codes(merged["dest"][order], categories=station_names),
+        "created_at": pd.to_datetime(created_at[order], unit="s", utc=True),
+        "event_time": pd.to_datetime(event_time[order].round(), unit="s", utc=True),
+    })
+    return df
+
+def _lookup(codes: np.ndarray, values: np.ndarray, keys: np.ndarray):
+    """keys(역 코드) 마다 codes 와 같은 위치의 values 를 찾습니다."""
+    order = np.argsort(codes)
+    return values[order][np.searchsorted(codes[order], keys)]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="합성 열차 위치 로그 생성")
+    parser.add_argument("--days", type=float, default=1.0, help="생성 기간(일)")
+    parser.add_argument("--lines", default="", help="호선 (쉼표 구분, 기본: 전체)")
+    parser.add_argument("--start", default="2024-01-01", help="시작 날짜 (KST)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="Parquet 로 저장할 경로 (없으면 요약만 출력)")
+    args = parser.parse_args()
+
+    lines = [l.strip() for l in args.lines.split(",") if l.strip()] or None
+    df = generate(args.days, lines, args.start, args.seed)
+    print(f"-> {len(df):,}행, 열차 {df['train_number'].nunique():,}개, "
+          f"{df.memory_usage(deep=True).sum() / 1e6:.1f} MB")
+    print(df.groupby('line_name', observed=True).size().to_string())
+    if args.out:
+        df.to_parquet(args.out, index=False)
+        print(f"-> 저장: {args.out}")
@@ -1,24 +1,263 @@
--- 테이블 생성: realtime_subway_positions
+-- =====================================================================
+-- 테이블 생성: realtime_subway_positions (일 단위 파티션)
+-- - 적재 시각(created_at) 기준 하루에 파티션 1개
+-- - 최근 구간 조회는 해당 날짜 파티션만 읽으므로 이력이 몇 달로 늘어나도 비용이 일정함
+-- - 보존 기간이 지난 파티션은 DROP 으로 한 번에 삭제 (DELETE/VACUUM 불필요)
+-- =====================================================================
 CREATE TABLE IF NOT EXISTS realtime_subway_positions (
-    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
-    line_id VARCHAR(50),             -- subwayId: 지하철 호선 ID
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY,
+    line_id SMALLINT,                -- subwayId: 지하철 호선 ID (예: 1002)
     line_name VARCHAR(50),           -- subwayNm: 지하철 호선명
-    station_id VARCHAR(50),          -- statnId: 지하철 역 ID
+    station_id INTEGER,              -- statnId: 지하철 역 ID (예: 1002000233)
     station_name VARCHAR(50),        -- statnNm: 지하철 역명
-    train_number VARCHAR(50),        -- trainNo: 열차 번호
+    train_number VARCHAR(10),        -- trainNo: 열차 번호 (앞자리 0 보존을 위해 문자열)
     last_rec_date VARCHAR(20),       -- lastRecptnDt: 최종 수신 날짜
     last_rec_time VARCHAR(20),       -- recptnDt: 최종 수신 시간
-    direction_type VARCHAR(10),      -- updnLine: 0:상행/내선, 1:하행/외선
-    dest_station_id VARCHAR(50),     -- statnTid: 종착역 ID
+    direction_type SMALLINT CHECK (direction_type IN (0, 1)),  -- updnLine: 0:상행/내선, 1:하행/외선
+    dest_station_id INTEGER,         -- statnTid: 종착역 ID
     dest_station_name VARCHAR(50),   -- statnTnm: 종착역명
-    train_status VARCHAR(10),        -- trainSttus: 0:진입, 1:도착, 2:출발, 3:전전역출발 등
-    is_express VARCHAR(10),          -- directAt: 1:급행, 0:아님, 7:특급
+    train_status SMALLINT CHECK (train_status BETWEEN 0 AND 99),  -- trainSttus: 0:진입, 1:도착, 2:출발, 3:전전역출발 등
+    is_express SMALLINT CHECK (is_express BETWEEN 0 AND 9),        -- directAt: 1:급행, 0:아님, 7:특급
     is_last_train BOOLEAN,           -- lstcarAt: 막차 여부 (Boolean 변환)
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT now() -- 데이터 적재 시간
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(), -- 데이터 적재 시간 (파티션 키)
+    event_time TIMESTAMP WITH TIME ZONE, -- recptnDt 를 KST 로 해석한 API 수신 시각 (분석 기준 시각)
+    PRIMARY KEY (id, created_at)     -- 파티션 테이블의 PK 는 파티션 키를 포함해야 함
+) PARTITION BY RANGE (created_at);
+
+-- 인덱스 생성 (파티션마다 자동 생성됨)
+-- 분석 접근 패턴: 호선/역/방향별 이벤트 시각 순 (배차 간격, 급행 간섭)
+CREATE INDEX IF NOT EXISTS idx_positions_line_station_dir_time
+    ON realtime_subway_positions(line_id, station_id, direction_type, event_time);
+-- 열차별 이벤트 시각 순 (체류 시간, 회차)
+CREATE INDEX IF NOT EXISTS idx_positions_train_time
+    ON realtime_subway_positions(train_number, event_time);
+-- DataLoader 페이지 조회 순서 (created_at, id)
+CREATE INDEX IF NOT EXISTS idx_positions_created_at
+    ON realtime_subway_positions(created_at, id);
+
+-- =====================================================================
+-- 파티션 관리
+-- =====================================================================
+
+-- 날짜 범위 [p_from, p_to] 의 일 파티션을 만듭니다. (이미 있으면 건너뜀)
+-- 파티션 경계는 KST 자정 기준 (서울 운행일과 맞춤)
+CREATE OR REPLACE FUNCTION create_position_partitions(p_from DATE, p_to DATE)
+RETURNS INTEGER LANGUAGE plpgsql AS $$
+DECLARE
+    d DATE := p_from;
+    part TEXT;
+    created INTEGER := 0;
+BEGIN
+    WHILE d <= p_to LOOP
+        part := 'realtime_subway_positions_' || to_char(d, 'YYYYMMDD');
+        IF to_regclass(part) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF realtime_subway_positions FOR VALUES FROM (%L) TO (%L)',
+                part,
+                (d::timestamp AT TIME ZONE 'Asia/Seoul'),
+                ((d + 1)::timestamp AT TIME ZONE 'Asia/Seoul'));
+            created := created + 1;
+        END IF;
+        d := d + 1;
+    END LOOP;
+    RETURN created;
+END;
+$$;
+
+-- 보존 기간(p_retention_days)이 지난 일 파티션을 삭제합니다.
+CREATE OR REPLACE FUNCTION drop_expired_position_partitions(p_retention_days INTEGER)
+RETURNS INTEGER LANGUAGE plpgsql AS $$
+DECLARE
+    cutoff DATE := (now() AT TIME ZONE 'Asia/Seoul')::date - p_retention_days;
+    part RECORD;
+    dropped INTEGER := 0;
+BEGIN
+    FOR part IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'realtime_subway_positions'::regclass
+          AND c.relname ~ '^realtime_subway_positions_[0-9]{8}$'
+    LOOP
+        IF to_date(right(part.relname, 8), 'YYYYMMDD') < cutoff THEN
+            EXECUTE format('DROP TABLE %I', part.relname);
+            dropped := dropped + 1;
+        END IF;
+    END LOOP;
+    RETURN dropped;
+END;
+$$;
+
+-- 주기 작업: 앞으로 p_days_ahead 일치 파티션을 미리 만들고, 오래된 파티션은 삭제
+CREATE OR REPLACE FUNCTION maintain_position_partitions(p_days_ahead INTEGER DEFAULT 3, p_retention_days INTEGER DEFAULT 30)
+RETURNS JSON LANGUAGE plpgsql AS $$
+DECLARE
+    today DATE := (now() AT TIME ZONE 'Asia/Seoul')::date;
+    created INTEGER;
+    dropped INTEGER;
+BEGIN
+    created := create_position_partitions(today - 1, today + p_days_ahead);
+    dropped := drop_expired_position_partitions(p_retention_days);
+    RETURN json_build_object('created', created, 'dropped', dropped);
+END;
+$$;
+
+-- 수집 시작 전에 오늘 파티션이 있어야 INSERT 가 실패하지 않음
+SELECT maintain_position_partitions();
+
+-- =====================================================================
+-- 시간별 롤업 (배차 간격 / 체류 시간)
+-- - 원본 로그 대신 이 테이블을 조회하면 장기 추세 분석이 원본 보존 기간과 무관해짐
+-- - 집계 기준 시각은 event_time (이전 데이터처럼 NULL 이면 created_at)
+-- =====================================================================
+CREATE TABLE IF NOT EXISTS headway_hourly (
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL,   -- 시간 구간 시작 (도착 시각 기준)
+    line_id SMALLINT NOT NULL,
+    station_id INTEGER NOT NULL,
+    direction_type SMALLINT NOT NULL,
+    line_name VARCHAR(50),
+    station_name VARCHAR(50),
+    arrivals INTEGER NOT NULL,                  -- 간격 계산에 쓰인 도착 건수
+    headway_mean_sec REAL,
+    headway_max_sec REAL,
+    headway_std_sec REAL,
+    PRIMARY KEY (bucket, line_id, station_id, direction_type)
 );
 
--- 인덱스 생성 (조회 성능 최적화)
-CREATE INDEX idx_line_id ON realtime_subway_positions(line_id);
-CREATE INDEX idx_station_id ON realtime_subway_positions(station_id);
-CREATE INDEX idx_train_number ON realtime_subway_positions(train_number);
-CREATE INDEX idx_created_at ON realtime_subway_positions(created_at);
+CREATE TABLE IF NOT EXISTS dwell_hourly (
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL,   -- 시간 구간 시작 (도착 시각 기준)
+    line_id SMALLINT NOT NULL,
+    station_id INTEGER NOT NULL,
+    direction_type SMALLINT NOT NULL,
+    line_name VARCHAR(50),
+    station_name VARCHAR(50),
+    visits INTEGER NOT NULL,                    -- 도착(1) → 출발(2) 이 관측된 방문 수
+    dwell_mean_sec REAL,
+    dwell_p50_sec REAL,
+    dwell_p90_sec REAL,
+    dwell_max_sec REAL,
+    PRIMARY KEY (bucket, line_id, station_id, direction_type)
+);
+
+-- [p_from, p_to) 구간의 시간별 롤업을 다시 계산합니다. (같은 구간을 여러 번 실행해도 결과 동일)
+-- 구간 앞뒤로 1시간씩 더 읽어 경계에 걸친 직전 도착/출발도 반영합니다.
+CREATE OR REPLACE FUNCTION refresh_hourly_rollups(p_from TIMESTAMPTZ, p_to TIMESTAMPTZ)
+RETURNS JSON LANGUAGE plpgsql AS $$
+DECLARE
+    headway_rows INTEGER;
+    dwell_rows INTEGER;
+BEGIN
+    p_from := date_trunc('hour', p_from);
+    p_to := date_trunc('hour', p_to);
+
+    -- 1. 배차 간격: 같은 역/방향의 직전 도착(1)과의 차이 (분석 1과 같은 정의)
+    -- 하트비트로 다시 기록된 도착 행을 새 도착으로 세지 않도록, 방문(열차/역/방향이 연속으로 같은 구간)마다 첫 도착만 사용
+    DELETE FROM headway_hourly WHERE bucket >= p_from AND bucket < p_to;
+    INSERT INTO headway_hourly
+    SELECT date_trunc('hour', t), line_id, station_id, direction_type,
+           max(line_name), max(station_name),
+           count(*),
+           avg(headway_sec), max(headway_sec), coalesce(stddev_samp(headway_sec), 0)
+    FROM (
+        SELECT line_id, station_id, direction_type, line_name, station_name, t,
+               extract(epoch FROM t - lag(t) OVER (PARTITION BY line_id, station_id, direction_type ORDER BY t)) AS headway_sec
+        FROM (
+            SELECT DISTINCT ON (train_number, visit_id) line_id, station_id, direction_type, line_name, station_name, t
+            FROM (
+                SELECT *, sum(new_visit) OVER (PARTITION BY train_number ORDER BY t, id) AS visit_id
+                FROM (
+                    SELECT id, train_number, line_id, station_id, station_name, direction_type, line_name, train_status,
+                           coalesce(event_time, created_at) AS t,
+                           CASE WHEN (station_name, direction_type) IS NOT DISTINCT FROM
+                                     lag((station_name, direction_type)) OVER (PARTITION BY train_number ORDER BY coalesce(event_time, created_at), id)
+                                THEN 0 ELSE 1 END AS new_visit
+                    FROM realtime_subway_positions
+                    WHERE created_at >= p_from - interval '1 hour' AND created_at < p_to + interval '1 hour'
+                      AND train_status IN (0, 1, 2)
+                ) tagged
+            ) numbered
+            WHERE train_status = 1
+            ORDER BY train_number, visit_id, t, id
+        ) arrivals
+    ) headways
+    WHERE headway_sec IS NOT NULL AND t >= p_from AND t < p_to
+      AND line_id IS NOT NULL AND station_id IS NOT NULL AND direction_type IS NOT NULL
+    GROUP BY 1, 2, 3, 4;
+    GET DIAGNOSTICS headway_rows = ROW_COUNT;
+
+    -- 2. 체류 시간: 방문(열차/역/방향이 연속으로 같은 구간) 안에서 도착(1) → 그 이후 첫 출발(2) (분석 2와 같은 정의)
+    DELETE FROM dwell_hourly WHERE bucket >= p_from AND bucket < p_to;
+    INSERT INTO dwell_hourly
+    SELECT date_trunc('hour', arrived_at), line_id, station_id, direction_type,
+           max(line_name), max(station_name),
+           count(*),
+           avg(dwell_sec),
+           percentile_cont(0.5) WITHIN GROUP (ORDER BY dwell_sec),
+           percentile_cont(0.9) WITHIN GROUP (ORDER BY dwell_sec),
+           max(dwell_sec)
+    FROM (
+        SELECT visit_id, train_number,
+               max(line_id) AS line_id, max(station_id) AS station_id, max(direction_type) AS direction_type,
+               max(line_name) AS line_name, max(station_name) AS station_name,
+               max(arrived_at) AS arrived_at,
+               extract(epoch FROM min(t) FILTER (WHERE train_status = 2 AND t >= arrived_at) - max(arrived_at)) AS dwell_sec
+        FROM (
+            SELECT *, min(t) FILTER (WHERE train_status = 1) OVER (PARTITION BY train_number, visit_id) AS arrived_at
+            FROM (
+                SELECT *, sum(new_visit) OVER (PARTITION BY train_number ORDER BY t, id) AS visit_id
+                FROM (
+                    SELECT id, train_number, line_id, station_id, station_name, direction_type, line_name, train_status,
+                           coalesce(event_time, created_at) AS t,
+                           CASE WHEN (station_name, direction_type) IS NOT DISTINCT FROM
+                                     lag((station_name, direction_type)) OVER (PARTITION BY train_number ORDER BY coalesce(event_time, created_at), id)
+                                THEN 0 ELSE 1 END AS new_visit
+                    FROM realtime_subway_positions
+                    WHERE created_at >= p_from - interval '1 hour' AND created_at < p_to + interval '1 hour'
+                      AND train_status IN (0, 1, 2)
+                ) tagged
+            ) numbered
+        ) visits
+        GROUP BY visit_id, train_number
+    ) dwells
+    WHERE dwell_sec IS NOT NULL AND arrived_at >= p_from AND arrived_at < p_to
+      AND line_id IS NOT NULL AND station_id IS NOT NULL AND direction_type IS NOT NULL
+    GROUP BY 1, 2, 3, 4;
+    GET DIAGNOSTICS dwell_rows = ROW_COUNT;
+
+    RETURN json_build_object('headway_rows', headway_rows, 'dwell_rows', dwell_rows);
+END;
+$$;
+
+-- =====================================================================
+-- 주기 작업 등록 (Supabase: pg_cron 확장이 켜져 있을 때만)
+-- pg_cron 을 쓰지 않으면 수집기(main.py)가 같은 함수를 RPC 로 호출합니다.
+-- =====================================================================
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+        PERFORM cron.schedule('maintain-position-partitions', '5 * * * *',
+                              'SELECT maintain_position_partitions()');
+        PERFORM cron.schedule('refresh-hourly-rollups', '10 * * * *',
+                              $job$SELECT refresh_hourly_rollups(date_trunc('hour', now()) - interval '3 hours', date_trunc('hour', now()))$job$);
+    END IF;
+END;
+$$;
+
+-- =====================================================================
+-- 기존(파티션 없는) 테이블에서 옮기기 - 한 번만 수동 실행
+-- =====================================================================
+-- ALTER TABLE realtime_subway_positions RENAME TO realtime_subway_positions_legacy;   -- 위 스크립트 실행 전에
+-- ALTER TABLE realtime_subway_positions_legacy ADD COLUMN IF NOT EXISTS event_time TIMESTAMP WITH TIME ZONE;
+-- ALTER TABLE realtime_subway_positions_legacy
+--     ALTER COLUMN line_id TYPE SMALLINT USING NULLIF(line_id, '')::smallint,
+--     ALTER COLUMN station_id TYPE INTEGER USING NULLIF(station_id, '')::integer,
+--     ALTER COLUMN dest_station_id TYPE INTEGER USING NULLIF(dest_station_id, '')::integer,
+--     ALTER COLUMN direction_type TYPE SMALLINT USING NULLIF(direction_type, '')::smallint,
+--     ALTER COLUMN train_status TYPE SMALLINT USING NULLIF(train_status, '')::smallint,
+--     ALTER COLUMN is_express TYPE SMALLINT USING (CASE is_express WHEN 'True' THEN '1' WHEN 'False' THEN '0' ELSE NULLIF(is_express, '') END)::smallint;
+-- (위 스크립트 실행)
+-- SELECT create_position_partitions((SELECT (min(created_at) AT TIME ZONE 'Asia/Seoul')::date FROM realtime_subway_positions_legacy),
+--                                   (now() AT TIME ZONE 'Asia/Seoul')::date);
+-- INSERT INTO realtime_subway_positions SELECT * FROM realtime_subway_positions_legacy;
+-- SELECT setval(pg_get_serial_sequence('realtime_subway_positions', 'id'), (SELECT max(id) FROM realtime_subway_positions));
+-- DROP TABLE realtime_subway_positions_legacy;
@@ -0,0 +1,310 @@
+import math
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from event_time import parse_recptn_dt
+
+# 기준값 평활 계수 (최근 약 1/alpha 건에 가중 → 시간대별 배차 변화를 따라감)
+EWMA_ALPHA = 0.1
+# 기준값이 이만큼 쌓이기 전에는 배차 간격 경보를 내지 않음
+MIN_SAMPLES = 8
+# 기준값 대비 몇 표준편차를 벗어나면 이상으로 볼지
+SIGMA = 3.0
+# 표준편차 조건과 함께 보는 배율 (분산이 작은 역에서 몇 초 차이로 경보가 나지 않도록)
+BUNCHING_RATIO = 0.3
+GAP_RATIO = 2.0
+LONG_DWELL_RATIO = 2.0
+# 정차 시간 기준값이 쌓이기 전에 쓰는 사전값(초)과 장기 정차로 볼 최소 시간(초)
+DWELL_PRIOR_SEC = 30.0
+MIN_LONG_DWELL_SEC = 60.0
+# 호선 데이터가 이보다 오래 끊겼다가 다시 들어오면 그 사이 도착을 놓쳤으므로 역별 마지막 도착을 잊음
+LINE_STALE_SEC = 300.0
+
+# 도착으로 보는 상태: 1:도착, 2:출발 (수집 주기 사이에 도착을 놓쳐도 출발 상태로 도착을 알 수 있음)
+ARRIVED_STATUSES = ('1', '2')
+
+class Ewma:
+    """
+    지수 가중 이동 평균/분산 (O(1) 메모리, 오래된 값의 영향은 지수적으로 줄어듦)
+    """
+    __slots__ = ("alpha", "count", "mean", "var")
+
+    def __init__(self, alpha: float = EWMA_ALPHA, prior: float = None):
+        self.alpha = alpha
+        self.count = 0
+        # 사전값이 있으면 평균으로 시작하고 분산은 평균의 절반을 표준편차로 둠
+        self.mean = prior
+        self.var = (prior * 0.5) ** 2 if prior is not None else 0.0
+
+    def add(self, value: float):
+        self.count += 1
+        if self.mean is None:
+            self.mean = value
+            return
+        delta = value - self.mean
+        self.mean += self.alpha * delta
+        self.var = (1 - self.alpha) * (self.var + self.alpha * delta * delta)
+
+    @property
+    def std(self):
+        return math.sqrt(self.var)
+
+    def upper(self, sigma: float, ratio: float):
+        """이 값보다 크면 이상 (평균 + sigma·표준편차 와 평균·ratio 중 큰 값)"""
+        return max(self.mean + sigma * self.std, self.mean * ratio)
+
+    def lower(self, sigma: float, ratio: float):
+        """이 값보다 작으면 이상 (평균 - sigma·표준편차 와 평균·ratio 중 작은 값)"""
+        return min(self.mean - sigma * self.std, self.mean * ratio)
+
+    def clamp(self, value: float, sigma: float):
+        """기준값 갱신용: 이상치 한 건이 기준값을 끌고 가지 않도록 평균 ± sigma·표준편차 로 자름"""
+        if self.mean is None or self.count < MIN_SAMPLES:
+            return value
+        spread = sigma * self.std
+        return min(max(value, self.mean - spread), self.mean + spread)
+
+class AlertEngine:
+    """
+    수집 틱마다 스냅샷을 받아 역/방향별 배차 간격·정차 시간 기준값을 갱신하고 이상을 바로 알리는 실시간 경보
+    - bunching: 직전 열차와의 도착 간격이 기준보다 크게 짧음 (열차 몰림)
+    - gap: 마지막 도착 이후 기준보다 크게 오래 다음 열차가 오지 않음 (도착을 기다리지 않고 틱마다 확인)
+    - long_dwell: 역에 도착한 열차가 기준보다 크게 오래 머무름 (출발을 기다리지 않고 틱마다 확인)
+    기준값은 고정 상수 대신 역/방향별 EWMA 로 학습하며, 상태 수는 역 수(max_stations)와 운행 열차 수로 고정됩니다.
+    같은 역/방향(정차는 열차)의 경보는 해소될 때까지 한 번만 냅니다.
+    """
+
+    def __init__(self, alpha: float = EWMA_ALPHA, sigma: float = SIGMA, min_samples: int = MIN_SAMPLES,
+                 evict_after_sec: float = 3600, max_stations: int = 4096, max_trains: int = 8192,
+                 history: int = 500):
+        self.alpha = alpha
+        self.sigma = sigma
+        self.min_samples = min_samples
+        self.evict_after_sec = evict_after_sec
+        self.max_stations = max_stations
+        self.max_trains = max_trains
+        self._lock = threading.Lock()
+        # (호선명, 역명, 방향) -> 역 상태 (가장 오래 갱신되지 않은 역부터 정리)
+        self.stations = OrderedDict()
+        # (호선명, 열차번호) -> 열차 상태
+        self.trains = OrderedDict()
+        # 해소되지 않은 경보 {경보 키: 경보}
+        self.active = {}
+        # 최근에 낸 경보
+        self.history = deque(maxlen=history)
+        self.fired = {}
+        # 호선별로 지금까지 본 가장 늦은 API 수신 시각
+        # 진행 중인 이상은 그 호선의 시각 기준으로 판단 (수집 지연, 다른 호선의 조회 주기/실패와 무관)
+        self.clocks = {}
+
+    def _station(self, key):
+        state = self.stations.get(key)
+        if state is None:
+            state = {
+                "last_arrival": None,
+                "last_train": None,
+                # 막차가 지나간 뒤에는 다음 도착까지 gap 을 보지 않음
+                "closed": False,
+                "headway": Ewma(self.alpha),
+                "dwell": Ewma(self.alpha, DWELL_PRIOR_SEC),
+            }
+            self.stations[key] = state
+            if len(self.stations) > self.max_stations:
+                old, _ = self.stations.popitem(last=False)
+                self._resolve(("gap",) + old)
+                self._resolve(("bunching",) + old)
+        else:
+            self.stations.move_to_end(key)
+        return state
+
+    def _raise(self, key: tuple, kind: str, line: str, station: str, direction: str, train: str,
+               value: float, baseline: float, threshold: float, now: datetime):
+        # 이미 알린 경보는 해소될 때까지 다시 내지 않음
+        if key in self.active:
+            return None
+        alert = {
+            "type": kind,
+            "line": line,
+            "station": station,
+            "direction": direction,
+            "train": train,
+            "value_sec": round(value, 1),
+            "baseline_sec": round(baseline, 1),
+            "threshold_sec": round(threshold, 1),
+            "time": now,
+        }
+        self.active[key] = alert
+        self.history.append(alert)
+        self.fired[kind] = self.fired.get(kind, 0) + 1
+        return alert
+
+    def _resolve(self, key: tuple):
+        self.active.pop(key, None)
+
+    def update(self, line: str, data_list: list, now: datetime):
+        """
+        한 호선의 API 원본 스냅샷을 반영합니다. (update_snapshot 의 잠금 안에서 호출)
+
+        Returns:
+            list: 이번 스냅샷에서 새로 발생한 경보
+        """
+        alerts = []
+        rows = [(parse_recptn_dt(item.get("recptnDt")) or now, item) for item in data_list]
+        if not rows:
+            return alerts
+        latest = max(t for t, _ in rows)
+        last_seen = self.clocks.get(line)
+        if last_seen is not None and (latest - last_seen).total_seconds() > LINE_STALE_SEC:
+            self._forget_arrivals(line)
+        self.clocks[line] = latest if last_seen is None else max(latest, last_seen)
+
+        for t, item in rows:
+            train_no = item.get("trainNo")
+            station = item.get("statnNm")
+            direction = str(item.get("updnLine"))
+            status = str(item.get("trainSttus"))
+            station_key = (line, station, direction)
+
+            key = (line, train_no)
+            prev = self.trains.get(key)
+            moved = prev is None or prev["station"] != station or prev["direction"] != direction
+            if moved and prev is not None:
+                # 직전 역을 떠났으므로 그 역의 정차 경보는 해소
+                self._resolve(("long_dwell", line, train_no))
+            arrived_at = None if moved else prev["arrived_at"]
+            stopped_at = None if moved else prev["stopped_at"]
+
+            if status in ARRIVED_STATUSES and arrived_at is None:
+                arrived_at = t
+                st = self._station(station_key)
+                headway = st["headway"]
+                if st["last_arrival"] is not None and not st["closed"]:
+                    gap = (t - st["last_arrival"]).total_seconds()
+                    if headway.count >= self.min_samples:
+                        threshold = headway.lower(self.sigma, BUNCHING_RATIO)
+                        if gap < threshold:
+                            alert = self._raise(("bunching",) + station_key, "bunching", line, station, direction,
+                                                train_no, gap, headway.mean, threshold, t)
+                            if alert is not None:
+                                alerts.append(alert)
+                        else:
+                            self._resolve(("bunching",) + station_key)
+                    headway.add(headway.clamp(gap, self.sigma))
+                # 다음 열차가 도착했으므로 간격 경보 해소
+                self._resolve(("gap",) + station_key)
+                st["last_arrival"] = t
+                st["last_train"] = train_no
+                st["closed"] = item.get("lstcarAt") == '1'
+            # 정차: 도착(1)이 처음 보인 시각부터 출발(1 이외)이 처음 보인 시각까지
+            if status == '1' and stopped_at is None:
+                stopped_at = t
+            elif status != '1' and stopped_at is not None:
+                dwell = self._station(station_key)["dwell"]
+                dwell.add(dwell.clamp((t - stopped_at).total_seconds(), self.sigma))
+                self._resolve(("long_dwell", line, train_no))
+                stopped_at = None
+
+            self.trains[key] = {
+                "station": station,
+                "direction": direction,
+                "arrived_at": arrived_at,
+                "stopped_at": stopped_at,
+                "last_seen": t,
+            }
+            self.trains.move_to_end(key)
+            if len(self.trains) > self.max_trains:
+                (old_line, old_train), _ = self.trains.popitem(last=False)
+                self._resolve(("long_dwell", old_line, old_train))
+        return alerts
+
+    def _forget_arrivals(self, line: str):
+        """데이터가 끊긴 동안의 도착을 모르므로 호선의 역별 마지막 도착과 간격 경보를 지움"""
+        for (key_line, station, direction), st in self.stations.items():
+            if key_line == line:
+                st["last_arrival"] = None
+                self._resolve(("gap", line, station, direction))
+
+    def check(self, clocks: dict):
+        """
+        도착/출발을 기다리지 않고 진행 중인 이상(간격 벌어짐, 장기 정차)을 확인합니다. (틱마다 호출)
+        이번 틱에 데이터가 들어온 호선만 그 호선의 시각 기준으로 확인합니다.
+
+        Args:
+            clocks (dict): {호선명: 판단 기준 시각}
+
+        Returns:
+            list: 새로 발생한 경보
+        """
+        alerts = []
+        for (line, station, direction), st in self.stations.items():
+            now = clocks.get(line)
+            headway = st["headway"]
+            if now is None or st["last_arrival"] is None or st["closed"] or headway.count < self.min_samples:
+                continue
+            waited = (now - st["last_arrival"]).total_seconds()
+            threshold = headway.upper(self.sigma, GAP_RATIO)
+            if waited > threshold:
+                alert = self._raise(("gap", line, station, direction), "gap", line, station, direction,
+                                    st["last_train"], waited, headway.mean, threshold, now)
+                if alert is not None:
+                    alerts.append(alert)
+
+        for (line, train_no), train in self.trains.items():
+            now = clocks.get(line)
+            if now is None or train["stopped_at"] is None:
+                continue
+            st = self.stations.get((line, train["station"], train["direction"]))
+            if st is None:
+                continue
+            dwell = (now - train["stopped_at"]).total_seconds()
+            threshold = max(st["dwell"].upper(self.sigma, LONG_DWELL_RATIO), MIN_LONG_DWELL_SEC)
+            if dwell > threshold:
+                alert = self._raise(("long_dwell", line, train_no), "long_dwell", line, train["station"],
+                                    train["direction"], train_no, dwell, st["dwell"].mean, threshold, now)
+                if alert is not None:
+                    alerts.append(alert)
+        return alerts
+
+    def update_snapshot(self, positions: dict, now: datetime = None):
+        """
+        {호선명: 데이터 리스트} 형태의 전체 스냅샷을 반영하고 진행 중인 이상을 확인합니다.
+        데이터가 비어 있는 호선(조회 실패, 운행 종료)은 열차가 없는 것과 구분할 수 없으므로 이번 틱에 판단하지 않습니다.
+        조회 API 스레드가 경보를 읽으므로 잠금 안에서 처리합니다.
+
+        Returns:
+            list: 이번 틱에 새로 발생한 경보
+        """
+        now = now or datetime.now(timezone.utc)
+        with self._lock:
+            alerts = []
+            clocks = {}
+            for line, data_list in positions.items():
+                if not data_list:
+                    continue
+                alerts.extend(self.update(line, data_list, now))
+                clocks[line] = min(self.clocks[line], now)
+            alerts.extend(self.check(clocks))
+            self.evict(now)
+            return alerts
+
+    def evict(self, now: datetime):
+        """
+        evict_after_sec 동안 관측되지 않은 열차(운행 종료)와 그 열차의 정차 경보를 정리합니다.
+        """
+        expired = [k for k, v in self.trains.items() if (now - v["last_seen"]).total_seconds() >= self.evict_after_sec]
+        for line, train_no in expired:
+            del self.trains[(line, train_no)]
+            self._resolve(("long_dwell", line, train_no))
+
+    def snapshot(self):
+        """
+        조회 API 용: 해소되지 않은 경보와 최근 경보, 종류별 누적 건수
+        """
+        with self._lock:
+            return {
+                "active": [dict(a) for a in self.active.values()],
+                "recent": [dict(a) for a in self.history],
+                "fired": dict(self.fired),
+                "stations": len(self.stations),
+                "trains": len(self.trains),
+            }
@@ -1,5 +1,6 @@
 import pandas as pd
 from db_client import SupabaseClient
+from data_loader import DataLoader
 from datetime import datetime
 import time
 
@@ -10,41 +11,20 @@ class SubwayAnalyzer:
 
     def __init__(self):
         self.db = SupabaseClient()
+        self.loader = DataLoader(self.db)
 
     def fetch_data_as_dataframe(self, days=1):
         """
         최근 n일 간의 데이터를 Supabase에서 가져와 Pandas DataFrame으로 반환합니다.
+        created_at 기준 구간을 페이지 단위로 나누어 조회하므로 1000행 상한에 잘리지 않습니다.
         """
-        # 현재는 모든 데이터를 가져오는 단순한 쿼리 예시. 
-        # 실제 운영 시에는 날짜 필터링(created_at)이 필요함.
-        # Supabase API 한계(default 1000 row)가 있으므로, 필요 시 페이지네이션 구현 필요.
-        # 여기서는 최근 1000개 데이터만 샘플링하여 분석한다고 가정.
-        
-        try:
-            response = self.db.client.table("realtime_subway_positions") \
-                .select("*") \
-                .order("created_at", desc=True) \
-                .limit(2000) \
-                .execute()
-            
-            data = response.data
-            if not data:
-                print("[분석 경고] 분석할 데이터가 없습니다.")
-                return pd.DataFrame()
-
-            df = pd.DataFrame(data)
-            
-            # 날짜 컬럼 타입 변환
-            df['created_at'] = pd.to_datetime(df['created_at'])
-            if 'last_rec_time' in df.columns:
-                # API 원본 포맷에 따라 파싱 포맷 조정 필요할 수 있음
-                # 예: 20240101120000 -> 포맷팅 필요. 여기서는 그대로 둠.
-                pass
-                
+        df = self.loader.fetch_recent(days=days)
+        if df.empty:
+            print("[분석 경고] 분석할 데이터가 없습니다.")
             return df
-        except Exception as e:
-            print(f"[데이터 로드 오류] {e}")
-            return pd.DataFrame()
+
+        # 분석 기준 시각(event_time)은 DataLoader 에서 API 수신 시각(recptnDt)으로 준비됨
+        return df
 
     def analyze_interval_regularity(self, df: pd.DataFrame, station_name: str, line_id: str):
         """
@@ -57,25 +37,25 @@ class SubwayAnalyzer:
         # 필터링: 특정 노선, 데이터가 특정 역에 있는 경우(train_status=1 도착 or 0 진입)
         # statnId 나 statnNm 사용
         target_df = df[
-            (df['line_id'] == line_id) & 
+            (df['line_id'] == int(line_id)) & 
             (df['station_name'] == station_name) &
-            (df['train_status'].isin(['0', '1'])) # 0:진입, 1:도착
+            (df['train_status'].isin([0, 1])) # 0:진입, 1:도착
         ].copy()
         
         if target_df.empty:
             print(f"[{station_name}] 해당 역의 도착 데이터가 없습니다.")
             return
 
-        # 시간순 정렬
-        target_df = target_df.sort_values(by='created_at')
+        # 시간순 정렬 (API 수신 시각 기준)
+        target_df = target_df.sort_values(by='event_time')
         
         # 앞 열차와의 시간 차이(초) 계산
-        target_df['prev_arrival'] = target_df['created_at'].shift(1)
-        target_df['interval_sec'] = (target_df['created_at'] - target_df['prev_arrival']).dt.total_seconds()
+        target_df['prev_arrival'] = target_df['event_time'].shift(1)
+        target_df['interval_sec'] = (target_df['event_time'] - target_df['prev_arrival']).dt.total_seconds()
         
         # 결과 출력
         print(f"\n=== [{station_name}] 배차 간격 분석 ===")
-        print(target_df[['created_at', 'train_number', 'interval_sec']].dropna().tail(10))
+        print(target_df[['event_time', 'train_number', 'interval_sec']].dropna().tail(10))
         
         avg_interval = target_df['interval_sec'].mean()
         max_interval = target_df['interval_sec'].max()
@@ -97,9 +77,9 @@ class SubwayAnalyzer:
         
         current_time = pd.Timestamp.now(tz='UTC') # Supabase는 UTC 기준일 가능성 높음
         
-        # 각 열차별 마지막 수신 시간
-        last_seen = df.groupby(['train_number', 'line_name'])['created_at'].max().reset_index()
-        last_seen['seconds_since_update'] = (current_time - last_seen['created_at']).dt.total_seconds()
+        # 각 열차별 마지막 수신 시간 (API 수신 시각 기준)
+        last_seen = df.groupby(['train_number', 'line_name'], observed=True)['event_time'].max().reset_index()
+        last_seen['seconds_since_update'] = (current_time - last_seen['event_time']).dt.total_seconds()
         
         # 300초(5분) 이상 업데이트 없는 열차 (통신 장애 혹은 장기 정차)
         delayed_trains = last_seen[last_seen['seconds_since_update'] > 300]
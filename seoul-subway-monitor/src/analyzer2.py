@@ -1,64 +1,145 @@
+import argparse
 import pandas as pd
 from data_loader import DataLoader
+from frames import SharedFrame
+from profiling import stage, add_profile_arguments, profiler_from_args
 
-def run_analysis_2():
+# 기준: 120초 이상 머무르고 있는 경우 (수집 주기에 따라 조정 필요)
+LONG_STOP_SEC = 120
+
+# 역 기준치(백분위)를 신뢰하기 위한 최소 정차 건수
+MIN_BASELINE_VISITS = 5
+
+# 한 번의 역 방문(visit)을 구분하는 기준: 열차, 역, 방향 중 하나라도 바뀌면 새 방문
+VISIT_KEYS = ['train_number', 'station_name', 'direction_type']
+BASELINE_KEYS = ['line_name', 'station_name', 'direction_type']
+
+def segment_visits(df: pd.DataFrame):
     """
-    [분석 2] 지연 발생 구간 탐지 (Delay Hotspots)
-    - 역별 체류 시간(도착~출발)을 추정하여 지연을 감지합니다.
+    열차/시간순으로 정렬된 로그에 방문 번호(visit_id)를 붙입니다. (run-length 구간 나누기)
+    같은 열차가 같은 역에 하루 두 번 들르면(왕복) 서로 다른 방문으로 구분됩니다.
     """
-    print(">>> [분석 2] 지연 발생 구간(Hotspots) 탐지 시작...\n")
-    
-    loader = DataLoader()
-    df = loader.fetch_data(limit=10000)
-    
-    if df.empty:
-        return
+    changed = pd.Series(False, index=df.index)
+    for col in VISIT_KEYS:
+        changed |= df[col].ne(df[col].shift(1))
+    return df.assign(visit_id=changed.cumsum())
 
-    # 1. 데이터 소팅 (열차별, 시간순)
-    df = df.sort_values(by=['train_number', 'created_at'])
+def compute_dwell_stats(frame: SharedFrame):
+    """
+    역 방문별 체류 시간과 역/방향별 기준 체류 시간(백분위)을 계산합니다. (출력 없음)
+    - 체류 시간은 방문 안에서 도착(1) → 출발(2) 상태가 처음 바뀐 시간 차이입니다.
+    - 1→2 전이가 관측되지 않은 방문은 최초~최후 관측 시간 차이로 근사합니다. (measured=False)
+
+    Returns:
+        pd.DataFrame: 방문 1건당 1행
+            line_name, station_name, direction_type, train_number, visit_id,
+            arrival_time, departure_time, log_count, dwell_time_sec, measured,
+            baseline_p50, baseline_p90, baseline_count, is_hotspot
+    """
+    # 1. 데이터 소팅 (열차별, 시간순) → 공유 정렬 사용
+    df = frame.by_train
 
-    # 2. 체류 시간 추정 로직
-    # 동일 열차(train_number), 동일 역(station_name)에서 관측된 '최초 시간'과 '최후 시간'의 차이를 체류 시간으로 근사
-    # (API가 1분 등 주기적으로 호출되므로, 한 역에서 여러 번 찍히면 그 기간만큼 머문 것)
-    
     # 관심 상태: 진입(0), 도착(1), 출발(2)
-    # 사실상 역에 '있는' 동안을 봐야 하므로 0, 1 상태인 로그들을 묶습니다.
-    staying_df = df[df['train_status'].isin(['0', '1', '2'])]
-    
+    staying_df = df[df['train_status'].isin([0, 1, 2])]
+
     if staying_df.empty:
-        print("-> 분석할 열차 운행 데이터가 없습니다.")
-        return
+        return pd.DataFrame()
 
-    # 그룹핑: 열차, 호선, 역
-    dwell_stats = staying_df.groupby(['line_name', 'station_name', 'train_number']).agg(
-        arrival_time=('created_at', 'min'),
-        departure_time=('created_at', 'max'),
-        log_count=('created_at', 'count')
-    ).reset_index()
+    # 2. 방문 구간 나누기 (열차/역/방향이 연속으로 같은 행들을 하나의 방문으로)
+    with stage("segment_visits"):
+        visits = segment_visits(staying_df)
+    by_visit = visits.groupby('visit_id', sort=False)
 
+    # 3. 도착(1) 시각과, 그 이후 첫 출발(2) 시각
+    with stage("visit_groupby"):
+        arrived_at = visits['event_time'].where(visits['train_status'] == 1)
+        arrival = arrived_at.groupby(visits['visit_id']).min()
+        arrival_b = visits['visit_id'].map(arrival)
+        departed_at = visits['event_time'].where((visits['train_status'] == 2) & (visits['event_time'] >= arrival_b))
+        departure = departed_at.groupby(visits['visit_id']).min()
+
+        dwell_stats = by_visit.agg(
+            line_name=('line_name', 'first'),
+            station_name=('station_name', 'first'),
+            direction_type=('direction_type', 'first'),
+            train_number=('train_number', 'first'),
+            first_seen=('event_time', 'min'),
+            last_seen=('event_time', 'max'),
+            log_count=('event_time', 'count')
+        )
+    dwell_stats['measured'] = arrival.notna() & departure.notna()
+    dwell_stats['arrival_time'] = arrival.fillna(dwell_stats['first_seen'])
+    dwell_stats['departure_time'] = departure.where(dwell_stats['measured'], dwell_stats['last_seen'])
     dwell_stats['dwell_time_sec'] = (dwell_stats['departure_time'] - dwell_stats['arrival_time']).dt.total_seconds()
+    dwell_stats = dwell_stats.drop(columns=['first_seen', 'last_seen']).reset_index()
+
+    # 4. 역/방향별 기준 체류 시간 (중앙값, 90 백분위)
+    with stage("baseline"):
+        grouped = dwell_stats.groupby(BASELINE_KEYS, observed=True)['dwell_time_sec']
+        baseline = pd.DataFrame({
+            'baseline_p50': grouped.quantile(0.5),
+            'baseline_p90': grouped.quantile(0.9),
+            'baseline_count': grouped.count(),
+        }).reset_index()
+        dwell_stats = dwell_stats.merge(baseline, on=BASELINE_KEYS, how='left')
 
-    # 3. 이상치 탐지 (예: 120초 이상 정차)
-    # 주의: API 수집 주기가 60초라면, 1번 찍히면 0초, 2번 찍히면 60초 차이로 잡힘.
-    # 따라서 dwell_time_sec가 0인 경우는 '잠깐 거쳐감' 혹은 '수집 주기 사이 통과'임.
-    # 여기서는 'log_count'가 많은 경우를 오래 머문 것으로 간주하는 것이 더 정확할 수 있음.
-    
-    # 기준: 120초 이상 머무르고 있는 경우 (수집 주기에 따라 조정 필요)
-    long_stop_df = dwell_stats[dwell_stats['dwell_time_sec'] >= 120].sort_values(by='dwell_time_sec', ascending=False)
+    # 5. 지연 의심: 절대 기준(120초) 이상이면서, 기준치가 충분하면 그 역의 평소(90 백분위)보다도 긴 경우
+    enough = dwell_stats['baseline_count'] >= MIN_BASELINE_VISITS
+    dwell_stats['is_hotspot'] = (dwell_stats['dwell_time_sec'] >= LONG_STOP_SEC) & (
+        ~enough | (dwell_stats['dwell_time_sec'] > dwell_stats['baseline_p90'])
+    )
+    return dwell_stats
+
+def print_dwell_hotspots(dwell_stats: pd.DataFrame):
+    """
+    체류 시간 중 장기 정차(지연 의심) 구간을 출력합니다.
+    """
+    if dwell_stats.empty:
+        print("-> 분석할 열차 운행 데이터가 없습니다.")
+        return
+
+    # 주의: API 수집 주기가 60초라면 짧은 정차는 1→2 전이가 관측되지 않을 수 있음 (measured=False)
+    long_stop_df = dwell_stats[dwell_stats['is_hotspot']].sort_values(by='dwell_time_sec', ascending=False)
+
+    print(f"-> 총 {len(dwell_stats)}건의 역 정차 이력 분석 (도착→출발 전이 측정 {int(dwell_stats['measured'].sum())}건)")
 
-    print(f"-> 총 {len(dwell_stats)}건의 역 정차 이력 분석")
-    
     if not long_stop_df.empty:
         print(f"-> [주의] 장기 정차(지연 의심) 구간 발견 ({len(long_stop_df)}건)")
         # 보기 좋게 출력
-        display_cols = ['line_name', 'station_name', 'train_number', 'dwell_time_sec', 'arrival_time']
-        
+        display_cols = ['line_name', 'station_name', 'train_number', 'dwell_time_sec', 'baseline_p90', 'arrival_time']
+
         # 시간 포맷팅
+        long_stop_df = long_stop_df.copy()
         long_stop_df['arrival_time'] = long_stop_df['arrival_time'].dt.strftime('%H:%M:%S')
-        
+
         print(long_stop_df[display_cols].head(20).to_string(index=False))
     else:
-        print("-> 특이한 장기 정차(120초 이상) 구간이 발견되지 않았습니다.")
+        print(f"-> 특이한 장기 정차({LONG_STOP_SEC}초 이상, 평시 대비 지연) 구간이 발견되지 않았습니다.")
+
+def run_analysis_2(frame: SharedFrame = None):
+    """
+    [분석 2] 지연 발생 구간 탐지 (Delay Hotspots)
+    - 역별 체류 시간(도착~출발)을 추정하여 지연을 감지합니다.
+    """
+    print(">>> [분석 2] 지연 발생 구간(Hotspots) 탐지 시작...\n")
+
+    if frame is None:
+        loader = DataLoader()
+        with stage("load"):
+            df = loader.fetch_data(limit=10000)
+
+        if df.empty:
+            return
+        with stage("normalize"):
+            frame = SharedFrame(df)
+
+    with stage("compute_dwell_stats"):
+        result = compute_dwell_stats(frame)
+    print_dwell_hotspots(result)
 
 if __name__ == "__main__":
-    run_analysis_2()
+    parser = argparse.ArgumentParser(description="[분석 2] 단독 실행")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    with profiler_from_args(args):
+        run_analysis_2()
@@ -1,94 +1,184 @@
+import argparse
+import numpy as np
 import pandas as pd
 from data_loader import DataLoader
+from frames import SharedFrame
+from profiling import stage, add_profile_arguments, profiler_from_args
+from topology import load_topology
 
-def run_analysis_4():
+# 급행 도착 시점에 앞선 일반 열차와의 선로상 거리가 이보다 가까우면 간섭/추월 직전으로 간주
+INTERFERENCE_KM = 1.5
+# 역 위치를 모를 때(노선 구조에 없는 역/호선)는 도착 시각 간격으로 대신 판단 (예: 2분 미만)
+INTERFERENCE_SEC = 120
+
+# directAt 코드: 1:급행, 7:특급, 0:일반 (True/False 표기는 normalize_frame 에서 1/0 으로 변환됨)
+EXPRESS_CODES = [1, 7]
+LOCAL_CODES = [0]
+EXPRESS_LABELS = {1: '급행', 7: '특급'}
+
+# 같은 호선/역/방향 안에서만 직전 일반 열차를 찾음
+GROUP_KEYS = ['line_name', 'station_name', 'direction_type']
+
+def _local_spacing_km(frame: SharedFrame, merged: pd.DataFrame):
     """
-    [분석 4] 급행/일반 열차 간섭 분석 (Congestion/Overtake)
-    - 9호선 등 급행 운영 노선에서 앞선 완행 열차와의 간격이 좁아지는지 분석
+    급행 도착 시점에 직전 일반 열차가 어디까지 가 있는지 찾아, 급행 위치에서 진행 방향으로 잰 거리(km)를 구합니다.
+    - 일반 열차의 마지막 위치: 열차별 시간순 로그에서 as-of 조인 (급행 도착 시각 이전의 가장 최근 행)
+    - 거리: 노선 구조(topology)의 역 번호로 배열 조회 (순환선/분기 반영)
+
+    Returns:
+        (np.ndarray, np.ndarray): 거리(km, 일반 열차가 이미 회차했으면 NaN), 두 열차 위치를 모두 찾았는지 여부
     """
-    print(">>> [분석 4] 급행/일반 열차 간섭 분석 시작...\n")
-    
-    loader = DataLoader()
-    # is_express 컬럼 활용 (1:급행, 0:일반)
-    df = loader.fetch_data(limit=5000)
-    
-    if df.empty:
-        return
-    
-    # 급행 데이터가 있는 노선만 필터링 (주로 9호선, 1호선 일부 등)
-    # is_express가 1인 데이터가 있는지 확인
-    # API 데이터에서 문자열 '1'일 수도 있고 숫자 1일 수도 있음
-    has_express = df[df['is_express'].astype(str).isin(['1', 'True'])]
-    
-    if has_express.empty:
-        print("-> 급행 열차 데이터가 발견되지 않았습니다. (현재 시간대에 급행이 없거나, 지원하지 않는 호선일 수 있습니다)")
-        return
-    
-    target_lines = has_express['line_name'].unique()
-    print(f"-> 급행 운행 노선 발견: {target_lines}")
-    
-    # 9호선을 타겟으로 예시 분석
-    # 같은 노선, 같은 방향, 인접한 시간대의 급행(Express)과 일반(Local) 열차 간의 거리(역 차이 혹은 시간 차이) 계산
-    
-    # 이번에는 간단하게 '역' 단위가 아닌 '도착 시간' 기준으로
-    # 특정 역에 급행이 도착했을 때, 직전 일반 열차가 언제 도착했는지(Headway) 비교
-    
-    report_data = []
-
-    for line in target_lines:
-        line_df = df[df['line_name'] == line].sort_values(['station_name', 'direction_type', 'created_at'])
-        
-        # 역별로 그룹핑
-        for (station, direction), group in line_df.groupby(['station_name', 'direction_type']):
-            # 도착(1) 데이터만 
-            arrivals = group[group['train_status'] == '1'].sort_values('created_at')
-            
-            # 각 급행 열차에 대해 바로 앞의 일반 열차 찾기
-            express_trains = arrivals[arrivals['is_express'].astype(str).isin(['1', 'True'])]
-            local_trains = arrivals[arrivals['is_express'].astype(str).isin(['0', 'False'])]
-            
-            if express_trains.empty or local_trains.empty:
-                continue
-                
-            for _, exp_row in express_trains.iterrows():
-                # 해당 급행 열차 도착 시간보다 이전에 도착한 일반 열차 중 가장 최근 것
-                prev_locals = local_trains[local_trains['created_at'] < exp_row['created_at']]
-                
-                if not prev_locals.empty:
-                    last_local = prev_locals.iloc[-1]
-                    time_diff = (exp_row['created_at'] - last_local['created_at']).total_seconds()
-                    
-                    # 간격이 너무 좁으면(예: 2분 미만) 간섭/추월 직전으로 간주
-                    status = "정상"
-                    if time_diff < 120: 
-                        status = "간섭주의(근접)"
-                    
-                    report_data.append({
-                        'line': line,
-                        'station': station,
-                        'direction': direction, # 0:상행, 1:하행
-                        'express_train': exp_row['train_number'],
-                        'local_train': last_local['train_number'],
-                        'headway_sec': time_diff,
-                        'status': status,
-                        'time': exp_row['created_at']
-                    })
-    
-    if not report_data:
-        print("-> 분석할 급행/일반 교차 데이터가 충분하지 않습니다.")
+    topology = load_topology()
+    trains = frame.by_train
+    positions = trains[trains['train_number'].isin(merged['local_train'].unique())]
+    # 범주형 카테고리가 달라도 조인되도록 키는 일반 객체 배열로 맞춤
+    right = pd.DataFrame({
+        'line_name': positions['line_name'].astype(object).to_numpy(),
+        'local_train': positions['train_number'].astype(object).to_numpy(),
+        'event_time': positions['event_time'].array,
+        'local_station_id': positions['station_id'].to_numpy(dtype='float64', na_value=np.nan)
+        if 'station_id' in positions.columns else np.nan,
+        'local_station_name': positions['station_name'].astype(object).to_numpy(),
+        'local_direction': positions['direction_type'].to_numpy(),
+    }).sort_values('event_time', kind='stable')
+    left = pd.DataFrame({
+        'line_name': merged['line_name'].astype(object).to_numpy(),
+        'local_train': merged['local_train'].astype(object).to_numpy(),
+        'event_time': merged['event_time'].array,
+        'row': range(len(merged)),
+    })
+    located = pd.merge_asof(left, right, on='event_time', by=['line_name', 'local_train'], direction='backward') \
+        .sort_values('row')
+
+    express_pos = topology.locate_frame(merged)
+    local_pos = topology.locate_frame(located, id_col='local_station_id', name_col='local_station_name')
+    direction = merged['direction_type'].to_numpy()
+    spacing = topology.along(located['line_name'].to_numpy(), express_pos, local_pos, direction)
+    # 방향이 바뀌었거나 종점에 멈춰 있는 일반 열차는 회차 중이라 더 이상 앞에 있지 않음
+    turned = (located['local_direction'].to_numpy() != direction) | \
+        topology.is_terminal(located['line_name'].to_numpy(), local_pos)
+    spacing[turned] = np.nan
+    return spacing, ~np.isnan(spacing) | turned
+
+def compute_express_headways(frame: SharedFrame):
+    """
+    급행(특급 포함) 열차 도착 시점과 직전 일반 열차 도착 시점의 간격을 계산합니다. (출력 없음)
+    '직전 일반 열차 도착' 조회는 호선/역/방향을 키로 한 as-of 조인(merge_asof) 한 번으로 처리합니다.
+
+    앞선 일반 열차와의 선로상 거리(spacing_km)는 노선 구조(topology)로 계산하고, 간섭 여부는 이 거리로 판단합니다.
+
+    Returns:
+        pd.DataFrame: line, station, direction, express_type, express_train, local_train,
+                      headway_sec, spacing_km, status, time
+    """
+    # is_express 컬럼 활용 - 코드값은 normalize_frame 에서 int8 로 통일됨
+    df = frame.by_station
+
+    # 도착(1) 데이터만
+    arrivals = df[df['train_status'] == 1]
+    express_trains = arrivals[arrivals['is_express'].isin(EXPRESS_CODES)]
+
+    if express_trains.empty:
+        return pd.DataFrame()
+
+    # 급행 데이터가 있는 노선만 대상 (주로 9호선, 1호선 일부 등)
+    local_trains = arrivals[
+        arrivals['is_express'].isin(LOCAL_CODES) &
+        arrivals['line_name'].isin(express_trains['line_name'].unique())
+    ]
+
+    if local_trains.empty:
+        return pd.DataFrame()
+
+    # 특정 역에 급행이 도착했을 때, 같은 역/방향에 직전(엄격히 이전) 일반 열차가 언제 도착했는지(Headway) 비교
+    # merge_asof 는 조인 시각 기준 정렬이 필요함 (stable 정렬로 동시각 행의 순서는 유지)
+    # station_id 는 노선 구조에서 역 위치를 찾는 데 사용 (이전 스키마에는 없을 수 있음)
+    id_column = ['station_id'] if 'station_id' in express_trains.columns else []
+    left = express_trains[GROUP_KEYS + ['event_time', 'train_number', 'is_express'] + id_column] \
+        .sort_values('event_time', kind='stable')
+    right = local_trains[GROUP_KEYS + ['event_time', 'train_number']] \
+        .rename(columns={'train_number': 'local_train'}) \
+        .assign(local_time=lambda x: x['event_time']) \
+        .sort_values('event_time', kind='stable')
+
+    with stage("merge_asof"):
+        merged = pd.merge_asof(
+            left, right,
+            on='event_time', by=GROUP_KEYS,
+            direction='backward', allow_exact_matches=False
+        ).dropna(subset=['local_time'])
+
+    if merged.empty:
+        return pd.DataFrame()
+
+    headway_sec = (merged['event_time'] - merged['local_time']).dt.total_seconds()
+    with stage("spacing"):
+        spacing, located = _local_spacing_km(frame, merged)
+    spacing_km = pd.Series(spacing, index=merged.index)
+    # 위치를 알면 거리로, 모르면 도착 시각 간격으로 판단 (음수/회차: 일반 열차가 이미 앞에 없음)
+    close = (spacing_km.ge(0) & spacing_km.lt(INTERFERENCE_KM)) \
+        .where(located, headway_sec.lt(INTERFERENCE_SEC))
+    result = pd.DataFrame({
+        'line': merged['line_name'],
+        'station': merged['station_name'],
+        'direction': merged['direction_type'], # 0:상행, 1:하행
+        'express_type': merged['is_express'].map(EXPRESS_LABELS),
+        'express_train': merged['train_number'],
+        'local_train': merged['local_train'],
+        'headway_sec': headway_sec,
+        'spacing_km': spacing_km.round(2),
+        'status': close.astype(bool).map({True: "간섭주의(근접)", False: "정상"}),
+        'time': merged['event_time'],
+    })
+
+    # 호선/역/방향/시간 순으로 정리
+    with stage("sort"):
+        return result.sort_values(['line', 'station', 'direction', 'time'], kind='stable').reset_index(drop=True)
+
+def print_express_headways(result: pd.DataFrame):
+    """
+    급행/일반 간격 분석 결과와 간섭 주의 구간을 출력합니다.
+    """
+    if result.empty:
+        print("-> 분석할 급행/일반 교차 데이터가 충분하지 않습니다. (현재 시간대에 급행이 없거나, 지원하지 않는 호선일 수 있습니다)")
         return
 
-    result = pd.DataFrame(report_data)
-    
+    print(f"-> 급행 운행 노선 발견: {', '.join(map(str, result['line'].unique()))}")
+
     # 간섭 주의 구간만 필터링해서 보여주거나, 전체 요약
     print(f"-> 총 {len(result)}건의 급행/일반 간격 데이터 분석")
-    
+
     hotspots = result[result['status'] == "간섭주의(근접)"]
     if not hotspots.empty:
         print("\n[주의] 급행-일반 간격 협소 구간 (간섭 예상):")
-        print(hotspots[['line', 'station', 'direction', 'headway_sec', 'status']].to_string(index=False))
+        print(hotspots[['line', 'station', 'direction', 'express_type', 'headway_sec', 'spacing_km', 'status']].to_string(index=False))
     else:
-        print("\n-> 급행과 일반 열차 간의 위험한 근접(간섭)은 발견되지 않았습니다. (모두 2분 이상 간격 유지 중)")
+        print(f"\n-> 급행과 일반 열차 간의 위험한 근접(간섭)은 발견되지 않았습니다. (모두 {INTERFERENCE_KM}km 이상 간격 유지 중)")
+
+def run_analysis_4(frame: SharedFrame = None):
+    """
+    [분석 4] 급행/일반 열차 간섭 분석 (Congestion/Overtake)
+    - 9호선 등 급행 운영 노선에서 앞선 완행 열차와의 간격이 좁아지는지 분석
+    """
+    print(">>> [분석 4] 급행/일반 열차 간섭 분석 시작...\n")
+
+    if frame is None:
+        loader = DataLoader()
+        with stage("load"):
+            df = loader.fetch_data(limit=5000)
+
+        if df.empty:
+            return
+        with stage("normalize"):
+            frame = SharedFrame(df)
+
+    with stage("compute_express_headways"):
+        result = compute_express_headways(frame)
+    print_express_headways(result)
 
 if __name__ == "__main__":
-    run_analysis_4()
+    parser = argparse.ArgumentParser(description="[분석 4] 단독 실행")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    with profiler_from_args(args):
+        run_analysis_4()
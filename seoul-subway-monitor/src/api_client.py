@@ -1,49 +1,331 @@
+import asyncio
+import math
+import threading
+import time
 import requests
 import json
+import aiohttp
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from config import Config
+from metrics import METRICS
 
 class SeoulSubwayAPI:
     """
     서울시 열차 위치 정보를 가져오는 API 클라이언트
+    - 한 번에 page_size 건씩 받으며, 응답의 전체 건수(list_total_count)가 더 많으면 나머지 페이지를 받아 합칩니다.
+    - 호선별로 직전 조회에 필요했던 페이지 수를 기억해 처음부터 그만큼 동시에 요청하므로,
+      열차 수가 늘어난 순간을 빼면 페이지가 늘어도 왕복이 직렬로 추가되지 않습니다.
     """
-    
-    def __init__(self):
+
+    # 직전 전체 건수에 더해 두는 여유 행 수 비율 (페이지 경계 근처에서 열차가 늘어도 추가 왕복이 없도록)
+    PAGE_HEADROOM = 0.1
+
+    def __init__(self, max_concurrency: int = None, timeout: float = None, page_size: int = None):
         self.api_key = Config.SEOUL_API_KEY
         self.base_url = Config.BASE_API_URL
+        # 비동기 수집 시 동시 요청 수 상한과 요청당 타임아웃(초)
+        self.max_concurrency = max_concurrency or Config.API_MAX_CONCURRENCY
+        self.timeout = timeout or Config.API_TIMEOUT_SEC
+        self.page_size = page_size or Config.API_PAGE_SIZE
+        # 호선별로 처음부터 동시에 요청할 페이지 수 (직전 전체 건수 기준)
+        self._page_hints = {}
+
+        # 틱 사이에 재사용되는 동기 세션 (keep-alive 커넥션 풀)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # 비동기 수집용 이벤트 루프/세션 (최초 사용 시 생성 후 계속 재사용)
+        # 루프는 전용 스레드에서 계속 돌며, 겹쳐 실행된 수집 작업의 조회가 같은 세션을 함께 씁니다.
+        self._loop = None
+        self._loop_thread = None
+        self._loop_lock = threading.Lock()
+        self._aio_session = None
+        self.stats = {
+            "aio_connections_created": 0,
+            "aio_connections_reused": 0,
+            "aio_session_resets": 0,
+            "pages_fetched": 0,
+            # 전체 건수가 예상보다 많아 페이지를 한 번 더 (직렬로) 요청한 횟수
+            "page_refetches": 0,
+        }
+
+    def _build_url(self, line_name: str, page: int = 0) -> str:
+        # API 키 인코딩 처리 등이 필요할 수 있으나, 일반적으로 raw string 사용
+        # URL 패턴: /api/subway/{KEY}/json/realtimePosition/{START}/{END}/{LINE_NAME} (기본: 0/100)
+        # 페이지 경계에서 한 행이 겹칠 수 있으나 _merge_pages 에서 열차번호로 중복을 제거함
+        start = page * self.page_size
+        return f"{self.base_url}/{self.api_key}/json/realtimePosition/{start}/{start + self.page_size}/{line_name}"
+
+    def _parse_response(self, data: dict, line_name: str):
+        """
+        API 응답(JSON dict)에서 열차 위치 리스트를 꺼냅니다. (동기/비동기 공통)
+        """
+        if 'realtimePositionList' in data:
+            return data['realtimePositionList']
+        else:
+            if 'errorMessage' in data:
+                METRICS.inc("api_errors_total", line=line_name, kind="api")
+                print(f"[API 오류] {data['errorMessage'].get('message', '알 수 없는 오류')} (Line: {line_name})")
+            return []
+
+    @staticmethod
+    def _total_count(data: dict):
+        """
+        응답의 전체 건수를 반환합니다. (list_total_count → errorMessage.total → total → 행의 totalCount 순, 없으면 None)
+        데이터가 없을 때(INFO-200)는 errorMessage 없이 상태 필드가 최상위에 오므로 total 도 확인합니다.
+        """
+        total = data.get('list_total_count')
+        if total is None:
+            total = (data.get('errorMessage') or {}).get('total')
+        if total is None:
+            total = data.get('total')
+        if total is None:
+            rows = data.get('realtimePositionList') or []
+            total = rows[0].get('totalCount') if rows else None
+        try:
+            return int(total) if total is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    def _pages_for(self, total):
+        """전체 건수를 받는 데 필요한 페이지 수"""
+        return max(1, math.ceil((total or 0) / self.page_size))
+
+    def _plan_pages(self, line_name: str, pages: list):
+        """
+        이미 받은 페이지의 전체 건수로 더 받아야 할 페이지 번호를 구하고, 다음 조회용 페이지 수를 갱신합니다.
+        """
+        total = self._total_count(pages[0])
+        if total is None:
+            return []
+        self._page_hints[line_name] = self._pages_for(total * (1 + self.PAGE_HEADROOM))
+        return list(range(len(pages), self._pages_for(total)))
+
+    def _merge_pages(self, pages: list, line_name: str):
+        """
+        페이지별 응답을 하나의 열차 목록으로 합칩니다. (경계에서 겹친 열차는 한 번만)
+        범위를 벗어난 여분 페이지는 '데이터 없음' 응답이므로 오류로 출력하지 않습니다.
+        """
+        merged = self._parse_response(pages[0], line_name)
+        if len(pages) == 1:
+            return merged
+        seen = {item.get('trainNo') for item in merged}
+        merged = list(merged)
+        for data in pages[1:]:
+            for item in data.get('realtimePositionList') or []:
+                train_no = item.get('trainNo')
+                if train_no in seen:
+                    continue
+                seen.add(train_no)
+                merged.append(item)
+        return merged
+
+    @staticmethod
+    def _parse_json(body: bytes, line_name: str):
+        """응답 본문을 JSON 으로 파싱합니다. (파싱 시간을 호선별로 기록)"""
+        with METRICS.timer("parse_seconds", line=line_name):
+            return json.loads(body)
+
+    def _get_page(self, line_name: str, page: int):
+        response = self.session.get(self._build_url(line_name, page), timeout=self.timeout)
+        response.raise_for_status()
+        self.stats["pages_fetched"] += 1
+        return self._parse_json(response.content, line_name)
+
+    def _get_pages(self, line_name: str, page_numbers: list):
+        """여러 페이지를 동시에 조회합니다. (한 페이지면 바로 조회)"""
+        if len(page_numbers) == 1:
+            return [self._get_page(line_name, page_numbers[0])]
+        workers = min(len(page_numbers), self.max_concurrency)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda page: self._get_page(line_name, page), page_numbers))
 
     def get_realtime_positions(self, line_name: str):
         """
-        특정 호선의 실시간 열차 위치 정보를 조회합니다.
-        
+        특정 호선의 실시간 열차 위치 정보를 조회합니다. (전체 건수가 한 페이지를 넘으면 모든 페이지를 합침)
+
         Args:
             line_name (str): 조회할 호선명 (예: '1호선', '2호선')
-            
+
         Returns:
             list: 열차 위치 정보 리스트 (실패 시 빈 리스트 반환)
         """
-        # API 키 인코딩 처리 등이 필요할 수 있으나, 일반적으로 raw string 사용
-        # URL 패턴: /api/subway/{KEY}/json/realtimePosition/0/100/{LINE_NAME}
-        url = f"{self.base_url}/{self.api_key}/json/realtimePosition/0/100/{line_name}"
-        
+        started = time.perf_counter()
         try:
-            response = requests.get(url)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            if 'realtimePositionList' in data:
-                return data['realtimePositionList']
-            else:
-                if 'errorMessage' in data:
-                    print(f"[API 오류] {data['errorMessage'].get('message', '알 수 없는 오류')} (Line: {line_name})")
-                return []
-                
+            pages = self._get_pages(line_name, list(range(self._page_hints.get(line_name, 1))))
+            missing = self._plan_pages(line_name, pages)
+            if missing:
+                self.stats["page_refetches"] += 1
+                pages += self._get_pages(line_name, missing)
+            return self._merge_pages(pages, line_name)
+
+        except requests.exceptions.Timeout as e:
+            METRICS.inc("api_errors_total", line=line_name, kind="timeout")
+            print(f"[HTTP 타임아웃] {e}")
+            return []
         except requests.exceptions.RequestException as e:
+            METRICS.inc("api_errors_total", line=line_name, kind="http")
             print(f"[HTTP 요청 오류] {e}")
             return []
         except json.JSONDecodeError:
+            METRICS.inc("api_errors_total", line=line_name, kind="parse")
             print(f"[JSON 파싱 오류] 응답을 분석할 수 없습니다.")
             return []
         except Exception as e:
+            METRICS.inc("api_errors_total", line=line_name, kind="other")
             print(f"[예상치 못한 오류] {e}")
             return []
+        finally:
+            METRICS.observe("fetch_seconds", time.perf_counter() - started, line=line_name)
+
+    async def _get_page_async(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore,
+                              line_name: str, page: int):
+        async with semaphore:
+            async with session.get(self._build_url(line_name, page)) as response:
+                response.raise_for_status()
+                self.stats["pages_fetched"] += 1
+                # 서울시 API는 Content-Type이 text/plain 으로 오는 경우가 있어 검사하지 않음
+                body = await response.read()
+        return self._parse_json(body, line_name)
+
+    async def _fetch_line_async(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, line_name: str,
+                                failed: set):
+        """
+        공유 세션으로 한 호선을 비동기 조회합니다. (세마포어로 동시 요청 수 제한)
+        직전 조회 기준으로 필요한 페이지를 처음부터 함께 요청하고, 열차가 늘어 모자랄 때만 나머지를 더 요청합니다.
+        한 페이지라도 실패하면 불완전한 스냅샷 대신 빈 리스트를 반환합니다. (네트워크 오류면 failed 에 호선 추가)
+        """
+        started = time.perf_counter()
+        try:
+            pages = list(await asyncio.gather(
+                *(self._get_page_async(session, semaphore, line_name, page)
+                  for page in range(self._page_hints.get(line_name, 1)))
+            ))
+            missing = self._plan_pages(line_name, pages)
+            if missing:
+                self.stats["page_refetches"] += 1
+                pages += await asyncio.gather(
+                    *(self._get_page_async(session, semaphore, line_name, page) for page in missing)
+                )
+            return self._merge_pages(pages, line_name)
+
+        except asyncio.TimeoutError:
+            METRICS.inc("api_errors_total", line=line_name, kind="timeout")
+            print(f"[HTTP 타임아웃] {self.timeout}초 내 응답 없음 (Line: {line_name})")
+            failed.add(line_name)
+            return []
+        except aiohttp.ClientError as e:
+            METRICS.inc("api_errors_total", line=line_name, kind="http")
+            print(f"[HTTP 요청 오류] {e} (Line: {line_name})")
+            failed.add(line_name)
+            return []
+        except json.JSONDecodeError:
+            METRICS.inc("api_errors_total", line=line_name, kind="parse")
+            print(f"[JSON 파싱 오류] 응답을 분석할 수 없습니다. (Line: {line_name})")
+            return []
+        except Exception as e:
+            METRICS.inc("api_errors_total", line=line_name, kind="other")
+            print(f"[예상치 못한 오류] {e} (Line: {line_name})")
+            return []
+        finally:
+            METRICS.observe("fetch_seconds", time.perf_counter() - started, line=line_name)
+
+    async def _on_connection_create(self, session, ctx, params):
+        self.stats["aio_connections_created"] += 1
+
+    async def _on_connection_reuse(self, session, ctx, params):
+        self.stats["aio_connections_reused"] += 1
+
+    def _get_aio_session(self):
+        """
+        keep-alive 비동기 세션을 반환합니다. 닫혀 있으면 새로 만듭니다. (헬스 체크)
+        """
+        if self._aio_session is None or self._aio_session.closed:
+            trace = aiohttp.TraceConfig()
+            trace.on_connection_create_end.append(self._on_connection_create)
+            trace.on_connection_reuseconn.append(self._on_connection_reuse)
+            self._aio_session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=75),
+                trace_configs=[trace],
+            )
+        return self._aio_session
+
+    async def get_all_positions_async(self, line_names: list):
+        """
+        여러 호선의 실시간 위치를 하나의 HTTP 세션으로 동시에 조회합니다.
+        사이클 소요 시간은 호선별 합계가 아니라 가장 느린 호선의 응답 시간에 가까워집니다.
+        세션은 호출 사이에 유지되어 TCP 연결을 재사용합니다.
+
+        Args:
+            line_names (list): 조회할 호선명 리스트
+
+        Returns:
+            dict: {호선명: 열차 위치 정보 리스트} (실패한 호선은 빈 리스트)
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        session = self._get_aio_session()
+        failed = set()
+
+        results = await asyncio.gather(
+            *(self._fetch_line_async(session, semaphore, line, failed) for line in line_names)
+        )
+
+        # 모든 호선이 네트워크 오류로 실패했다면 세션을 버리고 다음 틱에 재연결 (겹친 작업이 이미 바꿨으면 그대로 둠)
+        if line_names and len(failed) == len(line_names) and session is self._aio_session and not session.closed:
+            print("[HTTP 세션 재설정] 모든 호선 요청이 실패하여 세션을 다시 만듭니다.")
+            await session.close()
+            self.stats["aio_session_resets"] += 1
+
+        return dict(zip(line_names, results))
+
+    def _get_loop(self):
+        """
+        수집 전용 스레드에서 돌고 있는 이벤트 루프를 반환합니다. (없으면 시작)
+        """
+        with self._loop_lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(target=self._loop.run_forever, name="api-loop", daemon=True)
+                self._loop_thread.start()
+            return self._loop
+
+    def get_all_positions(self, line_names: list):
+        """
+        get_all_positions_async 의 동기 래퍼 (스케줄러 job 등 동기 코드에서 사용)
+        같은 이벤트 루프를 계속 사용해야 세션(연결)이 틱 사이에 재사용됩니다.
+        여러 스레드에서 동시에 호출해도 되며, 조회는 루프 스레드에서 함께 진행됩니다.
+        """
+        return asyncio.run_coroutine_threadsafe(self.get_all_positions_async(line_names), self._get_loop()).result()
+
+    def connection_stats(self):
+        """
+        HTTP 연결 생성/재사용 횟수를 반환합니다.
+        """
+        stats = dict(self.stats)
+        created = requests_total = 0
+        # http/https 에 같은 어댑터를 마운트했으므로 중복 제거
+        for adapter in {id(a): a for a in self.session.adapters.values()}.values():
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                created += pool.num_connections
+                requests_total += pool.num_requests
+        stats["sync_connections_created"] = created
+        stats["sync_connections_reused"] = max(requests_total - created, 0)
+        return stats
+
+    def close(self):
+        """
+        유지 중인 HTTP 세션과 이벤트 루프를 정리합니다.
+        """
+        self.session.close()
+        if self._loop is not None and not self._loop.is_closed():
+            if self._aio_session is not None and not self._aio_session.closed:
+                asyncio.run_coroutine_threadsafe(self._aio_session.close(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop_thread.join()
+            self._loop.close()
@@ -4,6 +4,18 @@ from dotenv import load_dotenv
 # .env 파일 로드 (상위 디렉토리 탐색)
 load_dotenv()
 
+def _parse_line_intervals(value: str):
+    """
+    '2호선=15,9호선=30' 형태의 호선별 수집 주기(초) 설정을 dict 로 변환합니다.
+    """
+    intervals = {}
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        line, _, sec = part.partition("=")
+        intervals[line.strip()] = float(sec)
+    return intervals
+
 class Config:
     """
     환경 변수 및 설정 값을 관리하는 클래스
@@ -14,7 +26,119 @@ class Config:
     
     # 서울시 실시간 지하철 위치 API URL
     BASE_API_URL = "http://swopenAPI.seoul.go.kr/api/subway"
+
+    # 수집할 호선 목록 (서울시 공공데이터 포털 기준 정의된 호선명)
+    TARGET_LINES = ["1호선", "2호선", "3호선", "4호선", "5호선", "6호선", "7호선", "8호선", "9호선"]
+
+    # 수집 주기(초) - 1분 미만도 가능하며, 벽시계 경계(예: 15초면 :00/:15/:30/:45)에 맞춰 실행
+    COLLECT_INTERVAL_SEC = float(os.getenv("COLLECT_INTERVAL_SEC", "60"))
+    # 호선별 수집 주기(초): 예) LINE_INTERVALS="2호선=15,9호선=30" (지정하지 않은 호선은 COLLECT_INTERVAL_SEC)
+    LINE_INTERVALS = _parse_line_intervals(os.getenv("LINE_INTERVALS", ""))
+    # 이전 수집이 끝나기 전에 다음 틱이 온 경우: skip(건너뜀) / coalesce(끝난 뒤 한 번 더) / parallel(겹쳐 실행)
+    OVERRUN_POLICY = os.getenv("OVERRUN_POLICY", "coalesce")
+
+    # 적응형 수집: LINE_INTERVALS 로 고정하지 않은 호선의 주기를 변화량/운행 시간대에 맞춰 자동 조정
+    # 위치가 자주 바뀌는 호선은 자주, 조용하거나 운행 시간이 아닌 호선은 드물게 조회 (호출당 유효 데이터 증가)
+    ADAPTIVE_POLLING = os.getenv("ADAPTIVE_POLLING", "true").lower() == "true"
+    # 하루 API 호출 한도 (기본값: 전 호선을 1분마다 조회할 때와 같은 호출 수)
+    API_DAILY_QUOTA = int(os.getenv("API_DAILY_QUOTA", str(len(TARGET_LINES) * 1440)))
+    # 조회할 호선이 있는지 확인하는 주기(초), 적응형 주기의 하한/상한(초), 운행 시간 외 주기(초)
+    # (상한보다 하루 호출 한도가 우선 → 한도가 빠듯하면 상한을 넘겨 운행 시간 외 주기까지 늘어날 수 있음)
+    POLL_TICK_SEC = float(os.getenv("POLL_TICK_SEC", "5"))
+    POLL_MIN_INTERVAL_SEC = float(os.getenv("POLL_MIN_INTERVAL_SEC", "15"))
+    POLL_MAX_INTERVAL_SEC = float(os.getenv("POLL_MAX_INTERVAL_SEC", "120"))
+    POLL_OFF_HOURS_INTERVAL_SEC = float(os.getenv("POLL_OFF_HOURS_INTERVAL_SEC", "600"))
+    # 운행 시간대 (KST, 자정을 넘기면 종료 시각이 더 이름)
+    SERVICE_HOURS = os.getenv("SERVICE_HOURS", "05:00-01:30")
+
+    # 비동기 수집 설정: 동시 요청 수 상한, 요청당 타임아웃(초)
+    API_MAX_CONCURRENCY = int(os.getenv("API_MAX_CONCURRENCY", "9"))
+    API_TIMEOUT_SEC = float(os.getenv("API_TIMEOUT_SEC", "10"))
+    # 한 번에 받을 행 수 - 전체 건수(list_total_count)가 더 많으면 나머지 페이지를 동시에 조회
+    API_PAGE_SIZE = int(os.getenv("API_PAGE_SIZE", "100"))
+
+    # 장기 실행 런타임 설정: DB 헬스 체크 주기(초)
+    DB_HEALTH_CHECK_INTERVAL_SEC = int(os.getenv("DB_HEALTH_CHECK_INTERVAL_SEC", "300"))
+
+    # 변경분만 저장: 역/상태/방향/종착역이 바뀐 열차만 저장 (0분이면 하트비트 저장 안 함)
+    CHANGE_ONLY_INGESTION = os.getenv("CHANGE_ONLY_INGESTION", "true").lower() == "true"
+    HEARTBEAT_MINUTES = float(os.getenv("HEARTBEAT_MINUTES", "5"))
+
+    # 수집 루프 안에서 스냅샷마다 지표를 갱신하는 실시간 분석 사용 여부
+    LIVE_ANALYSIS = os.getenv("LIVE_ANALYSIS", "true").lower() == "true"
+
+    # 실시간 경보 (열차 몰림/간격 벌어짐/장기 정차): 역/방향별 배차 간격·정차 시간 기준값을 EWMA 로 학습
+    # 기준값 대비 ALERT_SIGMA 표준편차를 벗어나면 경보, 기준값이 ALERT_MIN_SAMPLES 건 쌓이기 전에는 간격 경보 없음
+    REALTIME_ALERTS = os.getenv("REALTIME_ALERTS", "true").lower() == "true"
+    ALERT_EWMA_ALPHA = float(os.getenv("ALERT_EWMA_ALPHA", "0.1"))
+    ALERT_SIGMA = float(os.getenv("ALERT_SIGMA", "3"))
+    ALERT_MIN_SAMPLES = int(os.getenv("ALERT_MIN_SAMPLES", "8"))
+
+    # 열차별 현재 위치를 메모리에 유지하고 FLEET_API_PORT 로 조회 API 제공 (0 이면 API 서버를 띄우지 않음)
+    # 스냅샷이 비어 있는 호선(조회 실패 등)의 열차는 FLEET_EVICT_SEC 동안 마지막 위치를 유지
+    FLEET_STATE = os.getenv("FLEET_STATE", "true").lower() == "true"
+    FLEET_API_HOST = os.getenv("FLEET_API_HOST", "127.0.0.1")
+    FLEET_API_PORT = int(os.getenv("FLEET_API_PORT", "9109"))
+    FLEET_EVICT_SEC = float(os.getenv("FLEET_EVICT_SEC", "600"))
+
+    # 분석용 로컬 캐시: 이미 받은 이력을 Parquet 으로 보관하고 이후 증가분만 조회
+    USE_LOCAL_CACHE = os.getenv("USE_LOCAL_CACHE", "true").lower() == "true"
+    CACHE_DIR = os.getenv(
+        "CACHE_DIR",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache"),
+    )
+    # 캐시가 비어 있을 때 처음 받아올 기간(일)
+    CACHE_BOOTSTRAP_DAYS = float(os.getenv("CACHE_BOOTSTRAP_DAYS", "7"))
+    # 증분 조회 때 마지막으로 받은 created_at 보다 이만큼(초) 앞에서부터 다시 읽음
+    # (id 는 INSERT 시점에 정해지지만 보이는 건 커밋 이후라, 늦게 커밋된 작은 id 의 행을 놓치지 않도록)
+    CACHE_OVERLAP_SEC = float(os.getenv("CACHE_OVERLAP_SEC", "300"))
+
+    # 로컬 스풀: 수집 데이터를 SQLite(WAL) 파일에 먼저 기록하고, 백그라운드에서 큰 배치로 DB 에 반영
+    # DB 가 느리거나 중단되어도 수집 주기를 유지하고, 복구되면 밀린 데이터를 이어서 저장함
+    USE_SPOOL = os.getenv("USE_SPOOL", "true").lower() == "true"
+    SPOOL_PATH = os.getenv(
+        "SPOOL_PATH",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".spool", "positions.db"),
+    )
+    SPOOL_FLUSH_BATCH = int(os.getenv("SPOOL_FLUSH_BATCH", "5000"))
+    SPOOL_FLUSH_INTERVAL_SEC = float(os.getenv("SPOOL_FLUSH_INTERVAL_SEC", "2"))
+    SPOOL_MAX_BACKOFF_SEC = float(os.getenv("SPOOL_MAX_BACKOFF_SEC", "60"))
+
+    # 저장소 관리 (docs/schema.sql 의 파티션/롤업 함수를 수집기가 1시간마다 호출)
+    # pg_cron 으로 DB 에서 직접 돌리는 경우 false 로 끔
+    STORAGE_MAINTENANCE = os.getenv("STORAGE_MAINTENANCE", "true").lower() == "true"
+    # 미리 만들어 둘 일 파티션 수(일), 원본 로그 보존 기간(일)
+    PARTITION_DAYS_AHEAD = int(os.getenv("PARTITION_DAYS_AHEAD", "3"))
+    RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "30"))
+    # 시간별 롤업을 다시 계산할 최근 구간(시간) - 늦게 도착한 로그도 반영되도록 여유를 둠
+    ROLLUP_LOOKBACK_HOURS = int(os.getenv("ROLLUP_LOOKBACK_HOURS", "3"))
+
+    # 수집 단계별 지표 (조회/파싱/변환/DB 저장/사이클 지연, 행/오류 수)
+    # METRICS_PORT 의 /metrics 로 Prometheus 형식 노출 (0 이면 서버를 띄우지 않음)
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+    # 사이클별 JSON 지표 로그를 추가할 파일 (비우면 표준 출력)
+    METRICS_LOG_PATH = os.getenv("METRICS_LOG_PATH", "")
     
+    @staticmethod
+    def line_groups():
+        """
+        수집 주기별 호선 목록 {주기(초): [호선, ...]} (TARGET_LINES 순서 유지)
+        """
+        groups = {}
+        for line in Config.TARGET_LINES:
+            interval = Config.LINE_INTERVALS.get(line, Config.COLLECT_INTERVAL_SEC)
+            groups.setdefault(interval, []).append(line)
+        return groups
+
+    @staticmethod
+    def adaptive_lines():
+        """
+        적응형 수집 대상 호선 (LINE_INTERVALS 로 주기를 고정한 호선 제외)
+        """
+        return [line for line in Config.TARGET_LINES if line not in Config.LINE_INTERVALS]
+
     @staticmethod
     def validate():
         """필수 환경 변수가 설정되어 있는지 확인"""
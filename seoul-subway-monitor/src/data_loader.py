@@ -1,39 +1,253 @@
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from config import Config
 from db_client import SupabaseClient
+from history_cache import HistoryCache, to_utc
+from event_time import add_event_time
+from frames import compact_frame
+from profiling import stage
+
+TABLE_NAME = "realtime_subway_positions"
+
+# PostgREST 기본 응답 상한(1000행)에 맞춘 페이지 크기
+PAGE_SIZE = 1000
+
+# 캐시에 한 번에 기록할 최대 행 수 (작은 파일이 너무 많이 생기지 않도록 모아서 기록)
+CACHE_WRITE_BATCH = 50000
 
 class DataLoader:
     """
     데이터 분석을 위한 공통 데이터 로더
     """
-    def __init__(self):
-        self.db = SupabaseClient()
+    def __init__(self, db: SupabaseClient = None, use_cache: bool = None):
+        self.db = db or SupabaseClient()
+        use_cache = Config.USE_LOCAL_CACHE if use_cache is None else use_cache
+        # 로컬 캐시 (비활성화 시 None → 매번 Supabase 에서 조회)
+        self.cache = HistoryCache(Config.CACHE_DIR) if use_cache else None
+
+    @staticmethod
+    def _to_frame(rows: list):
+        """
+        조회 결과(list of dict)를 DataFrame으로 변환하고 시간 컬럼과 타입을 정리합니다.
+        코드값은 int8, 이름은 category 로 변환하여 행당 메모리를 줄입니다. (frames.compact_frame)
+        """
+        with stage("dataframe"):
+            df = pd.DataFrame(rows)
+        if df.empty:
+            return df
+
+        # 시간 컬럼 변환 (event_time: API 수신 시각, 분석 기준 시각)
+        with stage("to_datetime"):
+            df['created_at'] = pd.to_datetime(df['created_at'])
+        with stage("event_time"):
+            df = add_event_time(df)
+        with stage("compact"):
+            return compact_frame(df)
+
+    def _fetch_page(self, offset: int, size: int, start=None, end=None, columns: str = "*", desc: bool = False):
+        """
+        created_at 구간 [start, end) 의 offset 번째부터 size 건을 조회합니다.
+        페이지 경계가 흔들리지 않도록 (created_at, id) 순으로 정렬합니다.
+        """
+        query = self.db.client.table(TABLE_NAME).select(columns)
+        if start is not None:
+            query = query.gte("created_at", pd.Timestamp(start).isoformat())
+        if end is not None:
+            query = query.lt("created_at", pd.Timestamp(end).isoformat())
+        response = query \
+            .order("created_at", desc=desc) \
+            .order("id", desc=desc) \
+            .range(offset, offset + size - 1) \
+            .execute()
+        return response.data or []
+
+    def iter_chunks(self, start, end=None, chunk_size: int = PAGE_SIZE, prefetch: int = 2, columns: str = "*"):
+        """
+        created_at 이 [start, end) 인 데이터를 DataFrame 청크 단위로 순차 반환하는 제너레이터.
+        최대 prefetch 개의 다음 페이지를 미리 병렬 조회하므로, 며칠치 데이터도
+        메모리 사용량을 일정하게 유지하면서 순회할 수 있습니다.
+
+        Args:
+            start: 조회 시작 시각 (포함)
+            end: 조회 종료 시각 (미포함, 기본값: 현재)
+            chunk_size (int): 청크(페이지) 크기. PostgREST 상한(1000)을 넘기면 잘릴 수 있음
+            prefetch (int): 미리 조회해 둘 페이지 수
+            columns (str): select 컬럼 목록
+
+        Yields:
+            pd.DataFrame: 시간순으로 정렬된 데이터 청크
+        """
+        end = end or datetime.now(timezone.utc)
+        prefetch = max(prefetch, 1)
+
+        with ThreadPoolExecutor(max_workers=prefetch) as executor:
+            pending = []
+            next_offset = 0
+
+            def submit():
+                nonlocal next_offset
+                pending.append(executor.submit(self._fetch_page, next_offset, chunk_size, start, end, columns))
+                next_offset += chunk_size
+
+            for _ in range(prefetch):
+                submit()
+
+            while pending:
+                rows = pending.pop(0).result()
+                if len(rows) < chunk_size:
+                    # 마지막 페이지 → 미리 요청해 둔 이후 페이지는 버림
+                    for future in pending:
+                        future.cancel()
+                    pending = []
+                else:
+                    submit()
+
+                if rows:
+                    with stage("to_frame"):
+                        chunk = self._to_frame(rows)
+                    yield chunk
+
+    def iter_new_rows(self, start, after_id: int = None, chunk_size: int = PAGE_SIZE):
+        """
+        created_at >= start 인 행을 id 순으로 페이지 단위 조회하는 제너레이터 (keyset 페이지네이션)
+        after_id 가 있으면 id > after_id 인 행부터 조회합니다.
+        """
+        last_id = after_id
+        while True:
+            query = self.db.client.table(TABLE_NAME).select("*") \
+                .gte("created_at", pd.Timestamp(start).isoformat())
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            rows = query.order("id").limit(chunk_size).execute().data or []
+            if not rows:
+                return
+            with stage("to_frame"):
+                chunk = self._to_frame(rows)
+            yield chunk
+            if len(rows) < chunk_size:
+                return
+            last_id = rows[-1]["id"]
+
+    def sync_cache(self):
+        """
+        캐시의 마지막 created_at 이후에 새로 쌓인 행만 받아 캐시에 추가합니다.
+        - 늦게 커밋된 행(더 작은 id)을 놓치지 않도록 CACHE_OVERLAP_SEC 만큼 겹쳐 읽고,
+          이미 캐시에 있는 id 는 건너뜁니다.
+        - 캐시가 비어 있으면 최근 CACHE_BOOTSTRAP_DAYS 일치부터 받아옵니다.
+
+        Returns:
+            int: 새로 받은 행 수
+        """
+        if self.cache is None:
+            return 0
+
+        covered_from = None
+        if self.cache.max_created_at is None:
+            start = covered_from = datetime.now(timezone.utc) - timedelta(days=Config.CACHE_BOOTSTRAP_DAYS)
+            cached_ids = set()
+        else:
+            start = self.cache.max_created_at - timedelta(seconds=Config.CACHE_OVERLAP_SEC)
+            cached_ids = self.cache.ids_since(start)
+
+        fetched = 0
+        buffer = []
+        buffered = 0
+        for chunk in self.iter_new_rows(start):
+            if self.cache.columns and list(chunk.columns) != self.cache.columns:
+                # DB 스키마가 바뀌었으면 캐시를 비우고 다시 받음
+                print("[캐시 초기화] 테이블 컬럼이 변경되어 로컬 캐시를 다시 만듭니다.")
+                self.cache.reset()
+                return self.sync_cache()
+
+            if cached_ids:
+                chunk = chunk[~chunk["id"].isin(cached_ids)]
+                if chunk.empty:
+                    continue
+            buffer.append(chunk)
+            buffered += len(chunk)
+            fetched += len(chunk)
+            if buffered >= CACHE_WRITE_BATCH:
+                self.cache.append(pd.concat(buffer, ignore_index=True), covered_from=covered_from)
+                buffer, buffered = [], 0
+
+        if buffer:
+            self.cache.append(pd.concat(buffer, ignore_index=True), covered_from=covered_from)
+        return fetched
+
+    def fetch_window(self, start, end=None, **kwargs):
+        """
+        created_at 이 [start, end) 인 전체 데이터를 하나의 DataFrame으로 반환합니다.
+        캐시가 켜져 있고 구간이 캐시 범위 안이면 증가분만 받은 뒤 로컬에서 읽습니다.
+        """
+        if self.cache is not None:
+            try:
+                with stage("sync_cache"):
+                    self.sync_cache()
+                covered_from = self.cache.covered_from
+                if covered_from is not None and to_utc(start) >= covered_from:
+                    with stage("cache_read"):
+                        df = self.cache.read(start, end)
+                    if not df.empty:
+                        with stage("compact"):
+                            return compact_frame(df)
+            except Exception as e:
+                print(f"[캐시 오류] {e} → Supabase 에서 직접 조회합니다.")
+
+        try:
+            with stage("fetch"):
+                chunks = list(self.iter_chunks(start, end, **kwargs))
+        except Exception as e:
+            print(f"[데이터 로드 오류] {e}")
+            return pd.DataFrame()
+
+        if not chunks:
+            print("[데이터 로드 경고] 데이터가 없습니다. main.py를 실행하여 데이터를 먼저 수집해주세요.")
+            return pd.DataFrame()
+        with stage("concat"):
+            return pd.concat(chunks, ignore_index=True)
+
+    def fetch_recent(self, days: float = 1, **kwargs):
+        """
+        최근 n일 간의 데이터를 DataFrame으로 반환합니다.
+        """
+        start = datetime.now(timezone.utc) - timedelta(days=days)
+        return self.fetch_window(start, **kwargs)
 
     def fetch_data(self, limit=5000):
         """
         Supabase에서 최신 데이터를 가져와 DataFrame으로 반환
+        PostgREST 응답 상한(1000행)에 잘리지 않도록 페이지 단위로 나누어 조회합니다.
+        캐시가 켜져 있으면 증가분만 받은 뒤 로컬 캐시에서 최신 limit 건을 읽습니다.
         """
+        if self.cache is not None:
+            try:
+                with stage("sync_cache"):
+                    self.sync_cache()
+                with stage("cache_read"):
+                    df = self.cache.read_latest(limit)
+                if not df.empty:
+                    with stage("compact"):
+                        return compact_frame(df)
+            except Exception as e:
+                print(f"[캐시 오류] {e} → Supabase 에서 직접 조회합니다.")
+
         try:
-            # 데이터가 많아질 경우를 대비해 limit을 적절히 조정
-            response = self.db.client.table("realtime_subway_positions") \
-                .select("*") \
-                .order("created_at", desc=True) \
-                .limit(limit) \
-                .execute()
-            
-            data = response.data
-            if not data:
+            rows = []
+            with stage("fetch"):
+                while len(rows) < limit:
+                    size = min(PAGE_SIZE, limit - len(rows))
+                    page = self._fetch_page(len(rows), size, desc=True)
+                    rows.extend(page)
+                    if len(page) < size:
+                        break
+
+            if not rows:
                 print("[데이터 로드 경고] 데이터가 없습니다. main.py를 실행하여 데이터를 먼저 수집해주세요.")
                 return pd.DataFrame()
 
-            df = pd.DataFrame(data)
-            
-            # 시간 컬럼 변환
-            df['created_at'] = pd.to_datetime(df['created_at'])
-            
-            # 분석에 필요한 경우 숫자형 변환
-            # df['station_id'] = pd.to_numeric(df['station_id'], errors='coerce')
-            
-            return df
+            with stage("to_frame"):
+                return self._to_frame(rows)
         except Exception as e:
             print(f"[데이터 로드 오류] {e}")
             return pd.DataFrame()
@@ -1,5 +1,17 @@
+import time
 from supabase import create_client, Client
 from config import Config
+from event_time import parse_recptn_dt
+from metrics import METRICS
+
+def to_int(value):
+    """
+    API 의 숫자 문자열('1002', '1' 등)을 정수로 변환합니다. (없거나 형식이 맞지 않으면 None)
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
 
 class SupabaseClient:
     """
@@ -10,6 +22,60 @@ class SupabaseClient:
         self.url: str = Config.SUPABASE_URL
         self.key: str = Config.SUPABASE_KEY
         self.client: Client = create_client(self.url, self.key)
+
+    def health_check(self):
+        """
+        가벼운 조회 1건으로 DB 연결 상태를 확인합니다.
+
+        Returns:
+            bool: 정상 응답 여부
+        """
+        try:
+            self.client.table("realtime_subway_positions").select("id").limit(1).execute()
+            return True
+        except Exception as e:
+            print(f"[DB 헬스 체크 실패] {e}")
+            return False
+
+    def reconnect(self):
+        """
+        Supabase 클라이언트를 새로 생성합니다. (연결 장애 복구용)
+        """
+        self.client = create_client(self.url, self.key)
+
+    def maintain_partitions(self, days_ahead: int, retention_days: int):
+        """
+        앞으로 쓸 일 파티션을 미리 만들고 보존 기간이 지난 파티션을 삭제합니다. (DB 함수 호출)
+
+        Returns:
+            dict: {'created': 생성 수, 'dropped': 삭제 수} (실패 시 None)
+        """
+        try:
+            response = self.client.rpc("maintain_position_partitions", {
+                "p_days_ahead": days_ahead,
+                "p_retention_days": retention_days,
+            }).execute()
+            return response.data
+        except Exception as e:
+            print(f"[파티션 관리 오류] {e}")
+            return None
+
+    def refresh_rollups(self, start, end):
+        """
+        [start, end) 구간의 시간별 배차 간격/체류 시간 롤업을 다시 계산합니다. (DB 함수 호출)
+
+        Returns:
+            dict: {'headway_rows': 행 수, 'dwell_rows': 행 수} (실패 시 None)
+        """
+        try:
+            response = self.client.rpc("refresh_hourly_rollups", {
+                "p_from": start.isoformat(),
+                "p_to": end.isoformat(),
+            }).execute()
+            return response.data
+        except Exception as e:
+            print(f"[롤업 갱신 오류] {e}")
+            return None
         
     def insert_positions(self, data_list: list):
         """
@@ -24,33 +90,42 @@ class SupabaseClient:
         if not data_list:
             return False
             
+        transform_started = time.perf_counter()
         formatted_data = []
         
         for item in data_list:
-            # 스키마 매핑
+            # API 수신 시각(KST) → TIMESTAMPTZ 로 저장할 event_time
+            event_time = parse_recptn_dt(item.get("recptnDt"))
+
+            # 스키마 매핑 (ID/코드값은 정수 컬럼으로 저장)
             record = {
-                "line_id": item.get("subwayId"),
+                "line_id": to_int(item.get("subwayId")),
                 "line_name": item.get("subwayNm"),
-                "station_id": item.get("statnId"),
+                "station_id": to_int(item.get("statnId")),
                 "station_name": item.get("statnNm"),
                 "train_number": item.get("trainNo"),
                 "last_rec_date": item.get("lastRecptnDt"),
                 "last_rec_time": item.get("recptnDt"),
-                "direction_type": item.get("updnLine"),
-                "dest_station_id": item.get("statnTid"),
+                "direction_type": to_int(item.get("updnLine")),
+                "dest_station_id": to_int(item.get("statnTid")),
                 "dest_station_name": item.get("statnTnm"),
-                "train_status": item.get("trainSttus"),
-                "is_express": item.get("directAt"),
-                "is_last_train": True if item.get("lstcarAt") == '1' else False
+                "train_status": to_int(item.get("trainSttus")),
+                "is_express": to_int(item.get("directAt")),
+                "is_last_train": True if item.get("lstcarAt") == '1' else False,
+                "event_time": event_time.isoformat() if event_time else None
             }
             formatted_data.append(record)
+        METRICS.observe("transform_seconds", time.perf_counter() - transform_started)
             
         try:
             # bulk insert
             # v2.0.0+ 에서는 data, count = ... 형식이 아닐 수 있음. response.data 확인 필요.
-            response = self.client.table("realtime_subway_positions").insert(formatted_data).execute()
+            with METRICS.timer("db_write_seconds"):
+                response = self.client.table("realtime_subway_positions").insert(formatted_data).execute()
             # 에러가 발생하지 않으면 성공으로 간주
+            METRICS.inc("db_rows_written_total", len(formatted_data))
             return True
         except Exception as e:
+            METRICS.inc("db_errors_total")
             print(f"[DB 저장 오류] {e}")
             return False
@@ -0,0 +1,106 @@
+import time
+
+class ChangeFilter:
+    """
+    직전 스냅샷과 비교해 위치/상태가 바뀐 열차만 골라내는 필터
+    - 키: (호선 ID, 열차 번호)
+    - 비교 대상: 역, 운행 상태, 상/하행, 종착역
+    - heartbeat_minutes 가 지정되면 변화가 없어도 N분마다 한 번씩 저장합니다.
+    """
+
+    # API 원본 필드 기준 (subwayId, trainNo) / (statnId, trainSttus, updnLine, statnTid)
+    KEY_FIELDS = ("subwayId", "trainNo")
+    STATE_FIELDS = ("statnId", "trainSttus", "updnLine", "statnTid")
+
+    def __init__(self, heartbeat_minutes: float = 0, evict_after_minutes: float = 60):
+        self.heartbeat_sec = heartbeat_minutes * 60
+        self.evict_after_sec = evict_after_minutes * 60
+        # (호선 ID, 열차 번호) -> (상태 튜플, 마지막 저장 시각, 마지막 관측 시각)
+        self._last = {}
+        self._pending = {}
+        self.begin_cycle()
+
+    def _key(self, item: dict):
+        return tuple(item.get(f) for f in self.KEY_FIELDS)
+
+    def _state(self, item: dict):
+        return tuple(item.get(f) for f in self.STATE_FIELDS)
+
+    def begin_cycle(self):
+        """
+        수집 사이클 시작 시 호출하여 사이클 통계를 초기화합니다.
+        """
+        self.cycle_total = 0
+        self.cycle_written = 0
+
+    def filter(self, data_list: list, now: float = None):
+        """
+        변경된 열차(또는 하트비트 대상)만 반환합니다.
+        캐시는 commit() 호출 시 갱신되므로, 저장에 실패하면 다음 사이클에 다시 저장됩니다.
+
+        Args:
+            data_list (list): API 원본 데이터 리스트
+
+        Returns:
+            list: 저장할 데이터 리스트
+        """
+        now = time.time() if now is None else now
+        changed = []
+
+        for item in data_list:
+            key = self._key(item)
+            state = self._state(item)
+            prev = self._last.get(key)
+
+            if prev is None or prev[0] != state:
+                changed.append(item)
+            elif self.heartbeat_sec and now - prev[1] >= self.heartbeat_sec:
+                changed.append(item)
+            else:
+                # 변화 없음 → 관측 시각만 갱신
+                self._last[key] = (prev[0], prev[1], now)
+
+        self._pending = {self._key(item): self._state(item) for item in changed}
+        self.cycle_total += len(data_list)
+        self.cycle_written += len(changed)
+        return changed
+
+    def take_pending(self, now: float = None):
+        """
+        마지막 filter() 결과를 commit() 용 토큰으로 꺼냅니다.
+        (호출하는 쪽 잠금 밖에서 저장하는 동안 다른 작업이 filter() 해도 섞이지 않음)
+        """
+        now = time.time() if now is None else now
+        pending, self._pending = self._pending, {}
+        return now, pending
+
+    def commit(self, now: float = None, token: tuple = None):
+        """
+        마지막 filter() 결과(token 을 주면 그 결과)가 저장되었음을 기록하고 오래 보이지 않은 열차를 캐시에서 제거합니다.
+        token 보다 나중에 filter() 한 작업이 먼저 저장한 열차는 그 최신 상태를 유지합니다.
+        """
+        now = time.time() if now is None else now
+        if token is None:
+            filtered_at, pending = now, self._pending
+            self._pending = {}
+        else:
+            filtered_at, pending = token
+        for key, state in pending.items():
+            prev = self._last.get(key)
+            if token is not None and prev is not None and prev[1] > filtered_at:
+                continue
+            self._last[key] = (state, now, now)
+
+        if self.evict_after_sec:
+            expired = [k for k, v in self._last.items() if now - v[2] >= self.evict_after_sec]
+            for k in expired:
+                del self._last[k]
+
+    @property
+    def dedup_ratio(self):
+        """
+        이번 사이클에서 저장을 생략한 비율 (0.0 ~ 1.0)
+        """
+        if not self.cycle_total:
+            return 0.0
+        return 1 - self.cycle_written / self.cycle_total
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+
+# 서울시 API 의 recptnDt 는 타임존 표기가 없는 한국 시간(KST, UTC+9, 서머타임 없음)
+KST = timezone(timedelta(hours=9), "KST")
+
+def parse_recptn_dt(value):
+    """
+    API 원본 recptnDt('YYYY-MM-DD HH:MM:SS') 한 건을 KST 타임존이 붙은 datetime 으로 변환합니다.
+    수집 경로에서 행마다 호출되므로 C 구현인 fromisoformat 을 사용합니다.
+
+    Returns:
+        datetime: 변환 결과 (형식이 맞지 않으면 None)
+    """
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=KST)
+    except (TypeError, ValueError):
+        return None
+
+def parse_recptn_series(series: pd.Series):
+    """
+    recptnDt 문자열 컬럼 전체를 한 번에 UTC 기준 datetime 컬럼으로 변환합니다. (실패 시 NaT)
+    """
+    parsed = pd.to_datetime(series, format="ISO8601", errors="coerce")
+    if parsed.dt.tz is None:
+        parsed = parsed.dt.tz_localize(KST)
+    return parsed.dt.tz_convert("UTC")
+
+def add_event_time(df: pd.DataFrame):
+    """
+    분석 기준 시각(event_time) 컬럼을 준비합니다.
+    - DB 에 event_time 이 있으면 그대로 사용
+    - 없는 행(이전에 적재된 데이터)은 last_rec_time 을 파싱하고, 그래도 없으면 created_at 으로 대체
+    """
+    if 'event_time' in df.columns:
+        event_time = pd.to_datetime(df['event_time'], utc=True, format="ISO8601", errors="coerce")
+    else:
+        event_time = pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns, UTC]")
+
+    missing = event_time.isna()
+    if missing.any() and 'last_rec_time' in df.columns:
+        event_time = event_time.where(~missing, parse_recptn_series(df['last_rec_time']))
+        missing = event_time.isna()
+    if missing.any():
+        event_time = event_time.where(~missing, df['created_at'])
+
+    df['event_time'] = event_time
+    return df
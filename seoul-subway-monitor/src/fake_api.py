@@ -0,0 +1,317 @@
+"""
+부하 테스트용 로컬 서울시 실시간 지하철 위치 API(realtimePosition) 대체 서버
+
+실제 swopenAPI 와 같은 URL/JSON 형태로 응답하며, 응답 지연/오류 비율/호선별 열차 수를 조절할 수 있습니다.
+열차 위치는 가상 시계(speed 배속)로 역 사이를 오가도록 합성하거나, record 로 저장한 실제 응답을 재생합니다.
+
+실행 예:
+    python src/fake_api.py serve --port 8089 --speed 10 --trains 40 --line-trains "2호선=120" --latency-ms 80
+    python src/fake_api.py record --out recording.jsonl --minutes 30   # 실제 API 응답 녹화 (SEOUL_API_KEY 필요)
+    python src/fake_api.py serve --recording recording.jsonl --speed 10
+"""
+import argparse
+import asyncio
+import bisect
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+from aiohttp import web
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from event_time import KST
+
+# 호선명 → subwayId (서울시 API 기준)
+LINE_IDS = {
+    "1호선": "1001", "2호선": "1002", "3호선": "1003", "4호선": "1004", "5호선": "1005",
+    "6호선": "1006", "7호선": "1007", "8호선": "1008", "9호선": "1009",
+    "경의중앙선": "1063", "공항철도": "1065", "경춘선": "1067",
+    "수인분당선": "1075", "신분당선": "1077", "우이신설선": "1092",
+}
+
+# 합성 노선: 호선마다 역 수, 역 하나를 지나는 데 걸리는 시간(초)과 그중 정차 시간(초)
+STATIONS_PER_LINE = 30
+SEGMENT_SEC = 120
+DWELL_SEC = 30
+# 출발 상태로 보이는 시간, 다음 역 진입 상태로 보이는 시간(초)
+DEPART_SEC = 10
+APPROACH_SEC = 20
+
+# 급행을 섞어 운행하는 호선 (열차 3대 중 1대)
+EXPRESS_LINES = ("9호선",)
+
+NO_DATA = {"status": 500, "code": "INFO-200", "message": "해당하는 데이터가 없습니다.",
+           "link": "", "developerMessage": "", "total": 0}
+
+# 주입할 API 오류 응답 (실제 API 가 쓰는 두 가지 형태: errorMessage / RESULT)
+API_ERRORS = [
+    {"errorMessage": {"status": 500, "code": "ERROR-337", "message": "일별 트래픽 제한을 넘은 호출입니다.",
+                      "link": "", "developerMessage": "", "total": 0}},
+    {"RESULT": {"CODE": "ERROR-500", "MESSAGE": "서버 오류입니다."}},
+]
+
+def parse_line_counts(value: str):
+    """'2호선=120,9호선=30' 형태의 호선별 열차 수 설정을 dict 로 변환합니다."""
+    counts = {}
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        line, _, count = part.partition("=")
+        counts[line.strip()] = int(count)
+    return counts
+
+class FakeSeoulAPI:
+    """
+    realtimePosition 응답을 만드는 가상 API
+    - 가상 시계는 생성 시각에서 시작해 실제 시간의 speed 배로 흐릅니다. (recptnDt 도 가상 시각)
+    - recording 을 주면 녹화된 스냅샷 중 가상 시계에 맞는 것을, 없으면 합성 열차 위치를 반환합니다.
+    """
+
+    def __init__(self, trains: int = 40, line_trains: dict = None, speed: float = 1.0,
+                 latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 api_error_rate: float = 0.0, recording: str = None, seed: int = 0):
+        self.trains = trains
+        self.line_trains = line_trains or {}
+        self.speed = speed
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.api_error_rate = api_error_rate
+        self.random = random.Random(seed)
+        self.real_start = time.time()
+        self.snapshots = self._load_recording(recording) if recording else None
+        if self.snapshots:
+            self.recording_start = min(times[0] for times, _ in self.snapshots.values())
+        self.stats = {"requests": 0, "rows_served": 0, "http_errors": 0, "api_errors": 0}
+
+    def sim_now(self):
+        """가상 시계의 현재 시각 (epoch 초)"""
+        return self.real_start + (time.time() - self.real_start) * self.speed
+
+    @staticmethod
+    def _load_recording(path: str):
+        """
+        record 로 저장한 JSONL({"at": epoch 초, "line": 호선명, "rows": [...]})을 읽습니다.
+
+        Returns:
+            dict: {호선명: ([시각, ...], [행 목록, ...])} (시간순)
+        """
+        entries = {}
+        with open(path, encoding="utf-8") as f:
+            for raw in f:
+                if raw.strip():
+                    entry = json.loads(raw)
+                    entries.setdefault(entry["line"], []).append((entry["at"], entry["rows"]))
+        snapshots = {}
+        for line, items in entries.items():
+            items.sort(key=lambda e: e[0])
+            snapshots[line] = ([at for at, _ in items], [rows for _, rows in items])
+        return snapshots
+
+    def rows(self, line_name: str):
+        """가상 시계 기준 현재 호선의 열차 위치 목록"""
+        if self.snapshots is not None:
+            return self._recorded_rows(line_name)
+        return self._synthetic_rows(line_name, self.sim_now())
+
+    def _recorded_rows(self, line_name: str):
+        # 녹화 시작 시각 + 재생 경과 시간(배속)에 해당하는 마지막 스냅샷 (끝에 도달하면 마지막 것을 유지)
+        if line_name not in self.snapshots:
+            return []
+        times, rows = self.snapshots[line_name]
+        at = self.recording_start + (self.sim_now() - self.real_start)
+        return rows[max(bisect.bisect_right(times, at) - 1, 0)]
+
+    def _synthetic_rows(self, line_name: str, now: float):
+        """
+        열차를 노선 양 끝 사이에서 등간격으로 왕복시키며 현재 상태를 계산합니다. (시각만으로 결정 → 상태 저장 없음)
+        """
+        line_id = LINE_IDS.get(line_name)
+        count = self.line_trains.get(line_name, self.trains)
+        if line_id is None or count <= 0:
+            return []
+
+        last = STATIONS_PER_LINE - 1
+        cycle = 2 * last * SEGMENT_SEC
+        rows = []
+        for k in range(count):
+            u = (now + k * cycle / count) % cycle
+            segment, within = divmod(u, SEGMENT_SEC)
+            segment = int(segment)
+            up = segment < last
+            origin = segment if up else 2 * last - segment
+            target = origin + 1 if up else origin - 1
+
+            # 정차(도착) → 출발 → 이동(전역출발) → 다음 역 진입
+            if within < DWELL_SEC:
+                station, status, since = origin, "1", 0
+            elif within < DWELL_SEC + DEPART_SEC:
+                station, status, since = origin, "2", DWELL_SEC
+            elif within < SEGMENT_SEC - APPROACH_SEC:
+                station, status, since = target, "3", DWELL_SEC + DEPART_SEC
+            else:
+                station, status, since = target, "0", SEGMENT_SEC - APPROACH_SEC
+            received = datetime.fromtimestamp(now - within + since, KST)
+            terminal = last if up else 0
+
+            rows.append({
+                "subwayId": line_id,
+                "subwayNm": line_name,
+                "statnId": f"{line_id}000{station + 1:03d}",
+                "statnNm": f"{line_name} {station + 1}역",
+                "trainNo": f"{line_id[-1]}{k:03d}",
+                "lastRecptnDt": received.strftime("%Y%m%d"),
+                "recptnDt": received.strftime("%Y-%m-%d %H:%M:%S"),
+                "updnLine": "0" if up else "1",
+                "statnTid": f"{line_id}000{terminal + 1:03d}",
+                "statnTnm": f"{line_name} {terminal + 1}역",
+                "trainSttus": status,
+                "directAt": "1" if line_name in EXPRESS_LINES and k % 3 == 0 else "0",
+                "lstcarAt": "0",
+            })
+        return rows
+
+    async def handle(self, request: web.Request):
+        """
+        GET /api/subway/{key}/json/realtimePosition/{start}/{end}/{line}
+        """
+        self.stats["requests"] += 1
+        if self.latency_ms or self.jitter_ms:
+            delay = max(0.0, self.random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+            await asyncio.sleep(delay)
+
+        if self.random.random() < self.error_rate:
+            self.stats["http_errors"] += 1
+            return web.Response(status=503, text="Service Unavailable")
+        if self.random.random() < self.api_error_rate:
+            self.stats["api_errors"] += 1
+            return web.json_response(self.random.choice(API_ERRORS))
+
+        rows = self.rows(request.match_info["line"])
+        start, end = int(request.match_info["start"]), int(request.match_info["end"])
+        page = rows[start:end]
+        if not page:
+            return web.json_response(NO_DATA)
+
+        self.stats["rows_served"] += len(page)
+        total = len(rows)
+        body = [
+            {"beginRow": None, "endRow": None, "curPage": None, "pageRow": None,
+             "totalCount": total, "rowNum": start + i + 1, "selectedCount": len(page), **row}
+            for i, row in enumerate(page)
+        ]
+        return web.json_response({
+            "errorMessage": {"status": 200, "code": "INFO-000", "message": "정상 처리되었습니다.",
+                             "link": "", "developerMessage": "", "total": total},
+            "realtimePositionList": body,
+        })
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/api/subway/{key}/json/realtimePosition/{start}/{end}/{line}", self.handle)
+        app.router.add_get("/stats", lambda request: web.json_response(self.stats))
+        return app
+
+class FakeServer:
+    """
+    FakeSeoulAPI 를 백그라운드 스레드의 이벤트 루프에서 실행합니다. (main.py 재생 모드에서 사용)
+    """
+
+    def __init__(self, api: FakeSeoulAPI, host: str = "127.0.0.1", port: int = 8089):
+        self.api = api
+        self.host = host
+        self.port = port
+        self._loop = asyncio.new_event_loop()
+        self._runner = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """Config.BASE_API_URL 대신 쓸 주소"""
+        return f"http://{self.host}:{self.port}/api/subway"
+
+    def start(self):
+        self._runner = web.AppRunner(self.api.app(), access_log=None)
+        self._loop.run_until_complete(self._runner.setup())
+        self._loop.run_until_complete(web.TCPSite(self._runner, self.host, self.port).start())
+        self._thread = threading.Thread(target=self._loop.run_forever, name="fake-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(timeout=10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=10)
+        self._loop.close()
+        self._thread = None
+
+def record(out: str, lines: list, minutes: float, interval: float):
+    """
+    실제 API 응답을 interval 초마다 녹화해 JSONL 로 저장합니다. (serve --recording 으로 재생)
+    """
+    from api_client import SeoulSubwayAPI
+
+    api = SeoulSubwayAPI()
+    deadline = time.time() + minutes * 60
+    snapshots = 0
+    try:
+        with open(out, "a", encoding="utf-8") as f:
+            while time.time() < deadline:
+                at = time.time()
+                for line, rows in api.get_all_positions(lines).items():
+                    f.write(json.dumps({"at": at, "line": line, "rows": rows}, ensure_ascii=False) + "\n")
+                f.flush()
+                snapshots += 1
+                print(f"[녹화] {snapshots}회차 저장 ({len(lines)}개 호선)")
+                time.sleep(max(0.0, interval - (time.time() - at)))
+    finally:
+        api.close()
+
+def add_server_arguments(parser: argparse.ArgumentParser):
+    """가상 API 설정 인자 (serve 와 main.py --replay 공통)"""
+    parser.add_argument("--trains", type=int, default=40, help="호선별 열차 수 (기본 40)")
+    parser.add_argument("--line-trains", default="", help="호선별 열차 수 지정 (예: '2호선=120,9호선=30')")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="평균 응답 지연(ms)")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="응답 지연 표준편차(ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="HTTP 503 응답 비율 (0~1)")
+    parser.add_argument("--api-error-rate", type=float, default=0.0, help="API 오류 JSON 응답 비율 (0~1)")
+    parser.add_argument("--recording", default=None, help="record 로 저장한 JSONL (지정 시 합성 대신 재생)")
+
+def api_from_args(args, speed: float):
+    return FakeSeoulAPI(
+        trains=args.trains, line_trains=parse_line_counts(args.line_trains), speed=speed,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        api_error_rate=args.api_error_rate, recording=args.recording,
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="로컬 가상 서울시 실시간 지하철 위치 API")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="가상 API 서버 실행")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8089)
+    serve.add_argument("--speed", type=float, default=1.0, help="가상 시계 배속 (기본 1)")
+    add_server_arguments(serve)
+
+    rec = commands.add_parser("record", help="실제 API 응답 녹화")
+    rec.add_argument("--out", required=True, help="저장할 JSONL 경로 (이어 쓰기)")
+    rec.add_argument("--minutes", type=float, default=30, help="녹화 시간(분)")
+    rec.add_argument("--interval", type=float, default=30, help="녹화 주기(초)")
+    rec.add_argument("--lines", default="", help="녹화할 호선 (쉼표 구분, 기본: TARGET_LINES)")
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        api = api_from_args(args, args.speed)
+        print(f"[가상 API] http://{args.host}:{args.port}/api/subway (배속 {args.speed:g}x)")
+        web.run_app(api.app(), host=args.host, port=args.port, print=None)
+    else:
+        from config import Config
+        lines = [l.strip() for l in args.lines.split(",") if l.strip()] or Config.TARGET_LINES
+        record(args.out, lines, args.minutes, args.interval)
@@ -0,0 +1,261 @@
+import json
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from event_time import parse_recptn_dt
+from topology import load_topology, normalize_station_name
+
+def _code(value):
+    """API 코드값('0', '1' ...) → 정수 (없거나 숫자가 아니면 None)"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+class FleetState:
+    """
+    열차별 현재 위치를 메모리에 유지하는 저장소 (수집 틱마다 스냅샷으로 갱신)
+    - 키: (호선명, 열차번호) → 현재 상태 한 건
+    - 색인: 호선별, (호선, 역명) 별, 열차번호별 키 집합 → 조회는 DB 없이 사전 조회 몇 번
+    - 한 호선의 스냅샷은 그 호선의 전체 운행 열차이므로, 스냅샷에 없는 열차는 운행 종료로 보고 제거합니다.
+      (조회 실패 등으로 스냅샷이 비어 있으면 직전 상태를 유지하고, evict_after_sec 동안 갱신이 없으면 제거)
+    - 수집 작업이 갱신하는 동안 HTTP 조회 스레드가 읽으므로 잠금으로 보호하고, 조회 결과는 복사본을 반환합니다.
+    """
+
+    def __init__(self, evict_after_sec: float = 600):
+        self.evict_after_sec = evict_after_sec
+        self._lock = threading.Lock()
+        # (호선명, 열차번호) -> 현재 상태
+        self._trains = {}
+        # 호선명 -> {키}, (호선명, 정규화 역명) -> {키}, 열차번호 -> {키}
+        self._by_line = {}
+        self._by_station = {}
+        self._by_number = {}
+        self.updated_at = None
+        self.ticks = 0
+
+    def __len__(self):
+        return len(self._trains)
+
+    def _index(self, key, record: dict):
+        self._by_line.setdefault(key[0], set()).add(key)
+        self._by_station.setdefault((key[0], normalize_station_name(record["station_name"])), set()).add(key)
+        self._by_number.setdefault(key[1], set()).add(key)
+
+    def _unindex(self, key, record: dict):
+        for index, index_key in ((self._by_line, key[0]),
+                                 (self._by_station, (key[0], normalize_station_name(record["station_name"]))),
+                                 (self._by_number, key[1])):
+            keys = index.get(index_key)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del index[index_key]
+
+    def _remove(self, key):
+        self._unindex(key, self._trains.pop(key))
+
+    def update(self, positions: dict, now: datetime = None):
+        """
+        {호선명: API 원본 데이터 리스트} 스냅샷을 반영합니다. (열차 한 대당 O(1))
+
+        Returns:
+            dict: {'trains': 현재 열차 수, 'removed': 운행 종료/만료로 제거한 열차 수}
+        """
+        now = now or datetime.now(timezone.utc)
+        removed = 0
+        with self._lock:
+            for line, data_list in positions.items():
+                if not data_list:
+                    continue
+                seen = set()
+                for item in data_list:
+                    key = (line, item.get("trainNo"))
+                    record = {
+                        "line_name": key[0],
+                        "train_number": key[1],
+                        "station_id": _code(item.get("statnId")),
+                        "station_name": item.get("statnNm"),
+                        "direction_type": _code(item.get("updnLine")),
+                        "train_status": _code(item.get("trainSttus")),
+                        "is_express": _code(item.get("directAt")),
+                        "is_last_train": item.get("lstcarAt") == "1",
+                        "dest_station_name": item.get("statnTnm"),
+                        "event_time": parse_recptn_dt(item.get("recptnDt")) or now,
+                        "updated_at": now,
+                    }
+                    prev = self._trains.get(key)
+                    if prev is None or prev["station_name"] != record["station_name"]:
+                        if prev is not None:
+                            self._unindex(key, prev)
+                        self._index(key, record)
+                    self._trains[key] = record
+                    seen.add(key)
+                # 이번 스냅샷에 없는 열차는 운행 종료
+                for key in self._by_line.get(line, set()) - seen:
+                    self._remove(key)
+                    removed += 1
+
+            expired = [k for k, v in self._trains.items()
+                       if (now - v["updated_at"]).total_seconds() >= self.evict_after_sec]
+            for key in expired:
+                self._remove(key)
+            removed += len(expired)
+            self.updated_at = now
+            self.ticks += 1
+            return {"trains": len(self._trains), "removed": removed}
+
+    def _records(self, keys, direction: int = None):
+        # 잠금 안에서 호출 - 복사본을 반환
+        records = (self._trains[k] for k in keys)
+        return [dict(r) for r in records if direction is None or r["direction_type"] == direction]
+
+    def train(self, train_number: str, line: str = None):
+        """
+        열차번호로 현재 위치를 찾습니다. (호선이 다르면 같은 번호가 여러 대일 수 있어 목록 반환)
+        """
+        with self._lock:
+            keys = self._by_number.get(str(train_number), set())
+            return self._records(k for k in keys if line is None or k[0] == line)
+
+    def line(self, line: str, direction: int = None):
+        """호선의 현재 운행 열차 목록"""
+        with self._lock:
+            return self._records(self._by_line.get(line, set()), direction)
+
+    def station(self, line: str, station: str, direction: int = None):
+        """역에 있거나(도착/출발) 진입 중인 열차 목록"""
+        with self._lock:
+            return self._records(self._by_station.get((line, normalize_station_name(station)), set()), direction)
+
+    def between(self, line: str, start: str, end: str, direction: int = None):
+        """
+        두 역 사이(양 끝 포함)에 있는 열차를 진행 순서대로 반환합니다.
+        역 순서/분기/순환 구조는 노선 구조(topology)로 판단하며, 방향을 주지 않으면 양방향 모두 찾습니다.
+
+        Raises:
+            ValueError: 노선 구조에 없는 호선이나 역
+        """
+        topo = load_topology().get(line)
+        if topo is None:
+            raise ValueError(f"노선 구조에 '{line}' 이 없습니다.")
+        a, b = topo.locate(None, start), topo.locate(None, end)
+        for name, pos in ((start, a), (end, b)):
+            if pos < 0:
+                raise ValueError(f"{line} 노선 구조에 '{name}' 역이 없습니다.")
+        result = []
+        with self._lock:
+            for d in ((0, 1) if direction is None else (direction,)):
+                for pos in topo.between(a, b, d):
+                    keys = self._by_station.get((line, normalize_station_name(topo.stations[pos])), set())
+                    result.extend(self._records(keys, d))
+        return result
+
+    def summary(self):
+        """
+        호선/방향별 운행 열차 수와 마지막 갱신 시각
+        """
+        with self._lock:
+            lines = {}
+            for (line, _), record in self._trains.items():
+                counts = lines.setdefault(line, {"total": 0, "up": 0, "down": 0, "express": 0})
+                counts["total"] += 1
+                counts["down" if record["direction_type"] == 1 else "up"] += 1
+                counts["express"] += record["is_express"] in (1, 7)
+            return {
+                "updated_at": self.updated_at,
+                "ticks": self.ticks,
+                "trains": len(self._trains),
+                "lines": lines,
+            }
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} 은 JSON 으로 변환할 수 없습니다.")
+
+class FleetServer:
+    """
+    FleetState 를 조회하는 로컬 읽기 전용 JSON API (백그라운드 스레드, DB 조회 없음)
+    - GET /fleet                                   : 호선별 운행 열차 수
+    - GET /train?no=2345[&line=2호선]              : 열차 현재 위치
+    - GET /line?line=2호선[&direction=0]           : 호선 전체 열차
+    - GET /station?line=2호선&station=강남[&direction=0]
+    - GET /between?line=2호선&from=강남&to=시청[&direction=0] : 두 역 사이 열차 (진행 순서)
+    - GET /alerts                                  : 해소되지 않은/최근 실시간 경보 (경보를 켠 경우)
+    """
+
+    def __init__(self, fleet: FleetState, host: str = "127.0.0.1", port: int = 9109, alerts=None):
+        self.fleet = fleet
+        self.alerts = alerts
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def _dispatch(self, path: str, params: dict):
+        """
+        (상태 코드, 응답 객체) 를 반환합니다.
+
+        Raises:
+            KeyError: 필수 파라미터 누락
+            ValueError: 잘못된 파라미터 값 (방향, 노선 구조에 없는 역)
+        """
+        fleet = self.fleet
+        direction = params.get("direction")
+        if direction is not None:
+            if direction not in ("0", "1"):
+                raise ValueError(f"direction 은 0(상행/내선) 또는 1(하행/외선) 이어야 합니다: {direction}")
+            direction = int(direction)
+        if path == "/fleet":
+            return 200, fleet.summary()
+        if path == "/train":
+            trains = fleet.train(params["no"], params.get("line"))
+            return (200, trains) if trains else (404, {"error": f"운행 중인 열차 {params['no']} 이 없습니다."})
+        if path == "/line":
+            return 200, fleet.line(params["line"], direction)
+        if path == "/station":
+            return 200, fleet.station(params["line"], params["station"], direction)
+        if path == "/between":
+            return 200, fleet.between(params["line"], params["from"], params["to"], direction)
+        if path == "/alerts" and self.alerts is not None:
+            return 200, self.alerts.snapshot()
+        return 404, {"error": f"알 수 없는 경로: {path}"}
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                try:
+                    status, payload = server._dispatch(url.path, params)
+                except KeyError as e:
+                    status, payload = 400, {"error": f"필수 파라미터 누락: {e.args[0]}"}
+                except ValueError as e:
+                    status, payload = 400, {"error": str(e)}
+                body = json.dumps(payload, ensure_ascii=False, default=_json_default).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # 조회마다 접근 로그를 남기지 않음
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fleet-server", daemon=True)
+        self._thread.start()
+        print(f"[현재 위치 API] http://{self.host}:{self.port}/fleet")
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
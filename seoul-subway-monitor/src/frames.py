@@ -0,0 +1,95 @@
+import pandas as pd
+from functools import cached_property
+from event_time import add_event_time
+from profiling import stage
+
+# 분석 기준 시각은 DB 적재 시각(created_at)이 아니라 API 수신 시각(event_time)
+# 공통 정렬 순서
+# - 열차별 시간순: 배차 간격(분석 1, 방문 구분), 체류 시간(분석 2), 회차(분석 3)
+# - 역/방향별 시간순: 급행 간섭(분석 4)
+TRAIN_ORDER = ['train_number', 'event_time']
+STATION_ORDER = ['line_name', 'station_name', 'direction_type', 'event_time']
+
+# 코드값 컬럼 → int8 (API 원본은 문자열 '0', '1' ..., 새 스키마는 SMALLINT, 결측은 -1)
+CODE_COLUMNS = ['train_status', 'direction_type', 'is_express']
+MISSING_CODE = -1
+# 이전 스키마에서 is_express 가 불리언으로 저장된 경우
+BOOL_CODES = {'true': 1, 'false': 0}
+
+# 반복되는 이름 컬럼 → category (문자열은 종류별로 한 번만 저장, 비교/그룹은 정수 코드로)
+CATEGORY_COLUMNS = ['line_name', 'station_name', 'train_number', 'dest_station_name', 'last_rec_date']
+
+# ID 컬럼 → 정수 (호선 ID 1002 → int16, 역 ID 1002000233 → int32, 결측 허용)
+ID_COLUMNS = {'line_id': 'Int16', 'station_id': 'Int32', 'dest_station_id': 'Int32'}
+
+def _to_code(series: pd.Series):
+    if pd.api.types.is_bool_dtype(series):
+        return series.astype('int8')
+    if pd.api.types.is_integer_dtype(series) and not series.hasnans:
+        return series.astype('int8')
+    codes = pd.to_numeric(series, errors='coerce')
+    if codes.isna().any():
+        # 'True'/'False' 표기는 느린 경로로 한 번 더 변환
+        codes = codes.fillna(series.astype(str).str.lower().map(BOOL_CODES))
+    return codes.fillna(MISSING_CODE).astype('int8')
+
+def compact_frame(df: pd.DataFrame):
+    """
+    위치 로그를 작은 타입으로 변환합니다. (이미 변환된 컬럼은 건너뜀)
+    - 코드값 컬럼: int8 (결측 -1)
+    - 이름 컬럼: category
+    - ID 컬럼: Int16 / Int32
+    """
+    for col in CODE_COLUMNS:
+        if col in df.columns and df[col].dtype != 'int8':
+            df[col] = _to_code(df[col])
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    for col, dtype in ID_COLUMNS.items():
+        if col in df.columns and df[col].dtype != dtype:
+            values = df[col].astype(object) if isinstance(df[col].dtype, pd.CategoricalDtype) else df[col]
+            df[col] = pd.to_numeric(values, errors='coerce').astype(dtype)
+    return df
+
+def normalize_frame(df: pd.DataFrame):
+    """
+    분석 전에 한 번만 타입을 정리합니다.
+    - created_at: datetime
+    - event_time: API 수신 시각 (없으면 last_rec_time/created_at 으로 채움)
+    - 코드값/이름/ID 컬럼: compact_frame 참고 (분석에서는 정수 코드와 비교)
+    """
+    df = df.copy()
+    if not pd.api.types.is_datetime64_any_dtype(df['created_at']):
+        with stage("to_datetime"):
+            df['created_at'] = pd.to_datetime(df['created_at'])
+    if 'event_time' not in df.columns or not pd.api.types.is_datetime64_any_dtype(df['event_time']):
+        with stage("event_time"):
+            df = add_event_time(df)
+    with stage("compact"):
+        return compact_frame(df)
+
+class SharedFrame:
+    """
+    한 번 로드한 데이터를 여러 분석이 함께 쓰도록 감싼 클래스
+    정렬 결과는 처음 요청될 때 한 번만 만들고 이후에는 재사용합니다.
+    """
+
+    def __init__(self, df: pd.DataFrame, normalized: bool = False):
+        self.df = df if normalized else normalize_frame(df)
+
+    @property
+    def empty(self):
+        return self.df.empty
+
+    @cached_property
+    def by_train(self):
+        """열차별 시간순 정렬 (인덱스는 0부터 다시 매김)"""
+        with stage("sort_by_train"):
+            return self.df.sort_values(TRAIN_ORDER, kind='stable').reset_index(drop=True)
+
+    @cached_property
+    def by_station(self):
+        """호선/역/방향별 시간순 정렬 (인덱스는 0부터 다시 매김)"""
+        with stage("sort_by_station"):
+            return self.df.sort_values(STATION_ORDER, kind='stable').reset_index(drop=True)
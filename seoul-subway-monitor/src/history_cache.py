@@ -0,0 +1,183 @@
+import glob
+import json
+import os
+import shutil
+import pandas as pd
+
+def to_utc(value):
+    """
+    시각 값을 UTC 기준 pd.Timestamp 로 변환합니다. (타임존이 없으면 UTC 로 간주)
+    """
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+class HistoryCache:
+    """
+    이미 조회한 이력 데이터를 로컬 Parquet 파일로 보관하는 캐시
+    - 한 번 저장된 행은 변경되지 않으므로, 마지막으로 받은 시각 부근 이후의 행만 추가로 받으면 됩니다.
+      (겹쳐서 다시 받은 행은 ids_since 로 걸러냄)
+    - 파일은 날짜(created_at 의 UTC 날짜)와 호선(line_id) 기준으로 파티션됩니다.
+      예) {cache_dir}/positions/date=2024-01-01/line_id=1002/xxxx.parquet
+    """
+
+    PARTITION_COLS = ["date", "line_id"]
+
+    # 저장 형식 버전 (컬럼 타입이 바뀌면 올림 → 이전 형식의 캐시는 비우고 다시 받음)
+    FORMAT_VERSION = 2
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.data_dir = os.path.join(cache_dir, "positions")
+        self.state_path = os.path.join(cache_dir, "state.json")
+        self.state = self._load_state()
+        if self.state and self.state.get("format") != self.FORMAT_VERSION:
+            print("[캐시 초기화] 캐시 저장 형식이 변경되어 로컬 캐시를 다시 만듭니다.")
+            self.reset()
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_state(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        # 중간에 중단되어도 상태 파일이 깨지지 않도록 교체 방식으로 저장
+        os.replace(tmp_path, self.state_path)
+
+    @property
+    def max_id(self):
+        """캐시에 저장된 가장 큰 id (비어 있으면 None)"""
+        return self.state.get("max_id")
+
+    @property
+    def max_created_at(self):
+        """캐시에 저장된 가장 늦은 created_at (비어 있으면 None)"""
+        value = self.state.get("max_created_at")
+        return pd.Timestamp(value) if value else None
+
+    @property
+    def covered_from(self):
+        """캐시가 빠짐없이 보관하고 있는 구간의 시작 시각 (비어 있으면 None)"""
+        value = self.state.get("covered_from")
+        return pd.Timestamp(value) if value else None
+
+    @property
+    def columns(self):
+        """캐시에 저장된 컬럼 목록 (스키마 변경 감지용)"""
+        return self.state.get("columns")
+
+    def reset(self):
+        """
+        캐시를 모두 삭제합니다. (DB 스키마가 바뀐 경우 등)
+        """
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        self.state = {}
+
+    def append(self, df: pd.DataFrame, covered_from=None):
+        """
+        새로 받은 행을 파티션 파일로 추가하고 id/created_at 워터마크를 갱신합니다.
+        covered_from 은 최초 적재 시 캐시가 보관하기 시작한 시각입니다.
+        """
+        if df.empty:
+            return
+
+        out = df.copy()
+        # 파일마다 스키마가 달라지지 않도록 문자열 컬럼 타입을 고정
+        # (category 는 파일마다 사전이 달라지므로 문자열로 저장하고, 읽을 때 다시 category 로 변환)
+        for col in out.columns:
+            if col not in ("id", "created_at") and (out[col].dtype == object or isinstance(out[col].dtype, pd.CategoricalDtype)):
+                out[col] = out[col].astype("string")
+        out["line_id"] = out["line_id"].astype("string").fillna("unknown")
+        out["date"] = out["created_at"].dt.tz_convert("UTC").dt.strftime("%Y-%m-%d")
+
+        out.to_parquet(self.data_dir, partition_cols=self.PARTITION_COLS, index=False)
+
+        max_id = int(df["id"].max())
+        max_created_at = df["created_at"].max()
+        if self.max_id is None or max_id > self.max_id:
+            self.state["max_id"] = max_id
+        if self.max_created_at is None or max_created_at > self.max_created_at:
+            self.state["max_created_at"] = max_created_at.isoformat()
+        if covered_from is not None and self.covered_from is None:
+            self.state["covered_from"] = to_utc(covered_from).isoformat()
+        self.state["columns"] = list(df.columns)
+        self.state["format"] = self.FORMAT_VERSION
+        self._save_state()
+
+    def _cached_dates(self):
+        paths = glob.glob(os.path.join(self.data_dir, "date=*"))
+        return sorted(os.path.basename(p).split("=", 1)[1] for p in paths)
+
+    def _read_dates(self, dates: list, line_ids: list = None):
+        if not dates:
+            return pd.DataFrame()
+
+        filters = [("date", "in", list(dates))]
+        if line_ids:
+            filters.append(("line_id", "in", [str(x) for x in line_ids]))
+        df = pd.read_parquet(self.data_dir, filters=filters)
+        if df.empty:
+            return df
+
+        # 파티션 컬럼은 category 로 읽히므로 원래 형태로 되돌림
+        df["line_id"] = df["line_id"].astype(str).replace("unknown", None)
+        df = df.drop(columns=["date"])
+        columns = [c for c in (self.columns or []) if c in df.columns]
+        return df[columns] if columns else df
+
+    def ids_since(self, start):
+        """
+        created_at >= start 인 캐시 행의 id 집합 (id/created_at 컬럼만 읽음)
+        """
+        start = to_utc(start)
+        dates = [d for d in self._cached_dates() if d >= start.strftime("%Y-%m-%d")]
+        if not dates:
+            return set()
+        df = pd.read_parquet(self.data_dir, columns=["id", "created_at"], filters=[("date", "in", dates)])
+        return set(df.loc[df["created_at"] >= start, "id"].tolist())
+
+    def read(self, start=None, end=None, line_ids: list = None):
+        """
+        created_at 이 [start, end) 인 캐시 데이터를 시간순 DataFrame으로 반환합니다.
+        해당 날짜 파티션만 읽습니다.
+        """
+        dates = self._cached_dates()
+        if start is not None:
+            start = to_utc(start)
+            dates = [d for d in dates if d >= start.strftime("%Y-%m-%d")]
+        if end is not None:
+            end = to_utc(end)
+            dates = [d for d in dates if d <= end.strftime("%Y-%m-%d")]
+
+        df = self._read_dates(dates, line_ids)
+        if df.empty:
+            return df
+
+        if start is not None:
+            df = df[df["created_at"] >= start]
+        if end is not None:
+            df = df[df["created_at"] < end]
+        return df.sort_values(["created_at", "id"]).reset_index(drop=True)
+
+    def read_latest(self, limit: int):
+        """
+        가장 최근 limit 건을 최신순 DataFrame으로 반환합니다. (최근 날짜 파티션부터 읽음)
+        """
+        frames = []
+        total = 0
+        for date in reversed(self._cached_dates()):
+            df = self._read_dates([date])
+            frames.append(df)
+            total += len(df)
+            if total >= limit:
+                break
+
+        if not frames:
+            return pd.DataFrame()
+
+        df = pd.concat(frames, ignore_index=True)
+        return df.sort_values(["created_at", "id"], ascending=False).head(limit).reset_index(drop=True)
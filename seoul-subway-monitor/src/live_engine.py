@@ -0,0 +1,181 @@
+import math
+from collections import deque
+from datetime import datetime, timezone
+import pandas as pd
+from event_time import parse_recptn_dt
+
+# 회차로 볼 최대 시간 (분석 3과 같은 기준값)
+MAX_TURNAROUND_SEC = 1800
+
+# directAt 코드: 1:급행, 7:특급, 0:일반
+EXPRESS_CODES = ('1', '7')
+
+class RunningStats:
+    """
+    평균/표준편차/최대값을 한 건씩 갱신하는 누적 통계 (Welford 방식, O(1) 메모리)
+    """
+    __slots__ = ("count", "mean", "_m2", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.max = None
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def std(self):
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+class LiveAnalyzer:
+    """
+    수집 사이클마다 새 스냅샷만 받아 분석 지표를 갱신하는 실시간 분석 엔진
+    - DB 를 조회하지 않고, 열차별/역별 상태를 메모리에 유지합니다.
+    - 스냅샷 1건 처리 비용은 O(새 행 수) 입니다.
+    - 갱신하는 지표: 배차 간격(분석 1), 체류 시간(분석 2), 회차 시간(분석 3), 급행-일반 간격(분석 4)
+    - 장기 정차/간격 이상 경보는 학습한 기준값을 쓰는 AlertEngine(alerts.py) 이 담당하고, 여기서는 회차 이벤트만 냅니다.
+    """
+
+    def __init__(self, evict_after_sec: float = 3600, max_events: int = 1000):
+        self.evict_after_sec = evict_after_sec
+        # (호선명, 열차번호) -> 열차 상태
+        self.trains = {}
+        # (호선명, 역명, 방향) -> 역 상태
+        self.stations = {}
+        # 최근 이벤트 (회차)
+        self.events = deque(maxlen=max_events)
+
+    def _station(self, key):
+        state = self.stations.get(key)
+        if state is None:
+            state = {
+                "last_arrival": None,
+                "last_local_arrival": None,
+                "headway": RunningStats(),
+                "dwell": RunningStats(),
+                "turnaround": RunningStats(),
+                "express_gap": RunningStats(),
+            }
+            self.stations[key] = state
+        return state
+
+    def _emit(self, kind: str, line: str, station: str, train: str, value: float, now):
+        event = {"type": kind, "line": line, "station": station, "train": train, "value_sec": round(value, 1), "time": now}
+        self.events.append(event)
+        return event
+
+    def update(self, data_list: list, now: datetime = None):
+        """
+        한 호선(또는 여러 호선)의 API 원본 스냅샷을 반영합니다.
+
+        Args:
+            data_list (list): API 원본 데이터 리스트
+            now (datetime): 스냅샷 시각 (기본값: 현재 UTC, recptnDt 가 없는 행에만 사용)
+
+        Returns:
+            list: 이번 스냅샷에서 새로 발생한 이벤트 목록
+        """
+        now = now or datetime.now(timezone.utc)
+        new_events = []
+
+        for item in data_list:
+            # 이벤트 시각은 API 수신 시각(recptnDt) 기준 (수집 지연/재시도와 무관)
+            t = parse_recptn_dt(item.get("recptnDt")) or now
+            line = item.get("subwayNm")
+            train_no = item.get("trainNo")
+            station = item.get("statnNm")
+            direction = str(item.get("updnLine"))
+            status = str(item.get("trainSttus"))
+            is_express = str(item.get("directAt")) in EXPRESS_CODES
+
+            key = (line, train_no)
+            prev = self.trains.get(key)
+            station_key = (line, station, direction)
+
+            # 회차: 같은 열차의 방향이 바뀐 경우 (직전 관측 시각 기준)
+            if prev is not None and prev["direction"] != direction:
+                turnaround = (t - prev["last_seen"]).total_seconds()
+                if turnaround < MAX_TURNAROUND_SEC:
+                    self._station(station_key)["turnaround"].add(turnaround)
+                    new_events.append(self._emit("turnaround", line, station, train_no, turnaround, t))
+
+            moved = prev is None or prev["station"] != station or prev["direction"] != direction
+            arrived_at = None if moved else prev["arrived_at"]
+
+            # 도착: 이 역에서 처음 '도착(1)' 상태가 관측된 시점
+            if status == '1' and arrived_at is None:
+                arrived_at = t
+                st = self._station(station_key)
+
+                # 배차 간격: 같은 역/방향의 직전 도착과의 차이
+                if st["last_arrival"] is not None:
+                    st["headway"].add((t - st["last_arrival"]).total_seconds())
+                st["last_arrival"] = t
+
+                # 급행-일반 간격: 급행 도착 시 직전 일반 열차 도착과의 차이
+                if is_express and st["last_local_arrival"] is not None:
+                    gap = (t - st["last_local_arrival"]).total_seconds()
+                    st["express_gap"].add(gap)
+                elif not is_express:
+                    st["last_local_arrival"] = t
+
+            # 체류: 같은 역에서 도착(1) → 출발(2)
+            if status == '2' and arrived_at is not None and prev is not None and prev["status"] == '1':
+                dwell = (t - arrived_at).total_seconds()
+                self._station(station_key)["dwell"].add(dwell)
+
+            self.trains[key] = {
+                "station": station,
+                "direction": direction,
+                "status": status,
+                "arrived_at": arrived_at,
+                "last_seen": t,
+            }
+
+        return new_events
+
+    def update_snapshot(self, positions: dict, now: datetime = None):
+        """
+        {호선명: 데이터 리스트} 형태의 전체 스냅샷을 반영하고, 오래 보이지 않은 열차를 정리합니다.
+        """
+        now = now or datetime.now(timezone.utc)
+        new_events = []
+        for data_list in positions.values():
+            new_events.extend(self.update(data_list, now))
+        self.evict(now)
+        return new_events
+
+    def evict(self, now: datetime):
+        """
+        evict_after_sec 동안 관측되지 않은 열차 상태를 제거합니다. (운행 종료 열차)
+        """
+        expired = [k for k, v in self.trains.items() if (now - v["last_seen"]).total_seconds() >= self.evict_after_sec]
+        for k in expired:
+            del self.trains[k]
+
+    def summary(self):
+        """
+        역/방향별 현재 지표를 표로 반환합니다.
+        """
+        rows = []
+        for (line, station, direction), st in self.stations.items():
+            rows.append({
+                "line_name": line,
+                "station_name": station,
+                "direction_type": direction,
+                "headway_count": st["headway"].count,
+                "headway_mean": round(st["headway"].mean, 1),
+                "headway_max": st["headway"].max,
+                "headway_std": round(st["headway"].std, 1),
+                "dwell_count": st["dwell"].count,
+                "dwell_mean": round(st["dwell"].mean, 1),
+                "turnaround_mean": round(st["turnaround"].mean, 1),
+                "express_gap_mean": round(st["express_gap"].mean, 1),
+            })
+        return pd.DataFrame(rows)
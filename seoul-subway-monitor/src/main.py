@@ -1,5 +1,6 @@
+import argparse
 import time
-import schedule
+from datetime import datetime, timezone
 import sys
 import os
 
@@ -7,63 +8,319 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from config import Config
-from api_client import SeoulSubwayAPI
-from db_client import SupabaseClient
+from runtime import CollectorRuntime
+from scheduler import TickScheduler
+from fake_api import FakeServer, add_server_arguments, api_from_args
+from replay import ReplayMeter
+from metrics import METRICS, MetricsServer, write_cycle_log
+from fleet_state import FleetServer
 
-def job():
+# 틱 사이에 재사용되는 런타임 (최초 job 실행 시 생성)
+_runtime = None
+
+# 수집 스케줄러 (main 에서 생성)
+_scheduler = None
+
+def get_runtime():
+    """
+    장기 실행 런타임을 반환합니다. (없으면 생성)
+    """
+    global _runtime
+    if _runtime is None:
+        _runtime = CollectorRuntime()
+    return _runtime
+
+def job(lines: list = None):
     """
     주기적으로 실행될 작업
+
+    Args:
+        lines (list): 이번 틱에 수집할 호선 목록 (기본값: 전체 TARGET_LINES)
+
+    Returns:
+        dict: 사이클 요약 (_collect 참고)
     """
-    print("[작업 시작] 데이터 수집 및 저장 시도...")
-    
-    api = SeoulSubwayAPI()
-    db = SupabaseClient()
+    return _collect(get_runtime(), lines or Config.TARGET_LINES)
+
+def _collect(runtime: CollectorRuntime, target_lines: list):
+    """
+    호선별 작업이나 parallel 정책으로 겹쳐 실행될 수 있으므로, 공유 상태를 바꾸는 구간만 runtime.lock 으로 감쌉니다.
+    (조회는 잠그지 않음 → 한 작업의 느린 조회가 다른 호선 작업을 막지 않음)
+
+    Returns:
+        dict: {'fetched': 조회 행 수, 'stored': 저장(스풀 기록) 행 수, 'fetch_sec': 조회 시간, 'cycle_sec': 사이클 시간}
+    """
+    print(f"[작업 시작] 데이터 수집 및 저장 시도... ({len(target_lines)}개 호선)")
     
-    # 수집할 호선 목록 (서울시 공공데이터 포털 기준 정의된 호선명)
-    target_lines = ["1호선", "2호선", "3호선", "4호선", "5호선", "6호선", "7호선", "8호선", "9호선"]
+    cycle = METRICS.begin_cycle(target_lines)
+    with runtime.lock:
+        runtime.begin_tick()
     
     total_inserted = 0
     
+    # 모든 호선을 하나의 HTTP 세션으로 동시에 조회 (호선 간 스냅샷 시점 차이 최소화)
+    started = time.perf_counter()
+    positions = runtime.fetch_all(target_lines)
+    fetch_sec = time.perf_counter() - started
+    print(f" - {len(target_lines)}개 호선 동시 조회 완료 ({fetch_sec:.2f}초)")
+    
+    # 현재 위치 조회 API 가 보는 열차별 상태 갱신 (DB 저장과 무관)
+    if runtime.fleet is not None:
+        runtime.fleet.update(positions)
+    
+    # DB 를 거치지 않고 이번 스냅샷으로 실시간 지표 갱신
+    if runtime.live is not None:
+        with runtime.lock:
+            events = runtime.live.update_snapshot(positions)
+        for event in events:
+            print(f"   [실시간 {event['type']}] {event['line']} {event['station']} 열차 {event['train']}: {event['value_sec']}초")
+    
+    # 역/방향별 기준값 대비 이상 경보 (이번 틱에 새로 발생한 것만, 같은 경보는 해소될 때까지 한 번)
+    if runtime.alerts is not None:
+        for alert in runtime.alerts.update_snapshot(positions):
+            print(f"   [경보 {alert['type']}] {alert['line']} {alert['station']}({alert['direction']}) 열차 {alert['train']}: "
+                  f"{alert['value_sec']}초 (기준 {alert['baseline_sec']}초, 임계 {alert['threshold_sec']}초)")
+            METRICS.inc("alerts_total", kind=alert["type"], line=alert["line"])
+        METRICS.set("alerts_active", len(runtime.alerts.active))
+    
     for line in target_lines:
-        print(f" - {line} 데이터 조회 중...")
-        data = api.get_realtime_positions(line)
+        raw = positions.get(line, [])
+        print(f" - {line} 데이터 저장 중...")
+        
+        # 직전 스냅샷과 비교해 바뀐 열차만 저장 (변경분 캐시 조회/갱신만 잠그고 저장은 잠금 밖에서)
+        data, token = runtime.select_changes(raw)
+        stored = runtime.insert_positions(data, token) if data else False
+        METRICS.inc("rows_fetched_total", len(raw), line=line)
+        METRICS.inc("rows_unchanged_total", len(raw) - len(data), line=line)
         
-        if data:
-            if db.insert_positions(data):
-                print(f"   -> {len(data)}건 저장 완료.")
+        if raw and not data:
+            print(f"   -> {len(raw)}건 모두 변화 없음 (저장 생략).")
+        elif data:
+            if stored:
+                if runtime.spool is not None:
+                    print(f"   -> {len(data)}건 스풀 기록 완료. (DB 반영은 백그라운드)")
+                else:
+                    print(f"   -> {len(data)}건 저장 완료.")
                 total_inserted += len(data)
+                METRICS.inc("rows_stored_total", len(data), line=line)
             else:
                 print(f"   -> 저장 실패.")
         else:
             print(f"   -> 데이터 없음 (운행 시간이 아닐 수 있음).")
             
-    print(f"[작업 종료] 총 {total_inserted}건 처리됨.\n")
+    print(f"[작업 종료] 총 {total_inserted}건 처리됨.")
+    if runtime.change_filter is not None:
+        print(f"[변경분 저장] 중복 제거율 {runtime.change_filter.dedup_ratio:.1%}")
+    with runtime.lock:
+        report = runtime.report()
+    print(f"[연결 재사용] {report}")
+    if _scheduler is not None:
+        print(f"[스케줄러] {_scheduler.stats()}")
+    print()
+    summary = {
+        "fetched": sum(len(positions.get(line, [])) for line in target_lines),
+        "stored": total_inserted,
+        "fetch_sec": fetch_sec,
+        "cycle_sec": time.perf_counter() - started,
+    }
+    _log_cycle(runtime, target_lines, summary, cycle)
+    return summary
+
+def _log_cycle(runtime: CollectorRuntime, target_lines: list, summary: dict, cycle):
+    """
+    사이클 전체 시간과 스풀 잔량을 기록하고, 이번 사이클의 단계별 지표를 JSON 한 줄로 남깁니다.
+    """
+    METRICS.observe("cycle_seconds", summary["cycle_sec"])
+    if runtime.spool is not None:
+        METRICS.set("spool_pending_rows", runtime.spool.pending())
+    if not Config.METRICS_ENABLED:
+        METRICS.end_cycle(cycle)
+        return
+    record = {
+        "ts": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "lines": target_lines,
+        "fetched": summary["fetched"],
+        "stored": summary["stored"],
+    }
+    record.update(METRICS.end_cycle(cycle))
+    # 라벨 없는 사이클 시간은 겹쳐 실행된 다른 작업의 값도 합산되므로 이 작업의 값으로 기록
+    record["cycle_seconds"] = round(summary["cycle_sec"], 4)
+    write_cycle_log(record, Config.METRICS_LOG_PATH)
+
+def adaptive_job():
+    """
+    POLL_TICK_SEC 마다 실행되어, 적응형 정책상 조회할 때가 된 호선만 수집합니다.
+    """
+    runtime = get_runtime()
+    with runtime.lock:
+        lines = runtime.poller.due_lines()
+    if lines:
+        job(lines)
+
+def maintenance_job():
+    """
+    1시간마다 실행될 저장소 관리 작업 (파티션 생성/보존 기간 정리, 시간별 롤업)
+    """
+    result = get_runtime().maintain_storage()
+    print(f"[저장소 관리] {result}\n")
+
+def start_metrics_server():
+    """
+    METRICS_PORT 에 /metrics 서버를 띄웁니다. (비활성화했거나 포트를 쓸 수 없으면 None)
+    """
+    if not (Config.METRICS_ENABLED and Config.METRICS_PORT):
+        return None
+    try:
+        return MetricsServer(METRICS, Config.METRICS_HOST, Config.METRICS_PORT).start()
+    except OSError as e:
+        print(f"[지표 서버 오류] {e} (지표 노출 없이 계속 수집)")
+        return None
+
+def start_fleet_server():
+    """
+    FLEET_API_PORT 에 현재 위치/경보 조회 API 를 띄웁니다. (비활성화했거나 포트를 쓸 수 없으면 None)
+    """
+    runtime = get_runtime()
+    if runtime.fleet is None or not Config.FLEET_API_PORT:
+        return None
+    try:
+        return FleetServer(runtime.fleet, Config.FLEET_API_HOST, Config.FLEET_API_PORT, runtime.alerts).start()
+    except OSError as e:
+        print(f"[현재 위치 API 오류] {e} (조회 API 없이 계속 수집)")
+        return None
+
+def run_replay(args):
+    """
+    가상 API 서버를 상대로 수집기를 speed 배속으로 duration 초 동안 실행하고 처리량/지연을 출력합니다.
+    - 수집 주기는 설정값 / speed 로 줄이고, 가상 서버의 시계도 speed 배로 흐르므로 틱마다 실제 주기만큼의 변화가 생깁니다.
+    - 저장 경로(변경분 필터, 스풀, DB)는 평소와 같으므로 테스트용 DB 를 지정해 실행합니다.
+    """
+    global _scheduler
+    server = None
+    if args.api_url:
+        Config.BASE_API_URL = args.api_url
+    else:
+        server = FakeServer(api_from_args(args, args.speed), port=args.port).start()
+        Config.BASE_API_URL = server.base_url
+    # 적응형 주기는 실제 시계 기준이므로 재생 중에는 고정 주기를 배속만큼 줄여 사용
+    Config.ADAPTIVE_POLLING = False
+
+    print(f"=== 재생 모드: {Config.BASE_API_URL} ({args.speed:g}배속, {args.duration:g}초) ===")
+    metrics_server = start_metrics_server()
+    fleet_server = start_fleet_server()
+    if Config.STORAGE_MAINTENANCE:
+        maintenance_job()
+
+    meter = ReplayMeter(args.speed)
+    _scheduler = TickScheduler()
+    for interval, lines in Config.line_groups().items():
+        _scheduler.every(interval / args.speed, lambda lines=lines: meter.record(job(lines)),
+                         name=f"replay-{interval:g}s", overrun=Config.OVERRUN_POLICY)
+    try:
+        _scheduler.run_forever(duration=args.duration)
+    except KeyboardInterrupt:
+        print("\n[재생 중단] 사용자 요청에 의해 중단합니다.")
+    finally:
+        _scheduler.stop()
+
+    runtime = get_runtime()
+    report = {"collector": meter.summary(), "scheduler": _scheduler.stats()}
+    if runtime.flusher is not None:
+        # 스풀에 남은 데이터를 DB 에 모두 반영하는 데 걸린 시간까지 포함해 DB 적재 처리량 계산
+        drain_started = time.perf_counter()
+        runtime.flusher.flush()
+        spool = runtime.flusher.report()
+        spool["drain_sec"] = round(time.perf_counter() - drain_started, 2)
+        spool["db_rows_per_sec"] = round(
+            spool["flushed"] / (report["collector"]["elapsed_sec"] + spool["drain_sec"]), 1
+        )
+        report["spool"] = spool
+    if server is not None:
+        report["fake_api"] = dict(server.api.stats)
+        server.stop()
+    if metrics_server is not None:
+        metrics_server.stop()
+    if fleet_server is not None:
+        fleet_server.stop()
+    runtime.close()
+
+    print("[재생 결과]")
+    for section, values in report.items():
+        print(f" - {section}: {values}")
 
 def main():
     """
     메인 실행 함수
     """
+    parser = argparse.ArgumentParser(description="서울 지하철 실시간 위치 수집기")
+    parser.add_argument("--replay", action="store_true", help="가상 API 서버를 상대로 배속 재생 (부하 테스트)")
+    parser.add_argument("--speed", type=float, default=10.0, help="재생 배속 (기본 10)")
+    parser.add_argument("--duration", type=float, default=300.0, help="재생 시간(실제 초, 기본 300)")
+    parser.add_argument("--api-url", default=None, help="이미 실행 중인 가상 API 주소 (없으면 내장 서버 실행)")
+    parser.add_argument("--port", type=int, default=8089, help="내장 가상 API 서버 포트")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    if args.replay:
+        # 가상 서버는 키를 확인하지 않음
+        Config.SEOUL_API_KEY = Config.SEOUL_API_KEY or "replay"
+        try:
+            Config.validate()
+        except ValueError as e:
+            print(f"[설정 오류] {e}")
+            return
+        run_replay(args)
+        return
+
     try:
         Config.validate()
     except ValueError as e:
         print(f"[설정 오류] {e}")
         return
 
+    global _scheduler
     print("=== 서울 지하철 실시간 위치 모니터링 시스템 ===")
-    print("스케줄러 시작: 1분마다 실행됩니다. (종료: Ctrl+C)")
+    metrics_server = start_metrics_server()
+    fleet_server = start_fleet_server()
     
-    # 프로그램 시작 시 1회 즉시 실행
+    # 프로그램 시작 시 1회 즉시 실행 (오늘 파티션이 없으면 저장이 실패하므로 관리 작업 먼저)
+    if Config.STORAGE_MAINTENANCE:
+        maintenance_job()
     job()
     
-    # 1분마다 실행
-    schedule.every(1).minutes.do(job)
+    # 수집 주기가 같은 호선끼리 하나의 작업으로 묶어 벽시계 경계에 맞춰 실행
+    _scheduler = TickScheduler()
+    adaptive = get_runtime().poller is not None
+    for interval, lines in Config.line_groups().items():
+        if adaptive:
+            # 주기를 고정하지 않은 호선은 적응형 작업이 담당
+            lines = [line for line in lines if line in Config.LINE_INTERVALS]
+            if not lines:
+                continue
+        _scheduler.every(interval, job, lines, name=f"collect-{interval:g}s", overrun=Config.OVERRUN_POLICY)
+        print(f"스케줄러 등록: {interval:g}초마다 {', '.join(lines)}")
+    if adaptive:
+        # 조회 여부 판단은 가볍지만 수집이 길어지면 다음 틱은 건너뜀 (밀린 호선은 다음 틱에 함께 조회)
+        _scheduler.every(Config.POLL_TICK_SEC, adaptive_job, name="collect-adaptive", overrun="skip")
+        print(f"스케줄러 등록: 적응형 수집 {', '.join(Config.adaptive_lines())} "
+              f"(하루 호출 한도 {Config.API_DAILY_QUOTA}회)")
+    # 매시 5분에 저장소 관리 (이전 관리 작업이 길어지면 건너뜀)
+    if Config.STORAGE_MAINTENANCE:
+        _scheduler.every(3600, maintenance_job, name="maintenance", offset=300, overrun="skip")
+    print("스케줄러 시작 (종료: Ctrl+C)")
     
     try:
-        while True:
-            schedule.run_pending()
-            time.sleep(1)
+        _scheduler.run_forever()
     except KeyboardInterrupt:
         print("\n[시스템 종료] 사용자 요청에 의해 종료합니다.")
+    finally:
+        _scheduler.stop()
+        if _runtime is not None:
+            _runtime.close()
+        if metrics_server is not None:
+            metrics_server.stop()
+        if fleet_server is not None:
+            fleet_server.stop()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,247 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 지연 시간 히스토그램 구간 상한(초)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 지표 이름 앞에 붙는 접두사
+PREFIX = "subway_collector_"
+
+class Histogram:
+    """
+    고정 구간 히스토그램 (구간별 개수, 합계, 전체 개수)
+    """
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # 마지막 칸은 가장 큰 구간을 넘는 값 (+Inf)
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Prometheus 형식의 누적 개수 [(le, 개수), ...]"""
+        total = 0
+        result = []
+        for bound, count in zip(list(self.buckets) + [float("inf")], self.counts):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else f"{bound:g}", total))
+        return result
+
+def _labels(labels: dict):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _format_labels(labels: tuple, extra: tuple = ()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (k + '="' + v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"' for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+class MetricsRegistry:
+    """
+    수집 파이프라인의 단계별 지연 히스토그램, 카운터, 게이지를 모아 두는 저장소
+    - 누적 값은 /metrics (Prometheus 텍스트 형식) 로 노출합니다.
+    - begin_cycle ~ end_cycle 사이에 기록된 값은 따로 모아 사이클별 JSON 로그로 남깁니다.
+      (백그라운드 스풀 플러셔의 DB 저장도 그 사이에 일어났다면 포함)
+      호선별 작업이 겹쳐 실행될 수 있으므로 사이클은 작업마다 따로 열고, line 라벨이 붙은 값은
+      그 사이클의 호선일 때만 합산합니다.
+    - 여러 스레드(수집 작업, 스풀 플러셔, HTTP 서버)에서 함께 쓰므로 잠금으로 보호합니다.
+    """
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+        self._help = {}
+        # 열려 있는 사이클 기록 [(호선 집합 또는 None, {지표: 값})]
+        self._cycles = []
+
+    def describe(self, name: str, text: str):
+        """지표 설명 (# HELP)"""
+        self._help[name] = text
+
+    def _record_cycle(self, name: str, labels: tuple, value: float):
+        # 사이클 로그: {지표: 값} 또는 {지표: {라벨 값: 값}} 로 합산
+        if not self._cycles:
+            return
+        line = dict(labels).get("line")
+        key = ",".join(v for _, v in labels)
+        for lines, cycle in self._cycles:
+            if line is not None and lines is not None and line not in lines:
+                continue
+            if labels:
+                bucket = cycle.setdefault(name, {})
+                bucket[key] = bucket.get(key, 0) + value
+            else:
+                cycle[name] = cycle.get(name, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """히스토그램에 값(초) 하나를 기록합니다."""
+        key = _labels(labels)
+        with self._lock:
+            hist = self._histograms.setdefault(name, {}).get(key)
+            if hist is None:
+                hist = self._histograms[name][key] = Histogram(self.buckets)
+            hist.observe(value)
+            self._record_cycle(name, key, value)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """카운터를 amount 만큼 늘립니다."""
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+            self._record_cycle(name, key, amount)
+
+    def set(self, name: str, value: float, **labels):
+        """게이지 값을 설정합니다."""
+        with self._lock:
+            self._gauges.setdefault(name, {})[_labels(labels)] = value
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """with 블록의 실행 시간을 히스토그램에 기록합니다. (예외가 나도 기록)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def begin_cycle(self, lines: list = None):
+        """
+        사이클별 기록을 시작합니다. (lines 를 주면 line 라벨이 그 호선인 값만 합산)
+
+        Returns:
+            end_cycle 에 넘길 사이클 핸들
+        """
+        handle = (None if lines is None else frozenset(lines), {})
+        with self._lock:
+            self._cycles.append(handle)
+        return handle
+
+    def end_cycle(self, handle):
+        """
+        begin_cycle 이후 기록된 값을 반환하고 그 사이클 기록을 끝냅니다.
+
+        Returns:
+            dict: {지표: 합계} 또는 {지표: {라벨 값: 합계}} (시간은 초, 소수점 4자리)
+        """
+        with self._lock:
+            self._cycles = [c for c in self._cycles if c is not handle]
+        cycle = handle[1]
+
+        def rounded(value):
+            return round(value, 4) if isinstance(value, float) else value
+
+        return {name: ({k: rounded(v) for k, v in value.items()} if isinstance(value, dict) else rounded(value))
+                for name, value in cycle.items()}
+
+    def render(self):
+        """
+        누적 지표를 Prometheus 텍스트 형식(0.0.4)으로 반환합니다.
+        """
+        lines = []
+        with self._lock:
+            for kind, store in (("counter", self._counters), ("gauge", self._gauges)):
+                for name, series in sorted(store.items()):
+                    full = PREFIX + name
+                    if name in self._help:
+                        lines.append(f"# HELP {full} {self._help[name]}")
+                    lines.append(f"# TYPE {full} {kind}")
+                    for labels, value in sorted(series.items()):
+                        lines.append(f"{full}{_format_labels(labels)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                full = PREFIX + name
+                if name in self._help:
+                    lines.append(f"# HELP {full} {self._help[name]}")
+                lines.append(f"# TYPE {full} histogram")
+                for labels, hist in sorted(series.items()):
+                    for le, count in hist.cumulative():
+                        lines.append(f"{full}_bucket{_format_labels(labels, (('le', le),))} {count}")
+                    lines.append(f"{full}_sum{_format_labels(labels)} {hist.sum:.6f}")
+                    lines.append(f"{full}_count{_format_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+# 프로세스 전체에서 함께 쓰는 지표 저장소
+METRICS = MetricsRegistry()
+METRICS.describe("fetch_seconds", "호선별 API 조회 시간 (모든 페이지 포함)")
+METRICS.describe("parse_seconds", "API 응답 JSON 파싱 시간 (페이지별)")
+METRICS.describe("transform_seconds", "insert_positions 의 DB 스키마 변환 시간")
+METRICS.describe("db_write_seconds", "DB 저장 요청 시간")
+METRICS.describe("cycle_seconds", "수집 사이클 전체 시간")
+METRICS.describe("rows_fetched_total", "API 에서 받은 열차 행 수")
+METRICS.describe("rows_unchanged_total", "직전 스냅샷과 같아 저장을 생략한 행 수")
+METRICS.describe("rows_stored_total", "저장(스풀 기록 포함)한 행 수")
+METRICS.describe("db_rows_written_total", "DB 에 실제로 반영한 행 수")
+METRICS.describe("api_errors_total", "API 조회 오류 수 (종류별: timeout, http, parse, api, other)")
+METRICS.describe("db_errors_total", "DB 저장 오류 수")
+METRICS.describe("spool_pending_rows", "스풀에 남아 있는 DB 미반영 행 수")
+METRICS.describe("alerts_total", "실시간 경보 발생 수 (종류별: bunching, gap, long_dwell)")
+METRICS.describe("alerts_active", "해소되지 않은 실시간 경보 수")
+
+def write_cycle_log(record: dict, path: str = ""):
+    """
+    사이클 지표를 JSON 한 줄로 남깁니다. (path 가 있으면 파일에 추가, 없으면 표준 출력)
+    """
+    line = json.dumps(record, ensure_ascii=False)
+    if path:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    else:
+        print(f"[사이클 지표] {line}")
+
+class MetricsServer:
+    """
+    /metrics (Prometheus 텍스트 형식) 를 제공하는 로컬 HTTP 서버 (백그라운드 스레드)
+    """
+
+    def __init__(self, registry: MetricsRegistry = METRICS, host: str = "127.0.0.1", port: int = 9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # 스크레이프마다 접근 로그를 남기지 않음
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+        print(f"[지표] http://{self.host}:{self.port}/metrics")
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,153 @@
+import time
+from datetime import datetime
+from event_time import KST
+
+def parse_service_hours(value: str):
+    """
+    '05:00-01:30' 형태의 운행 시간대를 (시작 시각, 종료 시각) 시간 단위 실수로 변환합니다.
+    종료 시각이 시작 시각보다 이르면 자정을 넘기는 것으로 봅니다.
+    """
+    start, _, end = value.partition("-")
+
+    def to_hours(text):
+        hour, _, minute = text.strip().partition(":")
+        return int(hour) + int(minute or 0) / 60
+
+    return to_hours(start), to_hours(end)
+
+class AdaptivePoller:
+    """
+    호선별 수집 주기를 관측된 변화량과 운행 시간대에 맞춰 조정하는 정책
+    - 열차 위치가 자주 바뀌는 호선(출퇴근 시간 2호선 등)은 자주, 조용한 호선은 드물게 조회합니다.
+    - 운행 시간 외에는 off_hours_interval, 운행 중인데 응답이 계속 비어 있으면 max_interval 로 조회합니다.
+    - 전체 호출 수는 하루 API 할당량(daily_quota)을 넘지 않도록 나눠 씁니다.
+      (변화량에 비례해 호출을 배분 → 호출 1회당 얻는 변경 건수를 호선 간에 비슷하게 맞춤)
+    - max_interval 보다 할당량이 우선합니다. 모든 호선을 max_interval 로 조회할 만큼 할당량이 남지 않으면
+      활성 호선 주기를 같은 비율로 늘리므로 max_interval 을 넘을 수 있습니다. (off_hours_interval 까지)
+    """
+
+    # 변화로 볼 필드 (역, 운행 상태, 상/하행)
+    STATE_FIELDS = ("statnId", "trainSttus", "updnLine")
+
+    # 변화가 관측되지 않은 호선도 완전히 배제하지 않도록 두는 최소 가중치 (건/초)
+    MIN_RATE = 0.005
+
+    def __init__(self, lines: list, daily_quota: float, min_interval: float = 15, max_interval: float = 120,
+                 off_hours_interval: float = 600, service_hours: tuple = (5.0, 1.5), smoothing: float = 0.3):
+        self.lines = list(lines)
+        self.daily_quota = daily_quota
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.off_hours_interval = off_hours_interval
+        self.service_hours = service_hours
+        self.smoothing = smoothing
+
+        self.intervals = {line: min_interval for line in self.lines}
+        self.next_poll = {line: 0.0 for line in self.lines}
+        self.last_poll = {line: None for line in self.lines}
+        # 호선별 변화율 EWMA (변경 건수/초)
+        self.rates = {line: None for line in self.lines}
+        self.empty_streak = {line: 0 for line in self.lines}
+        self._last_state = {line: {} for line in self.lines}
+        self.calls = 0
+        self.changes = 0
+
+    def in_service(self, now: float = None):
+        """now(epoch 초)가 운행 시간대(KST)인지 여부"""
+        now = time.time() if now is None else now
+        local = datetime.fromtimestamp(now, KST)
+        hour = local.hour + local.minute / 60
+        start, end = self.service_hours
+        if start <= end:
+            return start <= hour < end
+        return hour >= start or hour < end
+
+    def due_lines(self, now: float = None):
+        """이번 틱에 조회할 호선 목록 (예정 시각이 지난 호선)"""
+        now = time.time() if now is None else now
+        return [line for line in self.lines if self.next_poll[line] <= now]
+
+    def observe(self, positions: dict, now: float = None):
+        """
+        조회 결과 {호선명: 데이터 리스트} 를 반영해 호선별 변화율을 갱신하고 다음 조회 시각을 다시 계산합니다.
+        """
+        now = time.time() if now is None else now
+        for line, data_list in positions.items():
+            if line not in self.intervals:
+                continue
+            self.calls += 1
+            state = {item.get("trainNo"): tuple(item.get(f) for f in self.STATE_FIELDS) for item in data_list}
+            previous = self._last_state[line]
+            changed = sum(1 for train, s in state.items() if previous.get(train) != s)
+            self._last_state[line] = state
+            self.empty_streak[line] = 0 if data_list else self.empty_streak[line] + 1
+
+            last = self.last_poll[line]
+            self.last_poll[line] = now
+            if last is None:
+                # 첫 조회는 비교 대상이 없으므로 변화율을 계산하지 않음
+                continue
+            self.changes += changed
+            rate = changed / max(now - last, 1e-3)
+            prev_rate = self.rates[line]
+            self.rates[line] = rate if prev_rate is None else prev_rate + self.smoothing * (rate - prev_rate)
+
+        self._reschedule(now)
+
+    def _reschedule(self, now: float):
+        budget = self.daily_quota / 86400  # 초당 허용 호출 수
+        in_service = self.in_service(now)
+
+        fixed = {}
+        for line in self.lines:
+            if not in_service:
+                fixed[line] = self.off_hours_interval
+            elif self.empty_streak[line] >= 2:
+                fixed[line] = self.max_interval
+        active = [line for line in self.lines if line not in fixed]
+
+        intervals = dict(fixed)
+        remaining = budget - sum(1 / iv for iv in fixed.values())
+        weights = {line: max(self.rates[line] or 0.0, self.MIN_RATE) for line in active}
+        # 변화율에 비례해 호출을 배분하되, min_interval 에 걸린 호선은 하한으로 고정하고 남은 한도를 나머지에 다시 배분
+        while weights:
+            total_weight = sum(weights.values())
+            capped = [line for line, w in weights.items()
+                      if remaining > 0 and remaining * w / total_weight > 1 / self.min_interval]
+            if not capped:
+                break
+            for line in capped:
+                intervals[line] = self.min_interval
+                remaining -= 1 / self.min_interval
+                del weights[line]
+        total_weight = sum(weights.values())
+        for line, weight in weights.items():
+            share = remaining * weight / total_weight
+            intervals[line] = min(1 / share, self.max_interval) if share > 0 else self.max_interval
+
+        # max_interval 로 당겨 잡은 호선 때문에 한도를 넘으면 활성 호선 주기를 같은 비율로 늘림 (한도 우선)
+        used = sum(1 / iv for iv in intervals.values())
+        if active and used > budget:
+            active_rate = sum(1 / intervals[line] for line in active)
+            spare = budget - (used - active_rate)
+            scale = active_rate / spare if spare > 0 else float("inf")
+            for line in active:
+                intervals[line] = min(intervals[line] * scale, self.off_hours_interval)
+
+        self.intervals = intervals
+        for line in self.lines:
+            last = self.last_poll[line]
+            self.next_poll[line] = now if last is None else last + intervals[line]
+
+    def stats(self):
+        """
+        호선별 현재 주기/변화율과 호출 1회당 변경 건수, 하루 예상 호출 수를 반환합니다.
+        """
+        return {
+            "calls": self.calls,
+            "changes_per_call": round(self.changes / self.calls, 2) if self.calls else 0.0,
+            "projected_daily_calls": round(sum(86400 / iv for iv in self.intervals.values())),
+            "daily_quota": self.daily_quota,
+            "intervals_sec": {line: round(iv, 1) for line, iv in self.intervals.items()},
+            "change_rates": {line: round(r, 3) for line, r in self.rates.items() if r is not None},
+        }
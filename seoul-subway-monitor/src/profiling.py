@@ -0,0 +1,358 @@
+"""
+분석 실행 프로파일링 (--profile)
+
+단계(stage)마다 실행 시간/CPU 시간/최대 메모리를 기록하고, 선택적으로 cProfile 또는 샘플링 프로파일러를 함께 돌려
+버전 간에 비교할 수 있는 JSON 보고서를 남깁니다.
+- 코드에서는 `with stage("이름"):` 으로 구간을 표시합니다. 프로파일링 중이 아니면 아무 일도 하지 않습니다.
+- 단계는 중첩되며 'load/to_frame/to_datetime' 처럼 경로로 기록됩니다. (같은 경로는 합산)
+- 메모리는 tracemalloc 기준 단계 안에서의 최대 추가 할당량입니다. (numpy/pandas 버퍼 포함)
+- 단계 기록은 메인 스레드에서만 합니다. 프로파일링 중에는 분석을 순차 실행하세요.
+
+보고서 비교:
+    python profiling.py diff profile_old.json profile_new.json
+"""
+import argparse
+import cProfile
+import json
+import platform
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 보고서 형식 버전 (필드가 바뀌면 올림)
+REPORT_VERSION = 1
+
+# 보고서에 남길 cProfile/샘플링 상위 함수 수
+TOP_FUNCTIONS = 40
+
+# 비교 시 이 배율을 넘으면 회귀로 표시 (측정 잡음이 큰 짧은/작은 단계는 절대 증가량도 이 값을 넘어야 함)
+REGRESSION_RATIO = 1.2
+MIN_REGRESSION_SEC = 0.05
+MIN_REGRESSION_MB = 1.0
+
+# 현재 실행 중인 프로파일러 (없으면 stage 는 아무 일도 하지 않음)
+_active = None
+
+def stage(name: str):
+    """
+    프로파일링 중이면 구간을 기록하는 컨텍스트 매니저, 아니면 아무 일도 하지 않는 컨텍스트를 반환합니다.
+    """
+    if _active is None or threading.current_thread() is not _active.thread:
+        return nullcontext()
+    return _active.stage(name)
+
+def annotate(**values):
+    """프로파일링 중이면 보고서에 실행 정보(행 수 등)를 추가합니다."""
+    if _active is not None:
+        _active.annotate(**values)
+
+class SamplingProfiler:
+    """
+    대상 스레드의 호출 스택을 일정 간격으로 읽어 함수별 샘플 수를 세는 간단한 샘플링 프로파일러
+    (추가 의존성 없이 sys._current_frames 사용, 오버헤드는 간격에 비례)
+    """
+
+    def __init__(self, thread: threading.Thread, interval: float = 0.005):
+        self.thread = thread
+        self.interval = interval
+        self.samples = 0
+        self.leaf = Counter()
+        self.inclusive = Counter()
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._sampler = None
+
+    @staticmethod
+    def _label(code):
+        return f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno}({code.co_name})"
+
+    def _run(self):
+        ident = self.thread.ident
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(ident)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            self.samples += 1
+            self.leaf[stack[0]] += 1
+            for label in set(stack):
+                self.inclusive[label] += 1
+            # flamegraph 도구가 읽는 접힌 스택 형식 (바깥 → 안쪽)
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._sampler = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+    def report(self, top: int = TOP_FUNCTIONS):
+        def share(count):
+            return round(count / self.samples, 4) if self.samples else 0.0
+
+        return {
+            "interval_sec": self.interval,
+            "samples": self.samples,
+            "self": [{"function": f, "samples": n, "share": share(n)} for f, n in self.leaf.most_common(top)],
+            "inclusive": [{"function": f, "samples": n, "share": share(n)} for f, n in self.inclusive.most_common(top)],
+            "stacks": dict(self.stacks.most_common(top)),
+        }
+
+class Profiler:
+    """
+    단계별 시간/메모리와 (선택) cProfile·샘플링 결과를 모아 JSON 보고서로 저장합니다.
+
+    Args:
+        mode (str): 'stages' (단계 기록만), 'cprofile', 'sample'
+        out (str): 보고서 경로 (없으면 profile_YYYYmmdd_HHMMSS.json)
+        sample_interval (float): 샘플링 간격(초)
+        memory (bool): tracemalloc 으로 단계별 최대 메모리를 기록할지 여부 (실행이 느려짐)
+    """
+
+    def __init__(self, mode: str = "stages", out: str = None, sample_interval: float = 0.005, memory: bool = True):
+        self.mode = mode
+        self.out = out or datetime.now().strftime("profile_%Y%m%d_%H%M%S.json")
+        self.sample_interval = sample_interval
+        self.memory = memory
+        self.thread = threading.current_thread()
+        self.stages = {}
+        self.meta = {}
+        self._stack = []
+        self._profile = None
+        self._sampler = None
+        self._started = None
+
+    @contextmanager
+    def stage(self, name: str):
+        """구간 하나의 시간/CPU/최대 메모리를 기록합니다. (바깥 구간 안에서 부르면 경로로 중첩)"""
+        path = "/".join([entry["path"] for entry in self._stack[-1:]] + [name])
+        entry = {"path": path, "peak": 0}
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                # 바깥 단계의 최대치를 보존한 뒤 이 단계 기준으로 다시 잼
+                self._stack[-1]["peak"] = max(self._stack[-1]["peak"], peak)
+            tracemalloc.reset_peak()
+            entry["base"] = current
+        self._stack.append(entry)
+        # 보고서의 단계 순서는 처음 시작한 순서
+        record = self.stages.setdefault(path, {"calls": 0, "wall_sec": 0.0, "cpu_sec": 0.0, "peak_mb": None})
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            self._stack.pop()
+            peak_mb = None
+            if self.memory:
+                peak = max(entry["peak"], tracemalloc.get_traced_memory()[1])
+                peak_mb = (peak - entry["base"]) / 1e6
+                if self._stack:
+                    self._stack[-1]["peak"] = max(self._stack[-1]["peak"], peak)
+                tracemalloc.reset_peak()
+
+            record["calls"] += 1
+            record["wall_sec"] += wall
+            record["cpu_sec"] += cpu
+            if peak_mb is not None:
+                record["peak_mb"] = max(record["peak_mb"] or 0.0, peak_mb)
+
+    def annotate(self, **values):
+        """보고서에 남길 실행 정보(행 수, 인자 등)를 추가합니다."""
+        self.meta.update(values)
+
+    def start(self):
+        global _active
+        _active = self
+        self._started = time.perf_counter()
+        if self.memory:
+            tracemalloc.start()
+        if self.mode == "cprofile":
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        elif self.mode == "sample":
+            self._sampler = SamplingProfiler(self.thread, self.sample_interval)
+            self._sampler.start()
+        return self
+
+    def stop(self):
+        global _active
+        if self._profile is not None:
+            self._profile.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+        if self.memory:
+            tracemalloc.stop()
+        _active = None
+        return self.save()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def _cprofile_report(self, top: int = TOP_FUNCTIONS):
+        stats = pstats.Stats(self._profile)
+        rows = []
+        for (filename, line, func), (cc, nc, tt, ct, _) in stats.stats.items():
+            rows.append({
+                "function": f"{filename.rsplit('/', 1)[-1]}:{line}({func})",
+                "ncalls": nc,
+                "tottime": round(tt, 4),
+                "cumtime": round(ct, 4),
+            })
+        rows.sort(key=lambda row: row["cumtime"], reverse=True)
+        return rows[:top]
+
+    def report(self):
+        import numpy as np
+        import pandas as pd
+
+        report = {
+            "version": REPORT_VERSION,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "command": sys.argv,
+            "mode": self.mode,
+            "environment": {
+                "python": platform.python_version(),
+                "pandas": pd.__version__,
+                "numpy": np.__version__,
+                "platform": platform.platform(),
+            },
+            "meta": self.meta,
+            "total_sec": round(time.perf_counter() - self._started, 4),
+            # Linux 는 KB 단위 (Windows 는 측정하지 않음)
+            "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1) if resource else None,
+            "stages": {
+                path: {
+                    "calls": r["calls"],
+                    "wall_sec": round(r["wall_sec"], 4),
+                    "cpu_sec": round(r["cpu_sec"], 4),
+                    "peak_mb": None if r["peak_mb"] is None else round(r["peak_mb"], 2),
+                }
+                for path, r in self.stages.items()
+            },
+        }
+        if self._profile is not None:
+            report["cprofile"] = self._cprofile_report()
+        if self._sampler is not None:
+            report["sampling"] = self._sampler.report()
+        return report
+
+    def save(self):
+        """보고서를 저장하고, cProfile 을 켰다면 원본 통계(.prof)도 함께 저장합니다."""
+        report = self.report()
+        with open(self.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        if self._profile is not None:
+            self._profile.dump_stats(self.out.rsplit(".", 1)[0] + ".prof")
+        print_stages(report)
+        print(f"-> 프로파일 보고서 저장: {self.out}")
+        return report
+
+def add_profile_arguments(parser: argparse.ArgumentParser):
+    """분석 진입점 공통 --profile 인자"""
+    parser.add_argument("--profile", nargs="?", const="stages", choices=["stages", "cprofile", "sample"],
+                        default=None, help="단계별 시간/메모리 기록 (cprofile/sample 을 주면 함께 실행)")
+    parser.add_argument("--profile-out", default=None, help="프로파일 보고서(JSON) 경로")
+    parser.add_argument("--sample-interval", type=float, default=0.005, help="샘플링 간격(초)")
+    parser.add_argument("--no-profile-memory", action="store_true", help="tracemalloc 메모리 측정은 끔")
+
+def profiler_from_args(args):
+    """--profile 이 없으면 아무 일도 하지 않는 컨텍스트를 반환합니다."""
+    if not args.profile:
+        return nullcontext()
+    return Profiler(args.profile, args.profile_out, args.sample_interval, memory=not args.no_profile_memory)
+
+def print_stages(report: dict):
+    print("\n[프로파일] 단계별 실행 시간/메모리")
+    print(f"{'단계':<40}{'호출':>6}{'시간(초)':>10}{'CPU(초)':>10}{'최대 메모리(MB)':>16}")
+    for path, r in report["stages"].items():
+        name = "  " * path.count("/") + path.rsplit("/", 1)[-1]
+        peak = "-" if r["peak_mb"] is None else f"{r['peak_mb']:.1f}"
+        print(f"{name:<40}{r['calls']:>6}{r['wall_sec']:>10.3f}{r['cpu_sec']:>10.3f}{peak:>16}")
+    rss = "" if report["max_rss_mb"] is None else f", 프로세스 최대 RSS {report['max_rss_mb']:.0f} MB"
+    print(f"-> 전체 {report['total_sec']:.3f}초{rss}")
+
+def diff_reports(old: dict, new: dict):
+    """
+    두 보고서의 단계별 시간/메모리를 비교합니다.
+
+    Returns:
+        list: [(단계, 이전 시간, 새 시간, 시간 배율, 이전 메모리, 새 메모리, 메모리 배율), ...], 회귀 단계 목록
+    """
+    def ratio(before, after):
+        return after / before if before and after is not None else None
+
+    rows, regressions = [], []
+    paths = list(old["stages"]) + [p for p in new["stages"] if p not in old["stages"]]
+    for path in paths:
+        before = old["stages"].get(path, {})
+        after = new["stages"].get(path, {})
+        sec_ratio = ratio(before.get("wall_sec"), after.get("wall_sec"))
+        mem_ratio = ratio(before.get("peak_mb"), after.get("peak_mb"))
+        rows.append((path, before.get("wall_sec"), after.get("wall_sec"), sec_ratio,
+                     before.get("peak_mb"), after.get("peak_mb"), mem_ratio))
+        slower = sec_ratio is not None and sec_ratio > REGRESSION_RATIO \
+            and after["wall_sec"] - before["wall_sec"] > MIN_REGRESSION_SEC
+        larger = mem_ratio is not None and mem_ratio > REGRESSION_RATIO \
+            and after["peak_mb"] - before["peak_mb"] > MIN_REGRESSION_MB
+        if slower or larger:
+            regressions.append(path)
+    return rows, regressions
+
+def _print_diff(old: dict, new: dict):
+    def fmt(value, spec):
+        return "-" if value is None else format(value, spec)
+
+    if old.get("meta") != new.get("meta"):
+        print(f"[주의] 실행 조건이 다릅니다: {old.get('meta')} vs {new.get('meta')}")
+    rows, regressions = diff_reports(old, new)
+    print(f"{'단계':<40}{'이전(초)':>10}{'이후(초)':>10}{'배율':>8}{'이전(MB)':>10}{'이후(MB)':>10}{'배율':>8}")
+    for path, sec_a, sec_b, sec_r, mem_a, mem_b, mem_r in rows:
+        print(f"{path:<40}{fmt(sec_a, '.3f'):>10}{fmt(sec_b, '.3f'):>10}{fmt(sec_r, '.2f'):>8}"
+              f"{fmt(mem_a, '.1f'):>10}{fmt(mem_b, '.1f'):>10}{fmt(mem_r, '.2f'):>8}")
+    print(f"-> 전체 {old['total_sec']:.3f}초 → {new['total_sec']:.3f}초")
+    if regressions:
+        print(f"[회귀] {REGRESSION_RATIO}배를 넘은 단계: {', '.join(regressions)}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="프로파일 보고서 도구")
+    sub = parser.add_subparsers(dest="command", required=True)
+    diff = sub.add_parser("diff", help="두 보고서의 단계별 시간/메모리 비교")
+    diff.add_argument("old")
+    diff.add_argument("new")
+    show = sub.add_parser("show", help="보고서의 단계별 시간/메모리 출력")
+    show.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "diff":
+        with open(args.old, encoding="utf-8") as f:
+            old = json.load(f)
+        with open(args.new, encoding="utf-8") as f:
+            new = json.load(f)
+        sys.exit(1 if _print_diff(old, new) else 0)
+    else:
+        with open(args.path, encoding="utf-8") as f:
+            print_stages(json.load(f))
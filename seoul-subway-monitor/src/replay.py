@@ -0,0 +1,54 @@
+import time
+
+def percentile(values: list, q: float):
+    """정렬된 값 목록의 q 분위수 (nearest-rank, 값이 없으면 None)"""
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+class ReplayMeter:
+    """
+    재생(부하 테스트) 중 수집 사이클별 처리량과 지연을 모으는 측정기
+    - 사이클 결과(_collect 반환값)를 record 로 쌓고, summary 로 처리량/분위수 지연을 계산합니다.
+    """
+
+    def __init__(self, speed: float = 1.0):
+        self.speed = speed
+        self.started = time.perf_counter()
+        self.cycles = []
+
+    def record(self, cycle: dict):
+        if cycle:
+            self.cycles.append(cycle)
+
+    @staticmethod
+    def _latency(values: list):
+        values = sorted(values)
+        if not values:
+            return {}
+        return {
+            "p50": round(percentile(values, 0.50), 3),
+            "p95": round(percentile(values, 0.95), 3),
+            "p99": round(percentile(values, 0.99), 3),
+            "max": round(values[-1], 3),
+        }
+
+    def summary(self):
+        """
+        Returns:
+            dict: 사이클 수, 경과 시간(실제/가상), 조회·저장 행 수와 초당 처리량, 조회/사이클 지연 분위수(초)
+        """
+        elapsed = time.perf_counter() - self.started
+        fetched = sum(c["fetched"] for c in self.cycles)
+        stored = sum(c["stored"] for c in self.cycles)
+        return {
+            "cycles": len(self.cycles),
+            "elapsed_sec": round(elapsed, 1),
+            "simulated_sec": round(elapsed * self.speed, 1),
+            "fetched_rows": fetched,
+            "stored_rows": stored,
+            "fetched_rows_per_sec": round(fetched / elapsed, 1) if elapsed else 0.0,
+            "stored_rows_per_sec": round(stored / elapsed, 1) if elapsed else 0.0,
+            "fetch_latency_sec": self._latency([c["fetch_sec"] for c in self.cycles]),
+            "cycle_latency_sec": self._latency([c["cycle_sec"] for c in self.cycles]),
+        }
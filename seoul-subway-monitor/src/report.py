@@ -0,0 +1,95 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from data_loader import DataLoader
+from frames import SharedFrame, normalize_frame
+from analyzer1 import compute_interval_stats, print_interval_stats
+from analyzer2 import compute_dwell_stats, print_dwell_hotspots
+from analyzer3 import compute_turnarounds, print_turnarounds
+from analyzer4 import compute_express_headways, print_express_headways
+from profiling import stage, annotate, add_profile_arguments, profiler_from_args
+
+# (제목, 계산 함수, 출력 함수)
+ANALYSES = [
+    ("[분석 1] 배차 간격 정기성", compute_interval_stats, print_interval_stats),
+    ("[분석 2] 지연 발생 구간(Hotspots)", compute_dwell_stats, print_dwell_hotspots),
+    ("[분석 3] 회차 효율성(Turnaround)", compute_turnarounds, print_turnarounds),
+    ("[분석 4] 급행/일반 열차 간섭", compute_express_headways, print_express_headways),
+]
+
+def _timed(name, func, *args):
+    # 프로파일링 중이면 같은 구간을 단계(name)로도 기록 (병렬 실행 중인 스레드에서는 기록하지 않음)
+    with stage(name):
+        started = time.perf_counter()
+        result = func(*args)
+        return result, time.perf_counter() - started
+
+def run_report(limit: int = 15000, days: float = None, parallel: bool = True):
+    """
+    통합 리포트 실행
+    - 데이터를 한 번만 로드하고, 타입 정리와 공통 정렬도 한 번만 수행한 뒤
+      분석 1~4를 같은 DataFrame 위에서 실행합니다.
+    - 단계별 소요 시간(초)을 함께 출력합니다.
+
+    Args:
+        limit (int): 최근 limit 건을 로드 (days 가 지정되면 무시)
+        days (float): 최근 n일 구간을 로드
+        parallel (bool): 분석 1~4를 스레드로 동시에 계산할지 여부
+
+    Returns:
+        dict: {단계명: 소요 시간(초)}
+    """
+    print(">>> 통합 분석 리포트 생성 중...\n")
+    timings = {}
+
+    loader = DataLoader()
+    if days is not None:
+        df, timings['load'] = _timed("load", loader.fetch_recent, days)
+    else:
+        df, timings['load'] = _timed("load", loader.fetch_data, limit)
+
+    annotate(limit=limit, days=days, rows=len(df), parallel=parallel)
+    if df.empty:
+        return timings
+    print(f"-> 총 {len(df)}건의 데이터를 로드했습니다.\n")
+
+    normalized, timings['normalize'] = _timed("normalize", normalize_frame, df)
+    frame = SharedFrame(normalized, normalized=True)
+
+    # 공통 정렬 순서를 미리 만들어 둠 (이후 분석들은 정렬 없이 재사용)
+    def build_orders():
+        return frame.by_train, frame.by_station
+    _, timings['sort'] = _timed("sort", build_orders)
+
+    # 분석 계산 (출력은 순서가 섞이지 않도록 계산이 끝난 뒤 차례대로)
+    if parallel:
+        with ThreadPoolExecutor(max_workers=len(ANALYSES)) as executor:
+            futures = [executor.submit(_timed, compute.__name__, compute, frame) for _, compute, _ in ANALYSES]
+            results = [f.result() for f in futures]
+    else:
+        results = [_timed(compute.__name__, compute, frame) for _, compute, _ in ANALYSES]
+
+    with stage("print"):
+        for (title, _, printer), (result, elapsed) in zip(ANALYSES, results):
+            timings[title] = elapsed
+            print(f"=== {title} ===")
+            printer(result)
+            print()
+
+    print("[단계별 소요 시간]")
+    timing_table = pd.DataFrame({'단계': list(timings.keys()), '소요시간(초)': [round(v, 3) for v in timings.values()]})
+    print(timing_table.to_string(index=False))
+    return timings
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="분석 1~4 통합 리포트")
+    parser.add_argument("--limit", type=int, default=15000, help="최근 N건 로드 (기본 15000)")
+    parser.add_argument("--days", type=float, default=None, help="최근 N일 구간 로드 (지정 시 --limit 무시)")
+    parser.add_argument("--sequential", action="store_true", help="분석을 순차 실행")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    # 프로파일링 중에는 단계별 시간/메모리가 섞이지 않도록 순차 실행
+    with profiler_from_args(args):
+        run_report(limit=args.limit, days=args.days, parallel=not (args.sequential or args.profile))
@@ -0,0 +1,192 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from config import Config
+from alerts import AlertEngine
+from api_client import SeoulSubwayAPI
+from db_client import SupabaseClient
+from dedup import ChangeFilter
+from fleet_state import FleetState
+from live_engine import LiveAnalyzer
+from polling import AdaptivePoller, parse_service_hours
+from spool import WriteSpool, SpoolFlusher
+
+class CollectorRuntime:
+    """
+    스케줄러 틱 사이에 API 세션과 DB 클라이언트를 재사용하는 장기 실행 런타임
+    - 매 틱마다 TCP/TLS/인증을 새로 맺지 않도록 연결을 유지합니다.
+    - 주기적으로 DB 헬스 체크를 하고, 실패 시 클라이언트를 다시 만듭니다.
+    """
+
+    def __init__(self, health_check_interval: int = None):
+        self.api = SeoulSubwayAPI()
+        self.db = SupabaseClient()
+        self.health_check_interval = health_check_interval or Config.DB_HEALTH_CHECK_INTERVAL_SEC
+        self._last_health_check = time.monotonic()
+
+        # 변경분 저장용 직전 상태 캐시 (비활성화 시 None)
+        self.change_filter = ChangeFilter(Config.HEARTBEAT_MINUTES) if Config.CHANGE_ONLY_INGESTION else None
+
+        # 스냅샷마다 갱신되는 실시간 분석 (비활성화 시 None)
+        self.live = LiveAnalyzer() if Config.LIVE_ANALYSIS else None
+
+        # 역/방향별 기준값 대비 이상을 틱마다 알리는 실시간 경보 (비활성화 시 None)
+        self.alerts = None
+        if Config.REALTIME_ALERTS:
+            self.alerts = AlertEngine(Config.ALERT_EWMA_ALPHA, Config.ALERT_SIGMA, Config.ALERT_MIN_SAMPLES)
+
+        # 열차별 현재 위치 (조회 API 용, 비활성화 시 None)
+        self.fleet = FleetState(Config.FLEET_EVICT_SEC) if Config.FLEET_STATE else None
+
+        # 로컬 스풀에 먼저 기록하고 백그라운드에서 DB 로 반영 (비활성화 시 None → 바로 DB 저장)
+        self.spool = None
+        self.flusher = None
+        if Config.USE_SPOOL:
+            self.spool = WriteSpool(Config.SPOOL_PATH)
+            self.flusher = SpoolFlusher(
+                self.spool, self._write_batch, healthy=self.db.health_check,
+                batch_size=Config.SPOOL_FLUSH_BATCH,
+                interval=Config.SPOOL_FLUSH_INTERVAL_SEC,
+                max_backoff=Config.SPOOL_MAX_BACKOFF_SEC,
+            )
+            self.flusher.start()
+
+        # 호선별 수집 주기 조정 정책 (비활성화 시 None → 설정된 고정 주기로 수집)
+        self.poller = None
+        if Config.ADAPTIVE_POLLING and Config.adaptive_lines():
+            # 주기를 고정한 호선이 쓰는 호출 수를 뺀 나머지 한도를 적응형 호선끼리 나눠 씀
+            fixed_calls = sum(86400 / sec for sec in Config.LINE_INTERVALS.values())
+            self.poller = AdaptivePoller(
+                Config.adaptive_lines(),
+                daily_quota=max(Config.API_DAILY_QUOTA - fixed_calls, 0),
+                min_interval=Config.POLL_MIN_INTERVAL_SEC,
+                max_interval=Config.POLL_MAX_INTERVAL_SEC,
+                off_hours_interval=Config.POLL_OFF_HOURS_INTERVAL_SEC,
+                service_hours=parse_service_hours(Config.SERVICE_HOURS),
+            )
+
+        # 수집 작업이 겹쳐 실행될 때 틱 카운터/적응형 주기/변경분 캐시/실시간 분석 상태를 보호하는 잠금
+        # 조회와 저장(스풀 기록/DB 저장, 재연결 포함)은 잠그지 않으므로 호선별 작업이 서로를 기다리지 않습니다.
+        # (API 세션은 전용 이벤트 루프 스레드에서, 현재 위치 저장소와 경보는 자체 잠금으로 보호)
+        self.lock = threading.Lock()
+
+        self.ticks = 0
+        self.db_client_reuses = 0
+        self.db_reconnects = 0
+
+    def begin_tick(self):
+        """
+        틱 시작 시 호출합니다. 헬스 체크 주기가 지났으면 DB 상태를 확인합니다.
+        """
+        if self.ticks > 0:
+            self.db_client_reuses += 1
+        self.ticks += 1
+        if self.change_filter is not None:
+            self.change_filter.begin_cycle()
+
+        if time.monotonic() - self._last_health_check >= self.health_check_interval:
+            self.ensure_db()
+
+    def ensure_db(self):
+        """
+        DB 헬스 체크 후 실패하면 재연결합니다.
+
+        Returns:
+            bool: 헬스 체크 통과 여부 (재연결 전 기준)
+        """
+        self._last_health_check = time.monotonic()
+        if self.db.health_check():
+            return True
+
+        print("[DB 재연결] 헬스 체크 실패로 Supabase 클라이언트를 다시 생성합니다.")
+        try:
+            self.db.reconnect()
+            self.db_reconnects += 1
+        except Exception as e:
+            print(f"[DB 재연결 오류] {e}")
+        return False
+
+    def fetch_all(self, line_names: list):
+        """
+        유지 중인 세션으로 모든 호선을 동시에 조회합니다. (잠금 없이 호출)
+        """
+        positions = self.api.get_all_positions(line_names)
+        if self.poller is not None:
+            with self.lock:
+                self.poller.observe(positions)
+        return positions
+
+    def select_changes(self, data_list: list):
+        """
+        직전 스냅샷 대비 변경된 열차만 고릅니다. (변경분 저장 비활성화 시 그대로 반환)
+
+        Returns:
+            tuple: (저장할 데이터 리스트, insert_positions 에 넘길 변경분 토큰 또는 None)
+        """
+        if self.change_filter is None:
+            return data_list, None
+        with self.lock:
+            changed = self.change_filter.filter(data_list)
+            return changed, self.change_filter.take_pending()
+
+    def _write_batch(self, data_list: list):
+        """
+        저장 실패 시 DB 상태를 확인하고, 재연결했다면 한 번 더 시도합니다.
+        """
+        ok = self.db.insert_positions(data_list)
+        if not ok and not self.ensure_db():
+            # 재연결했다면 한 번 더 시도 (DB가 정상이면 데이터 자체 문제이므로 재시도하지 않음)
+            ok = self.db.insert_positions(data_list)
+        return ok
+
+    def insert_positions(self, data_list: list, token: tuple = None):
+        """
+        스풀을 쓰면 로컬에 기록만 하고 바로 반환합니다. (DB 반영은 플러셔가 담당)
+        스풀을 쓰지 않으면 바로 DB 에 저장합니다. (잠금 없이 저장 → 느린 DB 가 다른 호선 작업을 막지 않음)
+        기록/저장에 성공하면 select_changes 가 돌려준 token 으로 변경분 캐시를 갱신합니다.
+        """
+        if self.spool is not None:
+            self.spool.append(data_list)
+            self.flusher.notify()
+            ok = True
+        else:
+            ok = self._write_batch(data_list)
+        if ok and token is not None:
+            with self.lock:
+                self.change_filter.commit(token=token)
+        return ok
+
+    def maintain_storage(self):
+        """
+        파티션 생성/삭제와 최근 구간의 시간별 롤업 갱신을 실행합니다.
+        롤업은 완료된 시간 구간만 대상으로 하되, 늦게 적재된 로그를 위해 최근 몇 시간을 다시 계산합니다.
+        """
+        partitions = self.db.maintain_partitions(Config.PARTITION_DAYS_AHEAD, Config.RETENTION_DAYS)
+        end = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        start = end - timedelta(hours=Config.ROLLUP_LOOKBACK_HOURS)
+        rollups = self.db.refresh_rollups(start, end)
+        return {"partitions": partitions, "rollups": rollups}
+
+    def report(self):
+        """
+        연결 재사용 현황을 반환합니다.
+        """
+        stats = {
+            "ticks": self.ticks,
+            "db_client_reuses": self.db_client_reuses,
+            "db_reconnects": self.db_reconnects,
+        }
+        if self.change_filter is not None:
+            stats["dedup_ratio"] = round(self.change_filter.dedup_ratio, 3)
+        if self.flusher is not None:
+            stats["spool"] = self.flusher.report()
+        if self.poller is not None:
+            stats["polling"] = self.poller.stats()
+        stats.update(self.api.connection_stats())
+        return stats
+
+    def close(self):
+        if self.flusher is not None:
+            self.flusher.stop()
+            self.spool.close()
+        self.api.close()
@@ -0,0 +1,175 @@
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# 이전 실행이 아직 끝나지 않았을 때 다음 틱 처리 방식
+# - skip: 이번 틱을 건너뜀
+# - coalesce: 밀린 틱을 하나로 합쳐, 이전 실행이 끝나는 즉시 한 번 더 실행
+# - parallel: 이전 실행과 겹쳐서 바로 실행
+OVERRUN_POLICIES = ("skip", "coalesce", "parallel")
+
+# 지연 통계에 보관할 최근 실행 수
+STATS_WINDOW = 500
+
+class _Job:
+    def __init__(self, name, interval, offset, func, args, kwargs, overrun):
+        self.name = name
+        self.interval = interval
+        self.offset = offset
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.overrun = overrun
+        self.next_due = None
+        self.running = 0
+        # coalesce 정책에서 실행 중에 도래한 틱 (가장 이른 예정 시각)
+        self.pending_due = None
+        self.lags = deque(maxlen=STATS_WINDOW)
+        self.durations = deque(maxlen=STATS_WINDOW)
+        self.counts = {"ticks": 0, "runs": 0, "skipped": 0, "coalesced": 0, "missed": 0, "errors": 0}
+
+    def boundary_after(self, now: float):
+        """now 이후 첫 번째 벽시계 경계 (epoch 기준 interval 배수 + offset)"""
+        return (math.floor((now - self.offset) / self.interval) + 1) * self.interval + self.offset
+
+class TickScheduler:
+    """
+    벽시계 경계에 맞춰 작업을 실행하는 수집 스케줄러
+    - 다음 실행 시각을 '이전 실행이 끝난 시각'이 아니라 정해진 경계(예: 매분 0초, 15초 간격이면 :00/:15/:30/:45)
+      로 계산하므로, 실행이 느려도 이후 틱이 계속 밀리지 않습니다. (드리프트 없음)
+    - 작업은 워커 스레드에서 실행되어 한 작업이 느려도 다른 작업의 틱에는 영향이 없습니다.
+    - 이전 실행이 끝나기 전에 다음 틱이 오면 작업별 정책(skip/coalesce/parallel)에 따라 처리하고 횟수를 기록합니다.
+    - 작업별 틱 지연(예정 시각 → 실제 시작 시각)과 실행 시간 통계를 stats() 로 제공합니다.
+    """
+
+    def __init__(self, max_workers: int = 8):
+        self.jobs = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tick")
+
+    def every(self, interval: float, func, *args, name: str = None, offset: float = 0.0,
+              overrun: str = "coalesce", **kwargs):
+        """
+        interval 초마다 경계에 맞춰 func(*args, **kwargs) 를 실행하도록 등록합니다.
+
+        Args:
+            interval (float): 실행 주기(초). 1분 미만도 가능 (예: 15)
+            name (str): 통계에 표시할 작업 이름
+            offset (float): 경계에서 밀어서 실행할 시간(초) (예: interval=3600, offset=300 → 매시 5분)
+            overrun (str): 이전 실행이 끝나지 않았을 때의 정책 (skip / coalesce / parallel)
+        """
+        if interval <= 0:
+            raise ValueError("interval 은 0보다 커야 합니다.")
+        if overrun not in OVERRUN_POLICIES:
+            raise ValueError(f"지원하지 않는 overrun 정책입니다: {overrun} (가능: {', '.join(OVERRUN_POLICIES)})")
+        job = _Job(name or getattr(func, "__name__", "job"), interval, offset % interval, func, args, kwargs, overrun)
+        job.next_due = job.boundary_after(time.time())
+        with self._lock:
+            self.jobs.append(job)
+        return job
+
+    def run_pending(self, now: float = None):
+        """
+        예정 시각이 지난 작업을 실행(워커 스레드로 전달)합니다.
+
+        Returns:
+            float: 다음 예정 시각까지 남은 시간(초)
+        """
+        now = time.time() if now is None else now
+        for job in list(self.jobs):
+            # 시계가 크게 뒤로 바뀐 경우 경계를 다시 계산
+            if job.next_due - now > job.interval + 1:
+                job.next_due = job.boundary_after(now)
+            if now < job.next_due:
+                continue
+
+            scheduled = job.next_due
+            # 루프가 멈춰 있던 동안 통째로 지나간 틱 수
+            missed = int((now - scheduled) // job.interval)
+            job.next_due = scheduled + (missed + 1) * job.interval
+            job.counts["ticks"] += 1
+            job.counts["missed"] += missed
+            self._fire(job, scheduled)
+
+        if not self.jobs:
+            return 1.0
+        return max(0.0, min(job.next_due for job in self.jobs) - time.time())
+
+    def _fire(self, job: _Job, scheduled: float):
+        with self._lock:
+            if job.running and job.overrun != "parallel":
+                if job.overrun == "coalesce":
+                    job.counts["coalesced"] += 1
+                    if job.pending_due is None:
+                        job.pending_due = scheduled
+                else:
+                    job.counts["skipped"] += 1
+                print(f"[스케줄러] {job.name}: 이전 실행이 끝나지 않아 이번 틱을 {'병합' if job.overrun == 'coalesce' else '건너뜀'}")
+                return
+            job.running += 1
+        self._executor.submit(self._run, job, scheduled)
+
+    def _run(self, job: _Job, scheduled: float):
+        while True:
+            started = time.time()
+            try:
+                job.func(*job.args, **job.kwargs)
+            except Exception as e:
+                job.counts["errors"] += 1
+                print(f"[스케줄러 오류] {job.name}: {e}")
+            finished = time.time()
+
+            with self._lock:
+                job.counts["runs"] += 1
+                job.lags.append(started - scheduled)
+                job.durations.append(finished - started)
+                if job.pending_due is not None:
+                    # coalesce: 실행 중에 밀린 틱을 한 번으로 합쳐 바로 이어서 실행
+                    scheduled, job.pending_due = job.pending_due, None
+                    continue
+                job.running -= 1
+                return
+
+    def run_forever(self, duration: float = None):
+        """
+        stop() 이 호출되거나 Ctrl+C 가 입력될 때까지(duration 을 주면 최대 그 시간(초) 동안)
+        다음 경계까지 대기 → 실행을 반복합니다.
+        """
+        deadline = None if duration is None else time.time() + duration
+        while not self._stop.is_set():
+            wait = self.run_pending()
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                wait = min(wait, remaining)
+            self._stop.wait(wait)
+
+    def stop(self, wait: bool = True):
+        """스케줄 루프를 멈추고, wait=True 면 실행 중인 작업이 끝날 때까지 기다립니다."""
+        self._stop.set()
+        self._executor.shutdown(wait=wait)
+
+    def stats(self):
+        """
+        작업별 실행 횟수와 틱 지연/실행 시간 통계를 반환합니다. (초 단위, 최근 STATS_WINDOW 회 기준)
+        """
+        result = {}
+        with self._lock:
+            for job in self.jobs:
+                lags = sorted(job.lags)
+                durations = list(job.durations)
+                entry = dict(job.counts)
+                entry["interval_sec"] = job.interval
+                entry["overrun"] = job.overrun
+                if lags:
+                    entry["lag_mean_sec"] = round(sum(lags) / len(lags), 3)
+                    entry["lag_p95_sec"] = round(lags[min(len(lags) - 1, int(len(lags) * 0.95))], 3)
+                    entry["lag_max_sec"] = round(lags[-1], 3)
+                    entry["duration_mean_sec"] = round(sum(durations) / len(durations), 3)
+                    entry["duration_max_sec"] = round(max(durations), 3)
+                result[job.name] = entry
+        return result
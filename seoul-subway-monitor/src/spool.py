@@ -0,0 +1,271 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+class WriteSpool:
+    """
+    DB 에 보내기 전에 수집 데이터를 먼저 기록하는 로컬 추가 전용 버퍼 (SQLite WAL)
+    - 수집 루프는 로컬 디스크에만 쓰므로 DB 지연/장애와 무관하게 주기를 유지합니다.
+    - DB 반영이 확인된(ack) 행만 삭제하므로 프로세스가 재시작되어도 데이터가 남아 있습니다.
+    - 여러 번 재시도해도 저장되지 않는 행은 dead 테이블로 옮겨 이후 처리를 막지 않습니다.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # 수집 스레드와 플러셔 스레드가 하나의 연결을 잠금으로 나눠 씀
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL 모드에서는 NORMAL 이어도 커밋된 데이터가 프로세스 종료에 안전함 (전원 장애 시 마지막 커밋만 유실 가능)
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS spool (id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dead (id INTEGER PRIMARY KEY, payload TEXT NOT NULL, failed_at REAL NOT NULL)"
+        )
+
+    def append(self, records: list):
+        """
+        레코드 목록을 한 트랜잭션으로 기록합니다.
+
+        Returns:
+            int: 기록한 행 수
+        """
+        if not records:
+            return 0
+        payloads = [(json.dumps(r, ensure_ascii=False),) for r in records]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT INTO spool (payload) VALUES (?)", payloads)
+            self._conn.execute("COMMIT")
+        return len(payloads)
+
+    def peek(self, limit: int):
+        """
+        가장 오래된 limit 건을 삭제하지 않고 반환합니다.
+
+        Returns:
+            list: (id, record) 튜플 목록
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, payload FROM spool ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+        return [(row_id, json.loads(payload)) for row_id, payload in rows]
+
+    def ack(self, ids: list):
+        """
+        DB 반영이 끝난 행을 삭제합니다.
+        """
+        if not ids:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("DELETE FROM spool WHERE id = ?", [(i,) for i in ids])
+            self._conn.execute("COMMIT")
+
+    def bury(self, ids: list):
+        """
+        저장할 수 없는 행을 dead 테이블로 옮깁니다. (수동 확인용)
+        """
+        if not ids:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO dead (id, payload, failed_at) SELECT id, payload, ? FROM spool WHERE id = ?",
+                [(now, i) for i in ids],
+            )
+            self._conn.executemany("DELETE FROM spool WHERE id = ?", [(i,) for i in ids])
+            self._conn.execute("COMMIT")
+
+    def pending(self):
+        """아직 DB 에 반영되지 않은 행 수"""
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM spool").fetchone()[0]
+
+    def dead_count(self):
+        """dead 테이블로 옮겨진 행 수"""
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM dead").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class SpoolFlusher:
+    """
+    스풀에 쌓인 데이터를 백그라운드 스레드에서 큰 배치로 DB 에 반영하는 플러셔
+    - sink(records) 가 True 를 반환하면 해당 배치를 스풀에서 삭제합니다.
+    - 실패 시 지수 백오프(최대 max_backoff 초)로 같은 배치를 다시 시도합니다.
+    - 실패했지만 DB 가 정상(healthy() 가 True)이면 이분 탐색으로 혼자서도 저장되지 않는 행을 찾아,
+      다른 행은 저장되는 경우(행 단위 문제)에만 그 행을 dead 로 옮깁니다.
+      어떤 행도 저장되지 않으면 파티션 누락/스키마 변경 같은 전체적인 문제로 보고 백오프합니다.
+      (같은 배치가 max_isolate_retries 번 연속 그렇게 판정되면 혼자서도 실패한 행만 dead 로 옮겨 스풀이 멈추지 않게 함)
+    """
+
+    # 실패 행이 두 번 나오도록 아무것도 저장되지 않았을 때, 저장되는지 하나씩 보내 볼 행 수 (남은 구간에 고르게)
+    ISOLATE_PROBES = 8
+
+    def __init__(self, spool: WriteSpool, sink, healthy=None, batch_size: int = 5000,
+                 interval: float = 2.0, max_backoff: float = 60.0, max_isolate_retries: int = 5):
+        self.spool = spool
+        self.sink = sink
+        self.healthy = healthy
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.max_isolate_retries = max_isolate_retries
+        # 전체적인 문제로 판정된 배치: (첫 행 id, 연속 판정 횟수)
+        self._suspect = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._backoff = 0.0
+        self.stats = {"flushed": 0, "batches": 0, "failures": 0, "dead": 0}
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="spool-flusher", daemon=True)
+            self._thread.start()
+
+    def notify(self):
+        """
+        새 데이터가 기록되었음을 알려 대기 중인 플러셔를 깨웁니다.
+        재시도 대기(백오프) 중에는 깨우지 않습니다. (매 틱 깨우면 max_backoff 가 의미 없어짐)
+        """
+        if self._backoff <= 0:
+            self._wake.set()
+
+    def stop(self, timeout: float = 10.0):
+        """
+        플러셔를 멈춥니다. 멈추기 전에 남은 데이터를 한 번 더 반영해 봅니다.
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self._backoff or self.interval)
+            self._wake.clear()
+            stopping = self._stop.is_set()
+            # 종료 시에도 한 번 더 반영 (재시도 대기 중이었다면 건너뜀 → 다음 실행 때 이어서 반영)
+            if not (stopping and self._backoff):
+                self.flush()
+            if stopping:
+                break
+
+    def flush(self):
+        """
+        스풀이 빌 때까지(또는 실패할 때까지) 배치 단위로 반영합니다.
+
+        Returns:
+            int: 이번 호출에서 반영한 행 수
+        """
+        flushed = 0
+        while True:
+            batch = self.spool.peek(self.batch_size)
+            if not batch:
+                break
+            if not self._deliver(batch):
+                self.stats["failures"] += 1
+                self._backoff = min(max(self._backoff * 2, self.interval), self.max_backoff)
+                print(f"[스풀] DB 반영 실패 → {self._backoff:.0f}초 후 재시도 (대기 {self.spool.pending()}건)")
+                break
+            self._backoff = 0.0
+            flushed += len(batch)
+            if len(batch) < self.batch_size:
+                break
+        return flushed
+
+    def _send(self, batch: list):
+        if not self.sink([record for _, record in batch]):
+            return False
+        self.spool.ack([row_id for row_id, _ in batch])
+        self.stats["flushed"] += len(batch)
+        self.stats["batches"] += 1
+        return True
+
+    def _deliver(self, batch: list):
+        if self._send(batch):
+            return True
+        if self.healthy is None or not self.healthy():
+            return False
+        return self._isolate(batch)
+
+    def _isolate(self, batch: list):
+        """
+        DB 가 정상인데 배치가 실패했을 때 저장되지 않는 행을 찾아 격리합니다.
+        남은 행의 첫 실패 행을 이분 탐색으로 찾고(앞쪽 성공 구간은 바로 반영) 그 뒤 행을 다시 보냅니다.
+        다른 행이 하나라도 저장되어야 행 단위 문제로 보고 dead 로 옮깁니다.
+        실패 행이 두 번 나오도록 아무것도 저장되지 않으면 남은 행 중 ISOLATE_PROBES 개를 하나씩 보내 보고,
+        그것도 모두 실패하면 전체적인 문제로 보고 False 를 반환합니다.
+        (전체적인 문제일 때 호출 수는 배치 크기가 아니라 log2(배치 크기) 에 비례)
+        """
+        bad = []
+        stored = False
+        rest = list(batch)
+        while rest:
+            if self._send(rest):
+                stored = True
+                break
+            # rest[lo:hi] 에 실패 행이 있음 → 앞쪽 절반이 성공하면 뒤쪽에서, 실패하면 앞쪽에서 찾음
+            lo, hi = 0, len(rest)
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if self._send(rest[lo:mid]):
+                    stored = True
+                    lo = mid
+                else:
+                    hi = mid
+            bad.append(rest[lo][0])
+            rest = rest[lo + 1:]
+            if not stored and len(bad) >= 2:
+                stored, rest = self._probe(rest)
+                if not stored:
+                    break
+
+        if not stored and not self._give_up(batch[0][0], len(bad)):
+            return False
+        self._suspect = None
+        print(f"[스풀] 저장할 수 없는 행 {len(bad)}건을 dead 로 옮깁니다. (id={bad[:10]})")
+        self.spool.bury(bad)
+        self.stats["dead"] += len(bad)
+        return True
+
+    def _probe(self, rest: list):
+        """
+        남은 행 중 고르게 고른 몇 개를 하나씩 보내 봅니다.
+
+        Returns:
+            tuple: (하나라도 저장되었는지, 저장된 행을 뺀 남은 행)
+        """
+        picks = sorted({round(i * (len(rest) - 1) / max(self.ISOLATE_PROBES - 1, 1))
+                        for i in range(min(self.ISOLATE_PROBES, len(rest)))})
+        sent = {i for i in picks if self._send(rest[i:i + 1])}
+        return bool(sent), [row for i, row in enumerate(rest) if i not in sent]
+
+    def _give_up(self, head_id: int, bad_count: int):
+        """
+        같은 배치가 연속으로 전체적인 문제로 판정된 횟수를 세고, max_isolate_retries 에 이르면 True
+        (DB 는 계속 정상인데 같은 행에서 멈춰 있으면 혼자서도 실패한 행만 옮기고 다음으로 넘어감)
+        """
+        retries = self._suspect[1] + 1 if self._suspect and self._suspect[0] == head_id else 1
+        self._suspect = (head_id, retries)
+        if retries < self.max_isolate_retries or not bad_count:
+            return False
+        print(f"[스풀] 같은 배치가 {retries}회 연속 저장되지 않아, 혼자서도 실패한 행 {bad_count}건만 dead 로 옮깁니다.")
+        return True
+
+    def report(self):
+        stats = dict(self.stats)
+        stats["pending"] = self.spool.pending()
+        return stats
@@ -0,0 +1,259 @@
+import json
+import os
+import re
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+# 기본 노선 구조 파일 (호선별 역 순서, 분기/순환, 구간 길이)
+STATIONS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "stations.json")
+
+# 역명 비교 시 무시하는 부기명 ('총신대입구(이수)' → '총신대입구') 과 공백
+_NAME_NOISE = re.compile(r"\(.*?\)|\s")
+
+def normalize_station_name(name):
+    """역명 비교용 정규화 (괄호 속 부기명/공백 제거, '서울역' → '서울')"""
+    name = _NAME_NOISE.sub("", str(name))
+    return name[:-1] if len(name) > 2 and name.endswith("역") else name
+
+def _numeric_ids(series: pd.Series):
+    """역 ID 컬럼 → float 배열 (결측/숫자가 아닌 값은 NaN, Int32 의 pd.NA 객체 배열을 만들지 않음)"""
+    return pd.to_numeric(series, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+class LineTopology:
+    """
+    한 호선의 역 순서/분기/순환 구조와 역 사이 거리를 미리 계산해 둔 인덱스
+    - 역은 0..N-1 정수 번호(index)로 다루며, 역명으로 찾고 역명이 없는 행만 역 ID(statnId)로 찾습니다.
+      (stations.json 의 ID 는 분기별 일련번호로 만든 값이라 API 의 statnId 와 다름)
+    - chainage: 노선 기점(첫 분기의 첫 역)부터의 누적 거리(km). 분기는 갈라지는 역(from)의 거리에서 이어집니다.
+    - distance: 모든 역 쌍의 최단 거리(km) 행렬 → 조회는 배열 인덱싱 한 번
+    - 방향: 하행(1)은 stations 순서(chainage 증가), 상행(0)은 역순. 순환 구간은 내선(0)이 stations 순서입니다.
+    """
+
+    def __init__(self, line_name: str, spec: dict):
+        self.line_name = line_name
+        self.line_id = spec["line_id"]
+
+        names, ids, chainage, loop_ids = [], [], [], []
+        self.branches = []
+        self.loop_lengths = []
+        edges = []
+        for branch in spec["branches"]:
+            start = len(names)
+            junction = self._index_of_name(names, branch["from"]) if "from" in branch else None
+            stations = branch["stations"]
+            hops = len(stations) - (0 if junction is not None else 1) + (1 if branch.get("loop") else 0)
+            km = branch["length_km"] / max(hops, 1)
+            base = chainage[junction] if junction is not None else -km
+            loop_id = -1
+            if branch.get("loop"):
+                loop_id = len(self.loop_lengths)
+                self.loop_lengths.append(branch["length_km"])
+
+            for i, name in enumerate(stations):
+                names.append(name)
+                ids.append(self.line_id * 1_000_000 + branch["first_code"] + i)
+                chainage.append(base + km * (i + 1))
+                loop_ids.append(loop_id)
+            chain = ([junction] if junction is not None else []) + list(range(start, len(names)))
+            if branch.get("loop"):
+                chain.append(chain[0])
+            edges += [(a, b, km) for a, b in zip(chain, chain[1:])]
+            self.branches.append({
+                "name": branch.get("name", ""),
+                "from": junction,
+                "stations": np.arange(start, len(names)),
+                "loop": bool(branch.get("loop")),
+                "one_way": bool(branch.get("one_way")),
+            })
+
+        self.stations = np.array(names, dtype=object)
+        self.station_ids = np.array(ids, dtype=np.int64)
+        self.chainage = np.array(chainage)
+        self.loop_id = np.array(loop_ids)
+        self.loop_lengths = np.array(self.loop_lengths)
+        self.adjacency = {name: {} for name in names}
+        for a, b, km in edges:
+            self.adjacency[names[a]][names[b]] = km
+            self.adjacency[names[b]][names[a]] = km
+        self.distance = self._all_pairs(len(names), edges)
+        # 종점: 이웃 역이 하나뿐인 역 (열차가 회차하는 곳)
+        self.terminal = np.array([len(self.adjacency[name]) == 1 for name in names])
+
+        # 역 ID / 역명 → 역 번호 (해시 조회)
+        self._by_id = pd.Index(self.station_ids)
+        self._by_name = pd.Index([normalize_station_name(n) for n in names])
+
+    @staticmethod
+    def _index_of_name(names: list, name: str):
+        try:
+            return names.index(name)
+        except ValueError:
+            raise ValueError(f"분기 시작역 '{name}' 이 앞선 분기에 없습니다.")
+
+    @staticmethod
+    def _all_pairs(n: int, edges: list):
+        """역 쌍별 최단 거리 (Floyd-Warshall, 호선당 역 수가 100개 안팎이라 한 번 계산해 둠)"""
+        dist = np.full((n, n), np.inf)
+        np.fill_diagonal(dist, 0.0)
+        for a, b, km in edges:
+            dist[a, b] = dist[b, a] = min(dist[a, b], km)
+        for k in range(n):
+            dist = np.minimum(dist, dist[:, k, None] + dist[None, k, :])
+        return dist
+
+    def __len__(self):
+        return len(self.stations)
+
+    def locate(self, station_ids=None, station_names=None):
+        """
+        역명(우선)과 역 ID(보조)로 역 번호를 찾습니다. 찾지 못하면 -1. (스칼라 또는 배열)
+        역명이 있는데 노선 구조에 없으면 ID 가 우연히 다른 역과 겹칠 수 있으므로 ID 로 찾지 않습니다.
+
+        Args:
+            station_ids: 역 ID 또는 그 배열 (None/결측 허용, 역명이 없는 행에만 사용)
+            station_names: 역명 또는 그 배열
+
+        Returns:
+            int 또는 np.ndarray: 역 번호
+        """
+        scalar = np.ndim(station_names if station_names is not None else station_ids) == 0
+        result = None
+        no_name = None
+        if station_names is not None:
+            # 역명은 종류별로 한 번만 정규화
+            codes, uniques = pd.factorize(np.atleast_1d(station_names), use_na_sentinel=False)
+            result = self._by_name.get_indexer([normalize_station_name(n) for n in uniques])[codes]
+            no_name = pd.isna(uniques)[codes]
+        if station_ids is not None:
+            ids = pd.to_numeric(pd.Series(np.atleast_1d(station_ids)), errors="coerce")
+            valid = ids.notna().to_numpy()
+            if result is None:
+                result = np.full(len(ids), -1, dtype=np.int64)
+            else:
+                valid = valid & no_name
+            result[valid] = self._by_id.get_indexer(ids[valid].astype(np.int64))
+        return int(result[0]) if scalar else result
+
+    def forward(self, index, direction):
+        """
+        direction 으로 달릴 때 chainage 가 늘어나는 쪽이면 +1, 줄어드는 쪽이면 -1 (배열 가능)
+        - 순환 구간: 내선(0) +1 / 외선(1) -1, 그 밖: 하행(1) +1 / 상행(0) -1
+        """
+        on_loop = self.loop_id[index] >= 0
+        forward = np.where(on_loop, np.asarray(direction) == 0, np.asarray(direction) == 1)
+        return np.where(forward, 1.0, -1.0)
+
+    def along(self, start, end, direction):
+        """
+        start 역에서 direction 방향으로 end 역까지의 거리(km). end 가 뒤쪽이면 음수. (배열 가능, 없는 역은 NaN)
+        같은 순환 구간 안에서는 진행 방향으로 한 바퀴를 돌아 만나는 거리(0 이상)입니다.
+        """
+        start, end = np.asarray(start), np.asarray(end)
+        missing = (start < 0) | (end < 0)
+        s, e = np.where(missing, 0, start), np.where(missing, 0, end)
+        delta = (self.chainage[e] - self.chainage[s]) * self.forward(s, direction)
+        result = np.where(delta >= 0, self.distance[s, e], -self.distance[s, e])
+        if len(self.loop_lengths):
+            same_loop = (self.loop_id[s] >= 0) & (self.loop_id[s] == self.loop_id[e])
+            result = np.where(same_loop, np.mod(delta, self.loop_lengths[self.loop_id[s]]), result)
+        return np.where(missing, np.nan, result)
+
+    def between(self, a, b, direction):
+        """
+        direction 으로 달릴 때 a 역과 b 역 사이(양 끝 포함)에 있는 역 번호 목록 (순서대로)
+        """
+        a, b = int(a), int(b)
+        if self.along(a, b, direction) < 0:
+            a, b = b, a
+        span = self.along(a, b, direction)
+        offsets = self.along(np.full(len(self), a), np.arange(len(self)), direction)
+        # 갈라진 분기 위의 역은 a-b 경로 위에 있지 않으므로 거리 합으로 걸러냄
+        on_path = np.isclose(self.distance[a] + self.distance[:, b], self.distance[a, b])
+        inside = on_path & (offsets >= 0) & (offsets <= span + 1e-9)
+        candidates = np.flatnonzero(inside)
+        return candidates[np.argsort(offsets[candidates], kind="stable")]
+
+class TopologyIndex:
+    """
+    호선명 → LineTopology. 위치 로그 DataFrame 에 역 번호/누적 거리를 한꺼번에 붙이는 도우미를 제공합니다.
+    """
+
+    def __init__(self, lines: dict):
+        self.lines = {name: LineTopology(name, spec) for name, spec in lines.items()}
+
+    def __getitem__(self, line_name: str):
+        return self.lines[line_name]
+
+    def __contains__(self, line_name: str):
+        return line_name in self.lines
+
+    def get(self, line_name: str):
+        return self.lines.get(line_name)
+
+    def locate_frame(self, df: pd.DataFrame, id_col: str = "station_id", name_col: str = "station_name",
+                     line_col: str = "line_name"):
+        """
+        행마다 역 번호를 찾습니다. (호선별로 한 번씩 벡터 조회, 모르는 호선/역은 -1)
+
+        Returns:
+            np.ndarray: df 와 같은 순서의 역 번호
+        """
+        result = np.full(len(df), -1, dtype=np.int64)
+        if df.empty:
+            return result
+        lines = df[line_col].astype(object).to_numpy()
+        for line_name in pd.unique(lines):
+            topo = self.lines.get(line_name)
+            if topo is None:
+                continue
+            rows = np.flatnonzero(lines == line_name)
+            ids = _numeric_ids(df[id_col])[rows] if id_col in df.columns else None
+            names = df[name_col].astype(object).to_numpy()[rows] if name_col in df.columns else None
+            result[rows] = topo.locate(ids, names)
+        return result
+
+    def along(self, line_names, start, end, direction):
+        """
+        호선이 섞인 배열에 대한 LineTopology.along (호선별로 한 번씩 계산, 모르는 호선은 NaN)
+        """
+        line_names = np.asarray(line_names, dtype=object)
+        start, end, direction = np.asarray(start), np.asarray(end), np.asarray(direction)
+        result = np.full(len(line_names), np.nan)
+        for line_name in pd.unique(line_names):
+            topo = self.lines.get(line_name)
+            if topo is None:
+                continue
+            rows = np.flatnonzero(line_names == line_name)
+            result[rows] = topo.along(start[rows], end[rows], direction[rows])
+        return result
+
+    def is_terminal(self, line_names, positions):
+        """호선/역 번호 배열에서 종점인 행 (모르는 호선/역은 False)"""
+        line_names, positions = np.asarray(line_names, dtype=object), np.asarray(positions)
+        result = np.zeros(len(line_names), dtype=bool)
+        for line_name in pd.unique(line_names):
+            topo = self.lines.get(line_name)
+            if topo is None:
+                continue
+            rows = np.flatnonzero((line_names == line_name) & (positions >= 0))
+            result[rows] = topo.terminal[positions[rows]]
+        return result
+
+    def chainage_frame(self, df: pd.DataFrame, **kwargs):
+        """행마다 노선 기점으로부터의 누적 거리(km). 위치를 모르면 NaN."""
+        positions = self.locate_frame(df, **kwargs)
+        result = np.full(len(df), np.nan)
+        lines = df[kwargs.get("line_col", "line_name")].astype(object).to_numpy()
+        for line_name, topo in self.lines.items():
+            rows = np.flatnonzero((lines == line_name) & (positions >= 0))
+            result[rows] = topo.chainage[positions[rows]]
+        return result
+
+@lru_cache(maxsize=4)
+def load_topology(path: str = STATIONS_PATH):
+    """
+    노선 구조 파일을 읽어 TopologyIndex 를 만듭니다. (경로별로 한 번만 만들고 재사용)
+    """
+    with open(path, encoding="utf-8") as f:
+        return TopologyIndex(json.load(f)["lines"])
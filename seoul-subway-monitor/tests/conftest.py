@@ -0,0 +1,5 @@
+import os
+import sys
+
+# src 의 모듈을 패키지 없이 import 하므로 경로에 추가 (main.py 와 같은 방식)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
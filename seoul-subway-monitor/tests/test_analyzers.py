@@ -0,0 +1,59 @@
+import os
+import sys
+import pandas as pd
+import pytest
+from frames import SharedFrame
+from analyzer1 import compute_interval_stats
+from analyzer3 import compute_turnarounds
+
+# 반복문 기준 구현과 합성 데이터 생성기는 benchmarks 에 있음
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from bench_turnaround import make_frame, compute_turnarounds_loop, results_match
+from synthetic import generate
+
+T0 = pd.Timestamp("2026-01-01 08:00", tz="UTC")
+
+def log(rows, status="1"):
+    """(열차, 역, 방향, 초[, 상태]) 목록 → 위치 로그"""
+    return pd.DataFrame([
+        {"line_name": "2호선", "train_number": r[0], "station_name": r[1], "direction_type": r[2],
+         "train_status": r[4] if len(r) > 4 else status, "created_at": T0 + pd.Timedelta(seconds=r[3])}
+        for r in rows
+    ])
+
+def test_interval_stats_counts_one_arrival_per_visit():
+    frame = SharedFrame(log([
+        # A 가 S 에 정차한 동안 하트비트로 도착(1) 행이 반복 기록됨
+        ("A", "S", "0", 0, "1"), ("A", "S", "0", 60, "1"), ("A", "S", "0", 120, "1"), ("A", "S", "0", 150, "2"),
+        ("B", "S", "0", 290, "0"), ("B", "S", "0", 300, "1"), ("B", "S", "0", 360, "1"),
+        ("C", "S", "0", 600, "1"),
+    ]))
+    stats = compute_interval_stats(frame)
+    assert stats[["관측수", "평균간격(초)", "최대간격(초)"]].values.tolist() == [[2, 300.0, 300.0]]
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_compute_turnarounds_matches_loop_reference(seed):
+    frame = SharedFrame(make_frame(20000, trains=50, leg_length=12, seed=seed))
+    vectorized = compute_turnarounds(frame)
+    assert not vectorized.empty
+    assert results_match(compute_turnarounds_loop(frame), vectorized)
+
+def test_compute_turnarounds_matches_loop_reference_on_synthetic_lines():
+    # 9호선: 종점 회차에 급행/일반 열차가 섞여 있음
+    frame = SharedFrame(generate(days=1, lines=["9호선"], seed=3), normalized=True)
+    vectorized = compute_turnarounds(frame)
+    assert not vectorized.empty
+    assert results_match(compute_turnarounds_loop(frame), vectorized)
+
+def test_compute_turnarounds_ignores_first_row_of_next_train():
+    frame = SharedFrame(log([
+        ("A", "S1", "0", 0), ("A", "S2", "0", 60), ("A", "S2", "1", 150),
+        # B 의 첫 로그는 A 의 마지막 로그와 방향이 달라도 회차가 아님
+        ("B", "S2", "0", 170), ("B", "S3", "0", 230),
+        # 30분 이상 지나 방향이 바뀐 경우는 재투입으로 보고 제외
+        ("B", "S3", "1", 2300),
+    ]))
+    result = compute_turnarounds(frame)
+    assert result[["train_number", "station_name", "turnaround_time_sec"]].astype(object).values.tolist() == [["A", "S2", 90.0]]
+    assert result["prev_direction"].tolist() == [0]
+    assert result["new_direction"].tolist() == [1]
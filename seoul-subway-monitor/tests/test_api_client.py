@@ -0,0 +1,50 @@
+import pytest
+from api_client import SeoulSubwayAPI
+
+def train(no, station="S1"):
+    return {"trainNo": str(no), "statnId": station}
+
+def page(trains, total=None):
+    data = {"realtimePositionList": trains}
+    if total is not None:
+        data["errorMessage"] = {"status": 200, "code": "INFO-000", "total": total}
+    return data
+
+# 범위를 벗어난 페이지의 응답 ('데이터 없음')
+NO_DATA = {"status": 200, "code": "INFO-200", "message": "해당하는 데이터가 없습니다.", "total": 0}
+
+@pytest.fixture
+def api():
+    client = SeoulSubwayAPI(page_size=100)
+    yield client
+    client.close()
+
+def test_merge_pages_keeps_first_row_per_train_across_boundaries(api):
+    # 페이지 범위 양끝이 포함되어 경계 열차가 두 번 올 수 있고, 페이지 요청 사이에 이동한 열차도 두 페이지에 나옴
+    first = page([train(i) for i in range(101)], total=230)
+    second = page([train(100)] + [train(i, "S2") for i in range(101, 202)] + [train(5, "S9")])
+    third = page([train(i) for i in range(201, 230)])
+
+    merged = api._merge_pages([first, second, third], "2호선")
+
+    assert [t["trainNo"] for t in merged] == [str(i) for i in range(230)]
+    assert next(t for t in merged if t["trainNo"] == "5")["statnId"] == "S1"
+
+def test_merge_pages_single_page_is_returned_as_is(api):
+    first = page([train(1), train(2)], total=2)
+    assert api._merge_pages([first], "2호선") is first["realtimePositionList"]
+
+def test_merge_pages_ignores_no_data_pages_past_the_end(api, capsys):
+    first = page([train(i) for i in range(50)], total=50)
+    merged = api._merge_pages([first, NO_DATA, NO_DATA], "2호선")
+    assert len(merged) == 50
+    assert "[API 오류]" not in capsys.readouterr().out
+
+def test_plan_pages_requests_missing_pages_and_remembers_headroom(api):
+    first = page([train(i) for i in range(101)], total=195)
+    assert api._plan_pages("2호선", [first]) == [1]
+    # 195대 + 여유 10% → 다음 조회 때는 처음부터 3페이지
+    assert api._page_hints["2호선"] == 3
+
+    assert api._plan_pages("2호선", [first, page([])]) == []
+    assert api._plan_pages("3호선", [{"realtimePositionList": []}]) == []
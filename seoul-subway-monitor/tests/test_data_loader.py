@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+import pytest
+from data_loader import DataLoader
+from history_cache import HistoryCache
+
+T0 = datetime(2026, 1, 1, 8, 0, tzinfo=timezone.utc)
+
+def row(row_id, sec):
+    return {
+        "id": row_id, "created_at": (T0 + timedelta(seconds=sec)).isoformat(),
+        "line_id": "1002", "line_name": "2호선", "station_name": "강남",
+        "train_number": f"T{row_id}", "train_status": "1", "direction_type": "0",
+    }
+
+class FakeQuery:
+    """iter_new_rows 가 쓰는 PostgREST 필터(gte/gt/order/limit)만 흉내 내는 가짜 쿼리"""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.size = None
+
+    def select(self, columns):
+        return self
+
+    def gte(self, column, value):
+        self.rows = [r for r in self.rows if pd.Timestamp(r[column]) >= pd.Timestamp(value)]
+        return self
+
+    def gt(self, column, value):
+        self.rows = [r for r in self.rows if r[column] > value]
+        return self
+
+    def order(self, column):
+        self.rows.sort(key=lambda r: r[column])
+        return self
+
+    def limit(self, size):
+        self.size = size
+        return self
+
+    def execute(self):
+        return type("Response", (), {"data": self.rows[:self.size]})()
+
+class FakeDB:
+    """커밋된(보이는) 행만 조회되는 가짜 DB"""
+
+    def __init__(self):
+        self.visible = []
+        self.client = self
+
+    def table(self, name):
+        return FakeQuery(self.visible)
+
+@pytest.fixture
+def frozen_now(monkeypatch):
+    """캐시 첫 적재 구간(최근 CACHE_BOOTSTRAP_DAYS 일)이 T0 를 포함하도록 현재 시각을 고정"""
+    class Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return T0 + timedelta(hours=1)
+    monkeypatch.setattr("data_loader.datetime", Clock)
+
+def make_loader(tmp_path, db):
+    loader = DataLoader(db=db, use_cache=False)
+    loader.cache = HistoryCache(str(tmp_path / "cache"))
+    return loader
+
+def test_sync_cache_picks_up_late_committed_rows(tmp_path, frozen_now):
+    db = FakeDB()
+    loader = make_loader(tmp_path, db)
+
+    # id 2 는 먼저 INSERT 되었지만 id 3 보다 늦게 커밋됨
+    db.visible = [row(1, 0), row(3, 20)]
+    assert loader.sync_cache() == 2
+    db.visible.append(row(2, 10))
+    db.visible.append(row(4, 30))
+    assert loader.sync_cache() == 2
+
+    assert sorted(loader.cache.read()["id"]) == [1, 2, 3, 4]
+
+def test_sync_cache_does_not_duplicate_overlap_rows(tmp_path, frozen_now):
+    db = FakeDB()
+    loader = make_loader(tmp_path, db)
+
+    db.visible = [row(i, i) for i in range(1, 6)]
+    assert loader.sync_cache() == 5
+    assert loader.sync_cache() == 0
+    assert len(loader.cache.read()) == 5
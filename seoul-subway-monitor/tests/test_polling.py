@@ -0,0 +1,64 @@
+import random
+from datetime import datetime
+import pytest
+from event_time import KST
+from polling import AdaptivePoller
+
+# 운행 시간(KST 정오)과 운행 시간 외(KST 새벽 3시)
+NOON = datetime(2026, 1, 1, 12, 0, tzinfo=KST).timestamp()
+NIGHT = datetime(2026, 1, 1, 3, 0, tzinfo=KST).timestamp()
+
+def daily_calls(poller):
+    return sum(86400 / iv for iv in poller.intervals.values())
+
+def make_poller(rates, **kwargs):
+    poller = AdaptivePoller(list(rates), **kwargs)
+    for line, rate in rates.items():
+        poller.rates[line] = rate
+        poller.last_poll[line] = NOON - 10
+    return poller
+
+@pytest.mark.parametrize("seed", range(20))
+def test_reschedule_stays_within_daily_quota(seed):
+    rng = random.Random(seed)
+    rates = {f"{i}호선": rng.choice([0.0, rng.uniform(0, 0.05), rng.uniform(0.5, 3.0)]) for i in range(rng.randint(1, 20))}
+    # 20개 호선이 off_hours_interval(600초) 주기로도 하루 2880 회를 쓰므로 그 이상에서만 지킬 수 있음
+    quota = rng.uniform(3000, 50000)
+    poller = make_poller(rates, daily_quota=quota)
+    poller._reschedule(NOON)
+
+    assert daily_calls(poller) <= quota * (1 + 1e-9)
+    assert all(poller.min_interval <= iv <= poller.off_hours_interval for iv in poller.intervals.values())
+
+def test_busy_line_is_polled_more_often_than_quiet_line():
+    poller = make_poller({"2호선": 2.0, "우이신설선": 0.01}, daily_quota=5000)
+    poller._reschedule(NOON)
+    assert poller.intervals["2호선"] < poller.intervals["우이신설선"]
+    assert daily_calls(poller) <= 5000 * (1 + 1e-9)
+
+def test_quota_wins_over_max_interval():
+    # 20개 호선을 모두 max_interval(120초)로 조회하려면 하루 14400 회가 필요
+    poller = make_poller({f"{i}호선": 0.0 for i in range(20)}, daily_quota=10000)
+    poller._reschedule(NOON)
+    assert daily_calls(poller) <= 10000 * (1 + 1e-9)
+    assert all(iv > poller.max_interval for iv in poller.intervals.values())
+
+def test_off_hours_and_empty_lines_use_fixed_intervals():
+    poller = make_poller({"1호선": 1.0, "2호선": 1.0}, daily_quota=20000)
+    poller._reschedule(NIGHT)
+    assert poller.intervals == {"1호선": 600, "2호선": 600}
+
+    poller.empty_streak["1호선"] = 2
+    poller._reschedule(NOON)
+    assert poller.intervals["1호선"] == poller.max_interval
+    assert daily_calls(poller) <= 20000 * (1 + 1e-9)
+
+def test_observe_measures_change_rate_between_polls():
+    poller = AdaptivePoller(["2호선"], daily_quota=10000)
+    trains = [{"trainNo": str(i), "statnId": "A", "trainSttus": "1", "updnLine": "0"} for i in range(10)]
+    poller.observe({"2호선": trains}, now=NOON)
+    moved = [dict(t, statnId="B") if i < 5 else t for i, t in enumerate(trains)]
+    poller.observe({"2호선": moved}, now=NOON + 10)
+
+    assert poller.rates["2호선"] == pytest.approx(0.5)
+    assert poller.next_poll["2호선"] == NOON + 10 + poller.intervals["2호선"]
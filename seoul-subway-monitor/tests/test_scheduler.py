@@ -0,0 +1,61 @@
+import threading
+import pytest
+from scheduler import TickScheduler
+
+@pytest.fixture
+def scheduler():
+    sched = TickScheduler(max_workers=2)
+    yield sched
+    sched.stop(wait=True)
+
+def blocking_job(scheduler, overrun):
+    """release 될 때까지 끝나지 않는 작업 (예정 시각은 100초로 고정)"""
+    release = threading.Event()
+    job = scheduler.every(10, release.wait, 5, overrun=overrun)
+    job.next_due = 100.0
+    return job, release
+
+def test_run_pending_counts_missed_ticks_and_keeps_boundaries(scheduler):
+    job = scheduler.every(10, lambda: None)
+    job.next_due = 100.0
+
+    # 루프가 35초 멈춰 있었음 → 110/120/130 틱은 통째로 지나감
+    scheduler.run_pending(now=135.0)
+    assert job.counts["ticks"] == 1
+    assert job.counts["missed"] == 3
+    assert job.next_due == 140.0
+
+    scheduler.run_pending(now=139.9)
+    assert job.counts["ticks"] == 1
+
+def test_coalesce_merges_overrun_ticks_into_one_rerun(scheduler):
+    job, release = blocking_job(scheduler, "coalesce")
+    scheduler.run_pending(now=100.0)
+    scheduler.run_pending(now=110.0)
+    scheduler.run_pending(now=120.0)
+    assert job.counts["coalesced"] == 2
+    assert job.pending_due == 110.0
+
+    release.set()
+    scheduler.stop(wait=True)
+    assert job.counts["runs"] == 2
+    assert job.counts["missed"] == 0
+    assert job.running == 0
+
+def test_skip_drops_overrun_ticks(scheduler):
+    job, release = blocking_job(scheduler, "skip")
+    scheduler.run_pending(now=100.0)
+    scheduler.run_pending(now=110.0)
+    assert job.counts["skipped"] == 1
+    assert job.pending_due is None
+
+    release.set()
+    scheduler.stop(wait=True)
+    assert job.counts["runs"] == 1
+
+def test_clock_jumping_back_recomputes_next_boundary(scheduler):
+    job = scheduler.every(10, lambda: None, offset=3)
+    job.next_due = 1003.0
+    scheduler.run_pending(now=500.0)
+    assert job.next_due == 503.0
+    assert job.counts["ticks"] == 0
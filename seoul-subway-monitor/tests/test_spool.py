@@ -0,0 +1,99 @@
+import pytest
+from spool import WriteSpool, SpoolFlusher
+
+class FakeSink:
+    """bad 에 있는 행이 하나라도 섞인 배치는 거부하는 가짜 DB (down=True 면 모두 거부)"""
+
+    def __init__(self, bad=(), down=False):
+        self.bad = set(bad)
+        self.down = down
+        self.calls = 0
+        self.stored = []
+
+    def __call__(self, records):
+        self.calls += 1
+        if self.down or any(r["i"] in self.bad for r in records):
+            return False
+        self.stored += [r["i"] for r in records]
+        return True
+
+def make_flusher(tmp_path, n, sink, **kwargs):
+    spool = WriteSpool(str(tmp_path / "spool.db"))
+    spool.append([{"i": i} for i in range(n)])
+    return spool, SpoolFlusher(spool, sink, healthy=lambda: True, **kwargs)
+
+def test_flush_delivers_in_batches(tmp_path):
+    sink = FakeSink()
+    spool, flusher = make_flusher(tmp_path, 250, sink, batch_size=100)
+    assert flusher.flush() == 250
+    assert spool.pending() == 0
+    assert sink.stored == list(range(250))
+    assert flusher.stats["batches"] == 3
+
+def test_unhealthy_db_backs_off_without_isolating(tmp_path):
+    sink = FakeSink(down=True)
+    spool = WriteSpool(str(tmp_path / "spool.db"))
+    spool.append([{"i": i} for i in range(10)])
+    flusher = SpoolFlusher(spool, sink, healthy=lambda: False)
+    assert flusher.flush() == 0
+    assert sink.calls == 1
+    assert spool.pending() == 10
+    assert flusher._backoff > 0
+
+@pytest.mark.parametrize("bad", [{0}, {999}, {0, 500, 999}, {0, 1}, {0, 1, 999}])
+def test_bad_rows_are_buried_and_the_rest_stored(tmp_path, bad):
+    sink = FakeSink(bad)
+    spool, flusher = make_flusher(tmp_path, 1000, sink)
+    flusher.flush()
+    assert spool.pending() == 0
+    assert spool.dead_count() == len(bad)
+    assert sorted(sink.stored) == sorted(set(range(1000)) - bad)
+    assert flusher._backoff == 0
+
+def test_first_two_and_last_row_bad_does_not_stall(tmp_path):
+    # 앞의 두 행과 마지막 행이 저장되지 않아도 한 번의 flush 로 모두 처리되어야 함
+    sink = FakeSink({0, 1, 4999})
+    spool, flusher = make_flusher(tmp_path, 5000, sink)
+    flusher.flush()
+    assert spool.pending() == 0
+    assert spool.dead_count() == 3
+
+def test_whole_batch_failure_backs_off_without_burying(tmp_path):
+    sink = FakeSink(down=True)
+    spool, flusher = make_flusher(tmp_path, 5000, sink)
+    flusher.flush()
+    assert spool.pending() == 5000
+    assert spool.dead_count() == 0
+    assert flusher.stats["failures"] == 1
+    assert flusher._backoff > 0
+    # 배치 크기가 아니라 log2(배치 크기) 에 비례하는 호출 수
+    assert sink.calls < 60
+
+def test_repeated_whole_batch_failure_only_buries_rows_that_failed_alone(tmp_path):
+    sink = FakeSink(down=True)
+    spool, flusher = make_flusher(tmp_path, 100, sink, max_isolate_retries=3)
+    for _ in range(2):
+        flusher.flush()
+    assert spool.dead_count() == 0
+    flusher.flush()
+    assert spool.dead_count() == 2
+    assert spool.pending() == 98
+
+def test_almost_all_rows_bad_drains_within_retry_cap(tmp_path):
+    sink = FakeSink(set(range(9)))
+    spool, flusher = make_flusher(tmp_path, 10, sink, max_isolate_retries=3)
+    for _ in range(10):
+        flusher.flush()
+        if not spool.pending():
+            break
+    assert spool.pending() == 0
+    assert sink.stored == [9]
+
+def test_notify_is_ignored_while_backing_off(tmp_path):
+    spool, flusher = make_flusher(tmp_path, 1, FakeSink())
+    flusher._backoff = 4.0
+    flusher.notify()
+    assert not flusher._wake.is_set()
+    flusher._backoff = 0.0
+    flusher.notify()
+    assert flusher._wake.is_set()
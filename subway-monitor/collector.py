@@ -1,10 +1,33 @@
+import argparse
+import asyncio
+import math
+import aiohttp
 import requests
 import psycopg2
+import psycopg2.pool
+import json
 import time
 import logging
-from datetime import datetime
-from config import API_KEY, DATABASE_URL, SUBWAY_LINES
-import schedule
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from config import (
+    API_KEY, API_BASE_URL, DATABASE_URL, SUBWAY_LINES, MAX_CONCURRENT_REQUESTS, REQUEST_TIMEOUT, PAGE_SIZE,
+    DB_POOL_MIN_CONN, DB_POOL_MAX_CONN, CHANGE_ONLY_INGESTION, HEARTBEAT_MINUTES,
+    STORAGE_MAINTENANCE, PARTITION_DAYS_AHEAD, RETENTION_DAYS, ROLLUP_LOOKBACK_HOURS,
+    USE_SPOOL, SPOOL_PATH, SPOOL_FLUSH_BATCH, SPOOL_FLUSH_INTERVAL, SPOOL_MAX_BACKOFF,
+    COLLECT_INTERVAL, LINE_INTERVALS, OVERRUN_POLICY, ADAPTIVE_POLLING, API_DAILY_QUOTA,
+    POLL_TICK, POLL_MIN_INTERVAL, POLL_MAX_INTERVAL, POLL_OFF_HOURS_INTERVAL, SERVICE_HOURS,
+    METRICS_ENABLED, METRICS_HOST, METRICS_PORT, METRICS_LOG_PATH
+)
+from ingest import bulk_insert, IngestResult
+from maintenance import run_maintenance
+from spool import WriteSpool, SpoolFlusher
+from dedup import ChangeFilter
+from scheduler import TickScheduler
+from polling import AdaptivePoller, parse_service_hours
+from metrics import METRICS, MetricsServer, write_cycle_log
 
 # Configure logging
 logging.basicConfig(
@@ -13,141 +36,693 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Extra rows, as a fraction of the last total, to request up front so a line
+# growing past a page boundary does not need a second round trip
+PAGE_HEADROOM = 0.1
+
+# Pages to request up front per line, learned from the last total count
+_page_hints = {}
+
+# Times a line had more rows than expected and needed a second (serial) round of pages
+page_refetches = 0
+
 def fetch_realtime_position(line_name):
     """
     Fetch real-time train positions for a given subway line.
+    All pages are fetched when the line has more than PAGE_SIZE trains.
     """
     # URL Encoding for line name might be needed, but requests handles params well usually.
     # However, this API uses path parameters for some reason.
     # Format: http://swopenapi.seoul.go.kr/api/subway/{KEY}/{TYPE}/{SERVICE}/{START_INDEX}/{END_INDEX}/{subwayNm}
-    
-    # We use JSON as prefered type
-    base_url = "http://swopenapi.seoul.go.kr/api/subway"
-    url = f"{base_url}/{API_KEY}/json/realtimePosition/0/100/{line_name}"
-    
+    global page_refetches
+
+    def get_pages(page_numbers):
+        with ThreadPoolExecutor(max_workers=min(len(page_numbers), MAX_CONCURRENT_REQUESTS)) as executor:
+            return list(executor.map(lambda page: _get_page(line_name, page), page_numbers))
+
+    started = time.perf_counter()
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        
-        if 'realtimePositionList' in data:
-            return data['realtimePositionList']
-        else:
-            if 'RESULT' in data and 'CODE' in data['RESULT']:
-                 logger.warning(f"API Error for {line_name}: {data['RESULT']['CODE']} - {data['RESULT']['MESSAGE']}")
-            return []
+        pages = get_pages(range(_page_hints.get(line_name, 1)))
+        missing = plan_pages(line_name, pages)
+        if missing:
+            page_refetches += 1
+            pages += get_pages(missing)
+        return merge_pages(pages, line_name)
             
     except Exception as e:
+        METRICS.inc("api_errors_total", line=line_name, kind=_error_kind(e))
         logger.error(f"Failed to fetch data for {line_name}: {e}")
         return []
+    finally:
+        METRICS.observe("fetch_seconds", time.perf_counter() - started, line=line_name)
+
+def _get_page(line_name, page):
+    response = requests.get(build_url(line_name, page), timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return parse_json(response.content, line_name)
+
+def parse_json(body, line_name):
+    """
+    Decode one response body, timing the parse per line.
+    """
+    with METRICS.timer("parse_seconds", line=line_name):
+        return json.loads(body)
+
+def _error_kind(error):
+    """
+    Label for api_errors_total: timeout, http, parse or other.
+    """
+    if isinstance(error, (asyncio.TimeoutError, requests.exceptions.Timeout)):
+        return "timeout"
+    if isinstance(error, json.JSONDecodeError):
+        return "parse"
+    if isinstance(error, (aiohttp.ClientError, requests.exceptions.RequestException)):
+        return "http"
+    return "other"
+
+def build_url(line_name, page=0):
+    """
+    Build the realtimePosition URL for one page of a subway line.
+    Consecutive pages may share a boundary row; merge_pages drops duplicates.
+    """
+    # We use JSON as prefered type
+    start = page * PAGE_SIZE
+    return f"{API_BASE_URL}/{API_KEY}/json/realtimePosition/{start}/{start + PAGE_SIZE}/{line_name}"
+
+def parse_response(data, line_name):
+    """
+    Extract the train list from an API response, logging API-level errors.
+    """
+    if 'realtimePositionList' in data:
+        return data['realtimePositionList']
+    if 'RESULT' in data and 'CODE' in data['RESULT']:
+        METRICS.inc("api_errors_total", line=line_name, kind="api")
+        logger.warning(f"API Error for {line_name}: {data['RESULT']['CODE']} - {data['RESULT']['MESSAGE']}")
+    return []
+
+def total_count(data):
+    """
+    Total row count of a response: list_total_count, errorMessage.total,
+    top-level total (no-data responses) or the rows' totalCount; None if absent.
+    """
+    total = data.get('list_total_count')
+    if total is None:
+        total = (data.get('errorMessage') or {}).get('total')
+    if total is None:
+        total = data.get('total')
+    if total is None:
+        rows = data.get('realtimePositionList') or []
+        total = rows[0].get('totalCount') if rows else None
+    try:
+        return int(total) if total is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def _pages_for(total):
+    return max(1, math.ceil((total or 0) / PAGE_SIZE))
+
+def plan_pages(line_name, pages):
+    """
+    Return the page numbers still missing according to the first page's
+    total count, and remember how many pages to request next time.
+    """
+    total = total_count(pages[0])
+    if total is None:
+        return []
+    _page_hints[line_name] = _pages_for(total * (1 + PAGE_HEADROOM))
+    return list(range(len(pages), _pages_for(total)))
+
+def merge_pages(pages, line_name):
+    """
+    Merge page responses into one train list, keeping the first row per train.
+    Pages past the end answer "no data" and are ignored without a warning.
+    """
+    merged = parse_response(pages[0], line_name)
+    if len(pages) == 1:
+        return merged
+    seen = {train.get('trainNo') for train in merged}
+    merged = list(merged)
+    for data in pages[1:]:
+        for train in data.get('realtimePositionList') or []:
+            if train.get('trainNo') in seen:
+                continue
+            seen.add(train.get('trainNo'))
+            merged.append(train)
+    return merged
+
+async def _get_page_async(session, semaphore, line_name, page):
+    async with semaphore:
+        async with session.get(build_url(line_name, page)) as response:
+            response.raise_for_status()
+            # The API sometimes answers with a text/plain content type
+            body = await response.read()
+    return parse_json(body, line_name)
+
+async def _fetch_line_async(session, semaphore, line_name):
+    """
+    Fetch every page of a line. The pages the last total needed are requested
+    together up front; only a line that grew past them needs another round.
+    A line with any failed page returns [] rather than a partial snapshot.
+    """
+    global page_refetches
+    started = time.perf_counter()
+    try:
+        pages = list(await asyncio.gather(
+            *(_get_page_async(session, semaphore, line_name, page)
+              for page in range(_page_hints.get(line_name, 1)))
+        ))
+        missing = plan_pages(line_name, pages)
+        if missing:
+            page_refetches += 1
+            pages += await asyncio.gather(
+                *(_get_page_async(session, semaphore, line_name, page) for page in missing)
+            )
+        return merge_pages(pages, line_name)
+    except asyncio.TimeoutError:
+        METRICS.inc("api_errors_total", line=line_name, kind="timeout")
+        logger.error(f"Timed out fetching {line_name} after {REQUEST_TIMEOUT}s")
+        return []
+    except Exception as e:
+        METRICS.inc("api_errors_total", line=line_name, kind=_error_kind(e))
+        logger.error(f"Failed to fetch data for {line_name}: {e}")
+        return []
+    finally:
+        METRICS.observe("fetch_seconds", time.perf_counter() - started, line=line_name)
+
+def _new_session(trace_configs=None):
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    connector = aiohttp.TCPConnector(limit=MAX_CONCURRENT_REQUESTS, keepalive_timeout=75)
+    return aiohttp.ClientSession(timeout=timeout, connector=connector, trace_configs=trace_configs)
+
+async def fetch_all_positions_async(line_names, session=None):
+    """
+    Fetch every line concurrently over one shared HTTP session.
+    Concurrency is capped by MAX_CONCURRENT_REQUESTS, so the cycle takes
+    roughly as long as the slowest line instead of the sum of all lines.
+    Pass a long-lived session to reuse keep-alive connections across cycles.
+    Returns a dict of {line_name: train_list}.
+    """
+    if session is None:
+        async with _new_session() as own_session:
+            return await fetch_all_positions_async(line_names, own_session)
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    results = await asyncio.gather(
+        *(_fetch_line_async(session, semaphore, line) for line in line_names)
+    )
+    return dict(zip(line_names, results))
+
+def fetch_all_positions(line_names):
+    """
+    Synchronous wrapper around fetch_all_positions_async.
+    """
+    return asyncio.run(fetch_all_positions_async(line_names))
 
 def insert_data(conn, train_list):
     """
     Insert a list of train position dictionaries into the database.
+    The whole list is streamed with COPY in one round trip; records that
+    cannot be stored are logged and returned as rejects.
     """
     if not train_list:
-        return
+        return IngestResult(0, [])
 
-    cursor = conn.cursor()
-    query = """
-        INSERT INTO realtime_train_positions (
-            subway_line_id, subway_line_name, station_id, station_name,
-            train_number, last_received_at, received_at, up_down_type,
-            terminal_station_id, terminal_station_name, train_status,
-            is_express, is_last_train
-        ) VALUES (
-            %s, %s, %s, %s,
-            %s, %s, %s, %s,
-            %s, %s, %s,
-            %s, %s
-        )
+    try:
+        result = bulk_insert(conn, train_list)
+    except Exception:
+        METRICS.inc("db_errors_total")
+        raise
+    for train, reason in result.rejected:
+        logger.warning(f"Rejected record for train {train.get('trainNo')}: {reason}")
+    logger.info(f"Inserted {result.inserted} records ({len(result.rejected)} rejected).")
+    return result
+
+class CollectorRuntime:
     """
-    
-    count = 0
-    for train in train_list:
-        try:
-            # Map API fields to Schema params
-            # Note: API dates are strings, Postgres adapts them usually, but safe to strict parse if needed.
-            # API format example: "20231024123045" or similar? 
-            # Description says: "최종수신날짜", "최종수신시간". 
-            # Let's check the API spec more closely if possible or assume standard ISO or YYYYMMDD.
-            # Based on common public data, it might need parsing. 
-            # However, for now, we will pass them as is and let the driver/DB handle or fail if incompatible.
-            # Safe approach: format if we see the format. 
-            # Assuming 'recptnDt' is the main timestamp.
-            
-            # Helper to safely get int
-            def get_int(val):
-                try:
-                    return int(val)
-                except (ValueError, TypeError):
-                    return None
-
-            # Helper to parse boolean
-            def get_bool(val):
-                return str(val) == '1'
-
-            record = (
-                train.get('subwayId'),
-                train.get('subwayNm'),
-                train.get('statnId'),
-                train.get('statnNm'),
-                train.get('trainNo'),
-                train.get('lastRecptnDt'), # Date: YYYYMMDD
-                train.get('recptnDt'),     # Time: YYYY-MM-DD HH:mm:ss (Usually) - Wait, let's verify format if we can.
-                get_int(train.get('updnLine')),
-                train.get('statnTid'),
-                train.get('statnTnm'),
-                get_int(train.get('trainSttus')),
-                get_int(train.get('directAt')),
-                get_bool(train.get('lstcarAt'))
+    Long-lived collector state reused across scheduler ticks.
+
+    Keeps one event loop with a keep-alive aiohttp session and a psycopg2
+    connection pool, so a tick does not pay TCP/TLS/auth setup again. The
+    loop runs on its own thread, so overlapping jobs fetch concurrently over
+    the shared session.
+    Pooled connections are health-checked on checkout and replaced when
+    broken. Connection reuse counts are kept in `stats`.
+
+    With USE_SPOOL, ticks only append to a local write-ahead spool and a
+    background SpoolFlusher writes to the database. With ADAPTIVE_POLLING,
+    every fetch is fed to an AdaptivePoller that decides when each line is
+    polled next.
+    """
+
+    def __init__(self, dsn=DATABASE_URL, minconn=DB_POOL_MIN_CONN, maxconn=DB_POOL_MAX_CONN):
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.pool = None
+        self.loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self.loop.run_forever, name="http-loop", daemon=True)
+        self._loop_thread.start()
+        self.session = None
+        self._seen_conns = set()
+        # Guards the tick counter, adaptive poller and change filter when
+        # cycles overlap (per-line jobs, parallel overrun policy). Fetches,
+        # spool appends and database writes run outside it.
+        self.lock = threading.Lock()
+        self.change_filter = ChangeFilter(HEARTBEAT_MINUTES) if CHANGE_ONLY_INGESTION else None
+        self.stats = {
+            "ticks": 0,
+            "http_connections_created": 0,
+            "http_connections_reused": 0,
+            "db_connections_created": 0,
+            "db_connections_reused": 0,
+            "db_reconnects": 0,
+        }
+        self.spool = None
+        self.flusher = None
+        if USE_SPOOL:
+            self.spool = WriteSpool(SPOOL_PATH)
+            self.flusher = SpoolFlusher(
+                self.spool, self._write_batch, batch_size=SPOOL_FLUSH_BATCH,
+                interval=SPOOL_FLUSH_INTERVAL, max_backoff=SPOOL_MAX_BACKOFF,
+            )
+            self.flusher.start()
+        self.poller = None
+        if ADAPTIVE_POLLING and adaptive_lines():
+            # Lines with a fixed interval use part of the quota; the rest is shared
+            fixed_calls = sum(86400 / sec for sec in LINE_INTERVALS.values())
+            self.poller = AdaptivePoller(
+                adaptive_lines(), daily_quota=max(API_DAILY_QUOTA - fixed_calls, 0),
+                min_interval=POLL_MIN_INTERVAL, max_interval=POLL_MAX_INTERVAL,
+                off_hours_interval=POLL_OFF_HOURS_INTERVAL,
+                service_hours=parse_service_hours(SERVICE_HOURS),
             )
-            cursor.execute(query, record)
-            count += 1
-        except Exception as e:
-            logger.error(f"Failed to insert row for train {train.get('trainNo')}: {e}")
-            conn.rollback() # Rollback the failed one, but maybe we want to continue?
-            # For bulk insert, usually we do it in batch. For simplicity here, row by row with commit at end.
-            
-    conn.commit()
-    cursor.close()
-    logger.info(f"Inserted {count} records.")
 
-def job():
-    logger.info("Starting collection cycle...")
-    
+    async def _on_http_create(self, session, ctx, params):
+        self.stats["http_connections_created"] += 1
+
+    async def _on_http_reuse(self, session, ctx, params):
+        self.stats["http_connections_reused"] += 1
+
+    async def _fetch_all(self, line_names):
+        if self.session is None or self.session.closed:
+            trace = aiohttp.TraceConfig()
+            trace.on_connection_create_end.append(self._on_http_create)
+            trace.on_connection_reuseconn.append(self._on_http_reuse)
+            self.session = _new_session(trace_configs=[trace])
+        return await fetch_all_positions_async(line_names, self.session)
+
+    def fetch_all(self, line_names):
+        """
+        Fetch every line over the persistent HTTP session. Safe to call from
+        several threads; the requests share the event loop thread.
+        """
+        positions = asyncio.run_coroutine_threadsafe(self._fetch_all(line_names), self.loop).result()
+        if self.poller is not None:
+            with self.lock:
+                self.poller.observe(positions)
+        return positions
+
+    def _ensure_pool(self):
+        if self.pool is None or self.pool.closed:
+            self.pool = psycopg2.pool.ThreadedConnectionPool(self.minconn, self.maxconn, self.dsn)
+        return self.pool
+
+    @staticmethod
+    def _is_healthy(conn):
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    @contextmanager
+    def connection(self):
+        """
+        Check a healthy connection out of the pool and return it afterwards.
+        A connection that fails the health check or breaks while in use is
+        closed and dropped from the pool; the next checkout reconnects.
+        """
+        pool = self._ensure_pool()
+        conn = pool.getconn()
+        if not self._is_healthy(conn):
+            logger.warning("Pooled DB connection failed health check, reconnecting")
+            pool.putconn(conn, close=True)
+            self._seen_conns.discard(id(conn))
+            self.stats["db_reconnects"] += 1
+            conn = pool.getconn()
+
+        if id(conn) in self._seen_conns:
+            self.stats["db_connections_reused"] += 1
+        else:
+            self._seen_conns.add(id(conn))
+            self.stats["db_connections_created"] += 1
+
+        broken = False
+        try:
+            yield conn
+        except psycopg2.OperationalError:
+            broken = True
+            raise
+        finally:
+            if broken or conn.closed:
+                self._seen_conns.discard(id(conn))
+                pool.putconn(conn, close=True)
+            else:
+                pool.putconn(conn)
+
+    def _write_batch(self, train_list):
+        """
+        Spool sink: insert one batch and return the rejected (train, reason)
+        pairs. Raises if the database is unreachable or refused every row.
+        """
+        with self.connection() as conn:
+            return insert_data(conn, train_list).rejected
+
+    def close(self):
+        if self.flusher is not None:
+            self.flusher.stop()
+            self.spool.close()
+        if self.session is not None and not self.session.closed:
+            asyncio.run_coroutine_threadsafe(self.session.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._loop_thread.join()
+        self.loop.close()
+        if self.pool is not None and not self.pool.closed:
+            self.pool.closeall()
+
+_runtime = None
+
+def get_runtime():
+    """
+    Return the process-wide CollectorRuntime, creating it on first use.
+    """
+    global _runtime
+    if _runtime is None:
+        _runtime = CollectorRuntime()
+    return _runtime
+
+def line_groups():
+    """
+    Group SUBWAY_LINES by polling interval: {interval_sec: [line, ...]}.
+    """
+    groups = {}
+    for line in SUBWAY_LINES:
+        groups.setdefault(LINE_INTERVALS.get(line, COLLECT_INTERVAL), []).append(line)
+    return groups
+
+def adaptive_lines():
+    """
+    Lines whose polling rate is chosen by the AdaptivePoller (no LINE_INTERVALS override).
+    """
+    return [line for line in SUBWAY_LINES if line not in LINE_INTERVALS]
+
+def job(runtime=None, lines=None):
+    """
+    Run one collection cycle for `lines` (default: every line in SUBWAY_LINES).
+    Returns the cycle summary from _collect (None when skipped or failed).
+    """
     # Connect to DB
     if not DATABASE_URL:
         logger.error("DATABASE_URL is not set. Skipping DB insertion.")
         return
 
+    runtime = runtime or get_runtime()
+    return _collect(runtime, lines or SUBWAY_LINES)
+
+def _collect(runtime, lines):
+    """
+    Fetch, filter and store one cycle. Returns {fetched, stored, fetch_sec,
+    cycle_sec} (row counts and seconds), or None if the database write failed.
+
+    Cycles can overlap (per-line jobs, parallel overrun policy), so only
+    the sections touching shared state hold runtime.lock; a slow fetch for
+    one line group does not hold up the others.
+    """
+    logger.info(f"Starting collection cycle for {len(lines)} lines...")
+    with runtime.lock:
+        runtime.stats["ticks"] += 1
+    cycle = METRICS.begin_cycle(lines)
+
+    started = time.perf_counter()
+    positions = runtime.fetch_all(lines)
+    fetch_sec = time.perf_counter() - started
+    logger.info(f"Fetched {len(lines)} lines concurrently in {fetch_sec:.2f}s")
+
+    # Store the snapshot of every line in a single batch
+    snapshot = [train for line in lines for train in positions.get(line, [])]
+    fetched = len(snapshot)
+
+    # Keep only trains that moved since the last written snapshot. Only the
+    # change filter is locked; the write runs outside and the filter result
+    # is committed with its token afterwards
+    token = None
+    if runtime.change_filter is not None:
+        with runtime.lock:
+            runtime.change_filter.begin_cycle()
+            snapshot = runtime.change_filter.filter(snapshot)
+            token = runtime.change_filter.take_pending()
+            dedup_ratio = runtime.change_filter.dedup_ratio
+
+    if runtime.spool is not None:
+        # Durable once on local disk; the flusher writes it to the database
+        total_records = runtime.spool.append(snapshot)
+        runtime.flusher.notify()
+    else:
+        try:
+            with runtime.connection() as conn:
+                total_records = insert_data(conn, snapshot).inserted
+        except Exception as e:
+            logger.error(f"Database write failed: {e}")
+            total_records = None
+
+    if total_records is not None and token is not None:
+        with runtime.lock:
+            runtime.change_filter.commit(token=token)
+        logger.info(f"Change-only ingestion: dedup ratio {dedup_ratio:.1%}")
+
+    kept = {id(train) for train in snapshot}
+    for line in lines:
+        trains = positions.get(line, [])
+        changed = sum(1 for train in trains if id(train) in kept)
+        METRICS.inc("rows_fetched_total", len(trains), line=line)
+        METRICS.inc("rows_unchanged_total", len(trains) - changed, line=line)
+    if total_records is None:
+        METRICS.end_cycle(cycle)
+        return
+
+    logger.info(f"Cycle finished. Total records: {total_records}")
+    logger.info(f"Connection reuse: {runtime.stats}")
+    if runtime.flusher is not None:
+        logger.info(f"Spool: {runtime.flusher.report()}")
+    if runtime.poller is not None:
+        with runtime.lock:
+            polling = runtime.poller.stats()
+        logger.info(f"Adaptive polling: {polling}")
+    summary = {
+        "fetched": fetched,
+        "stored": total_records,
+        "fetch_sec": fetch_sec,
+        "cycle_sec": time.perf_counter() - started,
+    }
+    _log_cycle(runtime, lines, summary, cycle)
+    return summary
+
+def _log_cycle(runtime, lines, summary, cycle):
+    """
+    Record the cycle time and spool backlog, then emit this cycle's
+    per-stage metrics as one JSON record.
+    """
+    METRICS.observe("cycle_seconds", summary["cycle_sec"])
+    METRICS.inc("rows_stored_total", summary["stored"])
+    if runtime.spool is not None:
+        METRICS.set("spool_pending_rows", runtime.spool.pending())
+    if not METRICS_ENABLED:
+        METRICS.end_cycle(cycle)
+        return
+    record = {
+        "ts": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "lines": lines,
+        "fetched": summary["fetched"],
+        "stored": summary["stored"],
+    }
+    record.update(METRICS.end_cycle(cycle))
+    # Unlabelled totals also pick up overlapping cycles; report this cycle's own
+    record["cycle_seconds"] = round(summary["cycle_sec"], 4)
+    record["rows_stored_total"] = summary["stored"]
+    write_cycle_log(record, METRICS_LOG_PATH)
+
+def start_metrics_server():
+    """
+    Serve /metrics on METRICS_PORT. Returns None when disabled or when the
+    port is unavailable (collection carries on without the endpoint).
+    """
+    if not (METRICS_ENABLED and METRICS_PORT):
+        return None
+    try:
+        return MetricsServer(METRICS, METRICS_HOST, METRICS_PORT).start()
+    except OSError as e:
+        logger.error(f"Could not start metrics server: {e}")
+        return None
+
+def adaptive_job(runtime=None):
+    """
+    Runs every POLL_TICK seconds and collects only the lines the
+    AdaptivePoller considers due.
+    """
+    runtime = runtime or get_runtime()
+    with runtime.lock:
+        lines = runtime.poller.due_lines()
+    if lines:
+        job(runtime, lines)
+
+def maintenance_job(runtime=None):
+    """
+    Hourly storage maintenance: partitions, retention and rollups.
+    """
+    if not DATABASE_URL:
+        return
+
+    runtime = runtime or get_runtime()
     try:
-        conn = psycopg2.connect(DATABASE_URL)
+        with runtime.connection() as conn:
+            partitions, rollups = run_maintenance(
+                conn, PARTITION_DAYS_AHEAD, RETENTION_DAYS, ROLLUP_LOOKBACK_HOURS
+            )
     except Exception as e:
-        logger.error(f"Could not connect to database: {e}")
+        logger.error(f"Storage maintenance failed: {e}")
         return
 
-    total_records = 0
-    for line in SUBWAY_LINES:
-        logger.info(f"Fetching {line}...")
-        data = fetch_realtime_position(line)
-        if data:
-            insert_data(conn, data)
-            total_records += len(data)
-        time.sleep(0.5) # Be gentle with the API
-        
-    conn.close()
-    logger.info(f"Cycle finished. Total records: {total_records}")
+    logger.info(f"Storage maintenance: partitions {partitions}, rollups {rollups}")
 
-if __name__ == "__main__":
+def _percentiles(values):
+    values = sorted(values)
+    if not values:
+        return {}
+    pick = lambda q: round(values[min(len(values) - 1, int(len(values) * q))], 3)
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": round(values[-1], 3)}
+
+def replay(api_url, speed, duration):
+    """
+    Load-test mode: run the collector against a fake realtimePosition server
+    (seoul-subway-monitor/src/fake_api.py serve --speed N) for `duration`
+    seconds with every polling interval divided by `speed`, then report
+    end-to-end ingestion throughput and tail latency.
+
+    The fake server's clock must run at the same speed so each tick sees a
+    real interval's worth of movement. Rows go through the normal change
+    filter, spool and database path, so point DATABASE_URL at a test database.
+    """
+    global API_BASE_URL
+    API_BASE_URL = api_url
+    runtime = get_runtime()
+    # Adaptive intervals follow the real clock; replay uses the scaled fixed ones
+    runtime.poller = None
+
+    if STORAGE_MAINTENANCE:
+        maintenance_job(runtime)
+
+    cycles = []
+    def replay_job(lines):
+        result = job(runtime, lines)
+        if result:
+            cycles.append(result)
+
+    scheduler = TickScheduler()
+    for interval, lines in line_groups().items():
+        scheduler.every(interval / speed, replay_job, lines, name=f"replay-{interval:g}s", overrun=OVERRUN_POLICY)
+    logger.info(f"Replaying against {api_url} at {speed:g}x for {duration:g}s")
+    metrics_server = start_metrics_server()
+    started = time.perf_counter()
+    try:
+        scheduler.run_forever(duration=duration)
+    except KeyboardInterrupt:
+        logger.info("Replay interrupted")
+    finally:
+        scheduler.stop()
+    elapsed = time.perf_counter() - started
+
+    fetched = sum(c["fetched"] for c in cycles)
+    stored = sum(c["stored"] for c in cycles)
+    report = {
+        "cycles": len(cycles),
+        "elapsed_sec": round(elapsed, 1),
+        "simulated_sec": round(elapsed * speed, 1),
+        "fetched_rows_per_sec": round(fetched / elapsed, 1),
+        "stored_rows_per_sec": round(stored / elapsed, 1),
+        "fetch_latency_sec": _percentiles([c["fetch_sec"] for c in cycles]),
+        "cycle_latency_sec": _percentiles([c["cycle_sec"] for c in cycles]),
+        "scheduler": scheduler.stats(),
+    }
+    if runtime.flusher is not None:
+        # Include the time to drain the spool in the database throughput
+        drain_started = time.perf_counter()
+        runtime.flusher.flush()
+        spool = runtime.flusher.report()
+        spool["drain_sec"] = round(time.perf_counter() - drain_started, 2)
+        spool["db_rows_per_sec"] = round(spool["flushed"] / (elapsed + spool["drain_sec"]), 1)
+        report["spool"] = spool
+    if metrics_server is not None:
+        metrics_server.stop()
+    runtime.close()
+    logger.info(f"Replay report: {report}")
+    return report
+
+def main():
     logger.info("Subway Collector Started")
+    metrics_server = start_metrics_server()
     
-    # Run once immediately
+    # Run once immediately (maintenance first so today's partition exists)
+    if STORAGE_MAINTENANCE:
+        maintenance_job()
     job()
     
-    # Schedule to run every 1 minute (or user preference)
-    schedule.every(1).minutes.do(job)
+    # One job per polling interval, fired on wall-clock boundaries
+    scheduler = TickScheduler()
+    adaptive = get_runtime().poller is not None
+    for interval, lines in line_groups().items():
+        if adaptive:
+            # Lines without an override are handled by the adaptive job
+            lines = [line for line in lines if line in LINE_INTERVALS]
+            if not lines:
+                continue
+        scheduler.every(interval, job, lines=lines, name=f"collect-{interval:g}s", overrun=OVERRUN_POLICY)
+        logger.info(f"Polling every {interval:g}s: {', '.join(lines)}")
+    if adaptive:
+        # A long cycle skips the next check; overdue lines are picked up together
+        scheduler.every(POLL_TICK, adaptive_job, name="collect-adaptive", overrun="skip")
+        logger.info(f"Adaptive polling: {', '.join(adaptive_lines())} (daily quota {API_DAILY_QUOTA} calls)")
+    # Storage maintenance at five past every hour
+    if STORAGE_MAINTENANCE:
+        scheduler.every(3600, maintenance_job, name="maintenance", offset=300, overrun="skip")
     
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        logger.info("Subway Collector stopped")
+    finally:
+        scheduler.stop()
+        logger.info(f"Scheduler: {scheduler.stats()}")
+        if _runtime is not None:
+            _runtime.close()
+        if metrics_server is not None:
+            metrics_server.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seoul subway realtime position collector")
+    parser.add_argument("--replay", action="store_true", help="load-test against a fake API server")
+    parser.add_argument("--api-url", default="http://127.0.0.1:8089/api/subway", help="fake server base URL")
+    parser.add_argument("--speed", type=float, default=10.0, help="replay speed (must match the fake server)")
+    parser.add_argument("--duration", type=float, default=300.0, help="replay length in real seconds")
+    args = parser.parse_args()
+
+    if args.replay:
+        if not DATABASE_URL:
+            logger.error("DATABASE_URL is not set; replay needs a (test) database.")
+        else:
+            replay(args.api_url, args.speed, args.duration)
+    else:
+        main()
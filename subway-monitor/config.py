@@ -3,6 +3,20 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def _parse_line_intervals(value):
+    """
+    Parse per-line polling intervals given as "2호선=15,9호선=30" (seconds).
+    """
+    intervals = {}
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        line, _, sec = part.partition("=")
+        intervals[line.strip()] = float(sec)
+    return intervals
+
+
 # Seoul Open Data API Key
 API_KEY = os.getenv("SEOUL_API_KEY", "6e71466270636b733633654f6b4a7a")
 
@@ -10,6 +24,9 @@ API_KEY = os.getenv("SEOUL_API_KEY", "6e71466270636b733633654f6b4a7a")
 # Format: postgresql://[user]:[password]@[host]:[port]/[db]
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# realtimePosition endpoint (point it at a fake server for load tests)
+API_BASE_URL = os.getenv("API_BASE_URL", "http://swopenapi.seoul.go.kr/api/subway")
+
 # List of Subway Lines to monitor
 SUBWAY_LINES = [
     "1호선", "2호선", "3호선", "4호선", "5호선", 
@@ -17,3 +34,76 @@ SUBWAY_LINES = [
     "경의중앙선", "공항철도", "경춘선", 
     "수인분당선", "신분당선", "우이신설선"
 ]
+
+# Collection schedule
+# Default polling interval in seconds (sub-minute allowed; ticks fire on
+# wall-clock boundaries), per-line overrides, and what to do when a cycle
+# is still running at the next tick: skip, coalesce or parallel
+COLLECT_INTERVAL = float(os.getenv("COLLECT_INTERVAL", "60"))
+LINE_INTERVALS = _parse_line_intervals(os.getenv("LINE_INTERVALS", ""))
+OVERRUN_POLICY = os.getenv("OVERRUN_POLICY", "coalesce")
+
+# Adaptive polling
+# Lines without a LINE_INTERVALS override are polled at a rate driven by how
+# fast their positions change and whether trains are in service, sharing a
+# daily API call quota (default: the call count of polling every line once a
+# minute). POLL_TICK is how often due lines are checked; SERVICE_HOURS is the
+# KST service window (an end before the start crosses midnight). The quota
+# wins over POLL_MAX_INTERVAL: when it is too tight, intervals stretch past
+# it, up to POLL_OFF_HOURS_INTERVAL
+ADAPTIVE_POLLING = os.getenv("ADAPTIVE_POLLING", "true").lower() == "true"
+API_DAILY_QUOTA = int(os.getenv("API_DAILY_QUOTA", str(len(SUBWAY_LINES) * 1440)))
+POLL_TICK = float(os.getenv("POLL_TICK", "5"))
+POLL_MIN_INTERVAL = float(os.getenv("POLL_MIN_INTERVAL", "15"))
+POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", "120"))
+POLL_OFF_HOURS_INTERVAL = float(os.getenv("POLL_OFF_HOURS_INTERVAL", "600"))
+SERVICE_HOURS = os.getenv("SERVICE_HOURS", "05:00-01:30")
+
+# Concurrent collection settings
+# Upper bound on in-flight API requests and per-request timeout (seconds)
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "8"))
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "10"))
+# Rows requested per realtimePosition call; when list_total_count is larger
+# the remaining pages are fetched concurrently
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", "100"))
+
+# Long-lived runtime settings
+# psycopg2 connection pool bounds reused across scheduler ticks
+DB_POOL_MIN_CONN = int(os.getenv("DB_POOL_MIN_CONN", "1"))
+DB_POOL_MAX_CONN = int(os.getenv("DB_POOL_MAX_CONN", "4"))
+
+# Change-only ingestion
+# Store a train only when its station/status/direction/destination changed,
+# plus a heartbeat row every HEARTBEAT_MINUTES (0 disables heartbeats)
+CHANGE_ONLY_INGESTION = os.getenv("CHANGE_ONLY_INGESTION", "true").lower() == "true"
+HEARTBEAT_MINUTES = float(os.getenv("HEARTBEAT_MINUTES", "5"))
+
+# Local write-ahead spool
+# Each cycle is appended to a SQLite (WAL) file first; a background thread
+# drains it to the database in large batches and retries with backoff, so
+# collection keeps its cadence through slow or unavailable databases
+USE_SPOOL = os.getenv("USE_SPOOL", "true").lower() == "true"
+SPOOL_PATH = os.getenv(
+    "SPOOL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "spool", "positions.db")
+)
+SPOOL_FLUSH_BATCH = int(os.getenv("SPOOL_FLUSH_BATCH", "5000"))
+SPOOL_FLUSH_INTERVAL = float(os.getenv("SPOOL_FLUSH_INTERVAL", "2"))
+SPOOL_MAX_BACKOFF = float(os.getenv("SPOOL_MAX_BACKOFF", "60"))
+
+# Storage maintenance (see schema.sql)
+# Daily partitions created ahead of time, raw-log retention in days, and how
+# many recent hours of rollups are recomputed on each hourly run
+STORAGE_MAINTENANCE = os.getenv("STORAGE_MAINTENANCE", "true").lower() == "true"
+PARTITION_DAYS_AHEAD = int(os.getenv("PARTITION_DAYS_AHEAD", "3"))
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "30"))
+ROLLUP_LOOKBACK_HOURS = int(os.getenv("ROLLUP_LOOKBACK_HOURS", "3"))
+
+# Collector metrics
+# Per-stage latency histograms (fetch, JSON parse, transform, DB write, cycle)
+# and row/error counters, served as Prometheus text on METRICS_PORT/metrics
+# (0 disables the server). One JSON record per cycle goes to METRICS_LOG_PATH,
+# or to the log when it is empty.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+METRICS_LOG_PATH = os.getenv("METRICS_LOG_PATH", "")
@@ -0,0 +1,103 @@
+import time
+
+
+class ChangeFilter:
+    """
+    Last-state cache that keeps only trains whose position changed.
+
+    Trains are keyed by (subwayId, trainNo). A row is written when its
+    station, status, direction or destination differs from the last
+    written row, or when `heartbeat_minutes` have passed since then.
+    Trains not seen for `evict_after_minutes` are dropped from the cache.
+    """
+
+    KEY_FIELDS = ("subwayId", "trainNo")
+    STATE_FIELDS = ("statnId", "trainSttus", "updnLine", "statnTid")
+
+    def __init__(self, heartbeat_minutes=0, evict_after_minutes=60):
+        self.heartbeat_sec = heartbeat_minutes * 60
+        self.evict_after_sec = evict_after_minutes * 60
+        # key -> (state, last_written_at, last_seen_at)
+        self._last = {}
+        self._pending = {}
+        self.begin_cycle()
+
+    def _key(self, train):
+        return tuple(train.get(f) for f in self.KEY_FIELDS)
+
+    def _state(self, train):
+        return tuple(train.get(f) for f in self.STATE_FIELDS)
+
+    def begin_cycle(self):
+        """
+        Reset the per-cycle counters.
+        """
+        self.cycle_total = 0
+        self.cycle_written = 0
+
+    def filter(self, train_list, now=None):
+        """
+        Return the trains that changed (or are due a heartbeat).
+        The cache is only advanced by commit(), so a failed write is
+        retried on the next cycle.
+        """
+        now = time.time() if now is None else now
+        changed = []
+
+        for train in train_list:
+            key = self._key(train)
+            state = self._state(train)
+            prev = self._last.get(key)
+
+            if prev is None or prev[0] != state:
+                changed.append(train)
+            elif self.heartbeat_sec and now - prev[1] >= self.heartbeat_sec:
+                changed.append(train)
+            else:
+                self._last[key] = (prev[0], prev[1], now)
+
+        self._pending = {self._key(t): self._state(t) for t in changed}
+        self.cycle_total += len(train_list)
+        self.cycle_written += len(changed)
+        return changed
+
+    def take_pending(self, now=None):
+        """
+        Detach the last filter() result as a token for commit(). Lets a
+        cycle write outside the caller's lock while other cycles filter.
+        """
+        now = time.time() if now is None else now
+        pending, self._pending = self._pending, {}
+        return now, pending
+
+    def commit(self, now=None, token=None):
+        """
+        Record the last filter() result (or the one in `token`) as written
+        and evict stale trains. A train written by a cycle that filtered
+        later than `token` keeps that newer state.
+        """
+        now = time.time() if now is None else now
+        if token is None:
+            filtered_at, pending = now, self._pending
+            self._pending = {}
+        else:
+            filtered_at, pending = token
+        for key, state in pending.items():
+            prev = self._last.get(key)
+            if token is not None and prev is not None and prev[1] > filtered_at:
+                continue
+            self._last[key] = (state, now, now)
+
+        if self.evict_after_sec:
+            expired = [k for k, v in self._last.items() if now - v[2] >= self.evict_after_sec]
+            for k in expired:
+                del self._last[k]
+
+    @property
+    def dedup_ratio(self):
+        """
+        Share of rows skipped in the current cycle (0.0 - 1.0).
+        """
+        if not self.cycle_total:
+            return 0.0
+        return 1 - self.cycle_written / self.cycle_total
@@ -0,0 +1,225 @@
+import csv
+import io
+import logging
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+TABLE_NAME = "realtime_train_positions"
+
+COLUMNS = (
+    "subway_line_id", "subway_line_name", "station_id", "station_name",
+    "train_number", "last_received_at", "received_at", "up_down_type",
+    "terminal_station_id", "terminal_station_name", "train_status",
+    "is_express", "is_last_train",
+)
+
+COPY_SQL = f"COPY {TABLE_NAME} ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+INSERT_SQL = f"INSERT INTO {TABLE_NAME} ({', '.join(COLUMNS)}) VALUES %s"
+
+# Result of one bulk ingestion: number of inserted rows and the rejected
+# records as (raw_train_dict, reason) pairs.
+IngestResult = namedtuple("IngestResult", ["inserted", "rejected"])
+
+# When the database refused the first two rows on their own and nothing has
+# been stored yet, this many rows spread over the rest are tried one by one
+# before the whole batch is treated as refused
+ISOLATE_PROBES = 8
+
+# The API reports reception times as naive Korea Standard Time (UTC+9, no DST).
+KST = timezone(timedelta(hours=9), "KST")
+
+
+class BatchRejected(Exception):
+    """
+    The database refused every row of a batch, which points at the table
+    (missing partition, schema change) rather than at the rows. The
+    transaction is rolled back so nothing is acknowledged; `rejected` holds
+    the (train, reason) pairs that also failed on their own.
+    """
+
+    def __init__(self, error, rejected):
+        super().__init__(f"database refused every row of the batch ({str(error).strip()})")
+        self.rejected = rejected
+
+
+def to_int(val):
+    """
+    Parse an optional integer field. Missing values become None,
+    malformed values raise ValueError so the record can be rejected.
+    """
+    if val is None or val == "":
+        return None
+    return int(val)
+
+
+def to_bool(val):
+    return str(val) == '1'
+
+
+def to_kst_datetime(val, fmt="%Y-%m-%d %H:%M:%S"):
+    """
+    Parse an API timestamp in the given strptime format as KST.
+    Without an explicit offset Postgres would read it in the session time
+    zone, shifting every event by nine hours on a UTC server.
+    The formats are parsed explicitly because datetime.fromisoformat only
+    accepts the basic 'YYYYMMDD' form from Python 3.11 on.
+    Malformed values raise ValueError so the record can be rejected.
+    """
+    if val is None or val == "":
+        return None
+    return datetime.strptime(val, fmt).replace(tzinfo=KST)
+
+
+def to_record(train):
+    """
+    Map one API train dict to a row tuple in COLUMNS order.
+    Raises ValueError when the record cannot be stored.
+    """
+    if not train.get('trainNo') or not train.get('subwayId'):
+        raise ValueError("missing trainNo/subwayId")
+
+    return (
+        train.get('subwayId'),
+        train.get('subwayNm'),
+        train.get('statnId'),
+        train.get('statnNm'),
+        train.get('trainNo'),
+        to_kst_datetime(train.get('lastRecptnDt'), "%Y%m%d"),  # Date: YYYYMMDD
+        to_kst_datetime(train.get('recptnDt')),                # Time: YYYY-MM-DD HH:mm:ss (event time)
+        to_int(train.get('updnLine')),
+        train.get('statnTid'),
+        train.get('statnTnm'),
+        to_int(train.get('trainSttus')),
+        to_int(train.get('directAt')),
+        to_bool(train.get('lstcarAt')),
+    )
+
+
+def _to_csv(rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        # Unquoted empty fields are read as NULL by COPY ... (FORMAT csv)
+        writer.writerow(
+            '' if v is None else ('t' if v is True else 'f' if v is False else v)
+            for v in row
+        )
+    buf.seek(0)
+    return buf
+
+
+def _insert_chunk(cursor, pairs):
+    """
+    Insert (train, row) pairs under a savepoint. Returns None on success or
+    the data error after rolling the chunk back.
+    """
+    cursor.execute("SAVEPOINT bulk_chunk")
+    try:
+        execute_values(cursor, INSERT_SQL, [row for _, row in pairs], page_size=len(pairs))
+        cursor.execute("RELEASE SAVEPOINT bulk_chunk")
+        return None
+    except (psycopg2.DataError, psycopg2.IntegrityError) as e:
+        cursor.execute("ROLLBACK TO SAVEPOINT bulk_chunk")
+        return e
+
+
+def _insert_isolating(cursor, pairs, rejected):
+    """
+    Insert (train, row) pairs with execute_values, isolating rows the
+    database refuses so the rest of the batch still lands. The first
+    failing row of what is left is found by bisection (good prefixes are
+    inserted on the way), then the remainder is sent again.
+
+    Rows are only rejected once some other row was stored. If the first two
+    rows fail on their own and none of ISOLATE_PROBES rows spread over the
+    rest stores either, the failure is not row-specific and BatchRejected is
+    raised after O(log n) round trips instead of bisecting every row.
+    """
+    inserted = 0
+    failed = []
+    rest = list(pairs)
+    error = None
+    while rest:
+        error = _insert_chunk(cursor, rest)
+        if error is None:
+            inserted += len(rest)
+            break
+        # rest[lo:hi] holds a failing row: keep the first half when it stores
+        lo, hi = 0, len(rest)
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            chunk_error = _insert_chunk(cursor, rest[lo:mid])
+            if chunk_error is None:
+                inserted += mid - lo
+                lo = mid
+            else:
+                error, hi = chunk_error, mid
+        failed.append((rest[lo][0], str(error).strip()))
+        rest = rest[lo + 1:]
+        if not inserted and len(failed) >= 2:
+            picks = sorted({round(i * (len(rest) - 1) / max(ISOLATE_PROBES - 1, 1))
+                            for i in range(min(ISOLATE_PROBES, len(rest)))})
+            stored = {i for i in picks if _insert_chunk(cursor, rest[i:i + 1]) is None}
+            if not stored:
+                break
+            inserted += len(stored)
+            rest = [pair for i, pair in enumerate(rest) if i not in stored]
+
+    if not inserted:
+        raise BatchRejected(error, failed)
+    rejected.extend(failed)
+    return inserted
+
+
+def bulk_insert(conn, train_list):
+    """
+    Insert a whole snapshot in one round trip using COPY FROM STDIN.
+
+    Records that cannot be mapped are rejected up front. If COPY itself is
+    refused by the database, the batch falls back to execute_values with
+    savepoint bisection, so only the bad rows end up in the reject list.
+    The transaction is committed once per call.
+
+    Returns an IngestResult. Raises BatchRejected (after rolling back) when
+    the database refuses every row, so the caller keeps the batch.
+    """
+    rejected = []
+    pairs = []
+    with METRICS.timer("transform_seconds"):
+        for train in train_list:
+            try:
+                pairs.append((train, to_record(train)))
+            except (ValueError, TypeError) as e:
+                rejected.append((train, str(e)))
+
+    if not pairs:
+        return IngestResult(0, rejected)
+
+    write_started = time.perf_counter()
+    with conn.cursor() as cursor:
+        cursor.execute("SAVEPOINT bulk_copy")
+        try:
+            cursor.copy_expert(COPY_SQL, _to_csv(row for _, row in pairs))
+            cursor.execute("RELEASE SAVEPOINT bulk_copy")
+            inserted = len(pairs)
+        except (psycopg2.DataError, psycopg2.IntegrityError) as e:
+            logger.warning(f"COPY rejected the batch ({e}); retrying with row isolation")
+            cursor.execute("ROLLBACK TO SAVEPOINT bulk_copy")
+            try:
+                inserted = _insert_isolating(cursor, pairs, rejected)
+            except BatchRejected:
+                conn.rollback()
+                raise
+
+    conn.commit()
+    METRICS.observe("db_write_seconds", time.perf_counter() - write_started)
+    METRICS.inc("db_rows_written_total", inserted)
+    return IngestResult(inserted, rejected)
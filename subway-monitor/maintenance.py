@@ -0,0 +1,31 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+
+def run_maintenance(conn, days_ahead, retention_days, rollup_lookback_hours):
+    """
+    Run the periodic storage jobs defined in schema.sql:
+    pre-create upcoming daily partitions, drop partitions past retention,
+    and recompute the hourly headway/dwell rollups for the last
+    rollup_lookback_hours completed hours (late rows are picked up on the
+    next run because the refresh is idempotent).
+    Returns (partition_result, rollup_result) as decoded JSON dicts.
+    """
+    end = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    start = end - timedelta(hours=rollup_lookback_hours)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT maintain_train_position_partitions(%s, %s)",
+                (days_ahead, retention_days),
+            )
+            partitions = cursor.fetchone()[0]
+            cursor.execute("SELECT refresh_train_hourly_rollups(%s, %s)", (start, end))
+            rollups = cursor.fetchone()[0]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return partitions, rollups
@@ -0,0 +1,250 @@
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Prefix of every exported metric name
+PREFIX = "subway_collector_"
+
+class Histogram:
+    """
+    Fixed-bucket histogram keeping per-bucket counts, the sum and the count.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        # The last slot counts values above the largest bound (+Inf)
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Cumulative counts as Prometheus buckets: [(le, count), ...]."""
+        total = 0
+        result = []
+        for bound, count in zip(list(self.buckets) + [float("inf")], self.counts):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else f"{bound:g}", total))
+        return result
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (k + '="' + v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"' for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+class MetricsRegistry:
+    """
+    Latency histograms, counters and gauges for the collection pipeline.
+
+    Running totals are exported on /metrics in the Prometheus text format.
+    Values recorded between begin_cycle() and end_cycle() are also summed
+    separately for the per-cycle JSON log; that includes database writes
+    the background spool flusher happened to make during the cycle. Jobs
+    for different line groups can overlap, so each job opens its own cycle
+    and values labelled with a line only count towards cycles covering
+    that line. The registry is shared by the collector, the flusher and
+    the HTTP server threads, so every update takes a lock.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+        self._help = {}
+        # Open cycles: [(line set or None, {metric: total})]
+        self._cycles = []
+
+    def describe(self, name, text):
+        """Set the # HELP text of a metric."""
+        self._help[name] = text
+
+    def _record_cycle(self, name, labels, value):
+        # Cycle log: {metric: total} or {metric: {label values: total}}
+        if not self._cycles:
+            return
+        line = dict(labels).get("line")
+        key = ",".join(v for _, v in labels)
+        for lines, cycle in self._cycles:
+            if line is not None and lines is not None and line not in lines:
+                continue
+            if labels:
+                bucket = cycle.setdefault(name, {})
+                bucket[key] = bucket.get(key, 0) + value
+            else:
+                cycle[name] = cycle.get(name, 0) + value
+
+    def observe(self, name, value, **labels):
+        """Record one value (seconds) in a histogram."""
+        key = _labels(labels)
+        with self._lock:
+            hist = self._histograms.setdefault(name, {}).get(key)
+            if hist is None:
+                hist = self._histograms[name][key] = Histogram(self.buckets)
+            hist.observe(value)
+            self._record_cycle(name, key, value)
+
+    def inc(self, name, amount=1, **labels):
+        """Increase a counter by amount."""
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+            self._record_cycle(name, key, amount)
+
+    def set(self, name, value, **labels):
+        """Set a gauge."""
+        with self._lock:
+            self._gauges.setdefault(name, {})[_labels(labels)] = value
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Record the duration of the with-block, even when it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def begin_cycle(self, lines=None):
+        """
+        Start summing values for the per-cycle log and return the handle to
+        pass to end_cycle(). With `lines`, line-labelled values for other
+        lines are left out.
+        """
+        handle = (None if lines is None else frozenset(lines), {})
+        with self._lock:
+            self._cycles.append(handle)
+        return handle
+
+    def end_cycle(self, handle):
+        """
+        Stop the cycle and return what was recorded since begin_cycle() as
+        {metric: total} or {metric: {label values: total}}, seconds rounded
+        to 4 digits.
+        """
+        with self._lock:
+            self._cycles = [c for c in self._cycles if c is not handle]
+        cycle = handle[1]
+
+        def rounded(value):
+            return round(value, 4) if isinstance(value, float) else value
+
+        return {name: ({k: rounded(v) for k, v in value.items()} if isinstance(value, dict) else rounded(value))
+                for name, value in cycle.items()}
+
+    def render(self):
+        """
+        Render the running totals in the Prometheus text format (0.0.4).
+        """
+        lines = []
+        with self._lock:
+            for kind, store in (("counter", self._counters), ("gauge", self._gauges)):
+                for name, series in sorted(store.items()):
+                    full = PREFIX + name
+                    if name in self._help:
+                        lines.append(f"# HELP {full} {self._help[name]}")
+                    lines.append(f"# TYPE {full} {kind}")
+                    for labels, value in sorted(series.items()):
+                        lines.append(f"{full}{_format_labels(labels)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                full = PREFIX + name
+                if name in self._help:
+                    lines.append(f"# HELP {full} {self._help[name]}")
+                lines.append(f"# TYPE {full} histogram")
+                for labels, hist in sorted(series.items()):
+                    for le, count in hist.cumulative():
+                        lines.append(f"{full}_bucket{_format_labels(labels, (('le', le),))} {count}")
+                    lines.append(f"{full}_sum{_format_labels(labels)} {hist.sum:.6f}")
+                    lines.append(f"{full}_count{_format_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+# Process-wide registry
+METRICS = MetricsRegistry()
+METRICS.describe("fetch_seconds", "API fetch time per line, all pages included")
+METRICS.describe("parse_seconds", "JSON parse time per API response page")
+METRICS.describe("transform_seconds", "Time to map API records to table rows")
+METRICS.describe("db_write_seconds", "Time to write one batch to the database")
+METRICS.describe("cycle_seconds", "Duration of a whole collection cycle")
+METRICS.describe("rows_fetched_total", "Train rows received from the API")
+METRICS.describe("rows_unchanged_total", "Rows skipped by change-only ingestion")
+METRICS.describe("rows_stored_total", "Rows stored (or appended to the spool)")
+METRICS.describe("db_rows_written_total", "Rows written to the database")
+METRICS.describe("api_errors_total", "API fetch errors by kind: timeout, http, parse, api, other")
+METRICS.describe("db_errors_total", "Failed database writes")
+METRICS.describe("spool_pending_rows", "Rows waiting in the spool")
+
+def write_cycle_log(record, path=""):
+    """
+    Emit one cycle record as a JSON line, appended to `path` or logged.
+    """
+    line = json.dumps(record, ensure_ascii=False)
+    if path:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    else:
+        logger.info(f"Cycle metrics: {line}")
+
+class MetricsServer:
+    """
+    Local HTTP server exposing /metrics in the Prometheus text format from a
+    background thread.
+    """
+
+    def __init__(self, registry=METRICS, host="127.0.0.1", port=9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # No access log line per scrape
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+        logger.info(f"Metrics on http://{self.host}:{self.port}/metrics")
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
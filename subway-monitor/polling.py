@@ -0,0 +1,165 @@
+import time
+from datetime import datetime
+
+from ingest import KST
+
+
+def parse_service_hours(value):
+    """
+    Parse a KST service window such as "05:00-01:30" into (start, end) hours.
+    An end earlier than the start means the window crosses midnight.
+    """
+    start, _, end = value.partition("-")
+
+    def to_hours(text):
+        hour, _, minute = text.strip().partition(":")
+        return int(hour) + int(minute or 0) / 60
+
+    return to_hours(start), to_hours(end)
+
+
+class AdaptivePoller:
+    """
+    Per-line polling policy driven by observed change rate and service hours.
+
+    Lines whose trains move often (e.g. Line 2 at rush hour) are polled more
+    often and quiet lines less often, so each API call returns more changed
+    positions. Calls are shared out in proportion to each line's change rate
+    within `daily_quota`, bounded by `min_interval`/`max_interval`. Outside
+    service hours every line drops to `off_hours_interval`; a line that keeps
+    answering empty during service hours drops to `max_interval`.
+
+    The quota wins over `max_interval`: when the quota cannot pay for every
+    line at `max_interval` (too many lines for the quota), the active lines
+    are stretched evenly beyond it, up to `off_hours_interval`.
+    """
+
+    # Fields whose change counts as a useful sample
+    STATE_FIELDS = ("statnId", "trainSttus", "updnLine")
+
+    # Weight floor (changes/second) so a quiet line still gets some calls
+    MIN_RATE = 0.005
+
+    def __init__(self, lines, daily_quota, min_interval=15, max_interval=120,
+                 off_hours_interval=600, service_hours=(5.0, 1.5), smoothing=0.3):
+        self.lines = list(lines)
+        self.daily_quota = daily_quota
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.off_hours_interval = off_hours_interval
+        self.service_hours = service_hours
+        self.smoothing = smoothing
+
+        self.intervals = {line: min_interval for line in self.lines}
+        self.next_poll = {line: 0.0 for line in self.lines}
+        self.last_poll = {line: None for line in self.lines}
+        # EWMA of changed trains per second
+        self.rates = {line: None for line in self.lines}
+        self.empty_streak = {line: 0 for line in self.lines}
+        self._last_state = {line: {} for line in self.lines}
+        self.calls = 0
+        self.changes = 0
+
+    def in_service(self, now=None):
+        """Whether `now` (epoch seconds) falls inside the KST service window."""
+        now = time.time() if now is None else now
+        local = datetime.fromtimestamp(now, KST)
+        hour = local.hour + local.minute / 60
+        start, end = self.service_hours
+        if start <= end:
+            return start <= hour < end
+        return hour >= start or hour < end
+
+    def due_lines(self, now=None):
+        """Lines whose next poll time has passed."""
+        now = time.time() if now is None else now
+        return [line for line in self.lines if self.next_poll[line] <= now]
+
+    def observe(self, positions, now=None):
+        """
+        Record a fetch result ({line_name: train_list}), update change rates
+        and recompute every line's next poll time.
+        """
+        now = time.time() if now is None else now
+        for line, train_list in positions.items():
+            if line not in self.intervals:
+                continue
+            self.calls += 1
+            state = {t.get("trainNo"): tuple(t.get(f) for f in self.STATE_FIELDS) for t in train_list}
+            previous = self._last_state[line]
+            changed = sum(1 for train, s in state.items() if previous.get(train) != s)
+            self._last_state[line] = state
+            self.empty_streak[line] = 0 if train_list else self.empty_streak[line] + 1
+
+            last = self.last_poll[line]
+            self.last_poll[line] = now
+            if last is None:
+                # Nothing to compare the first snapshot against
+                continue
+            self.changes += changed
+            rate = changed / max(now - last, 1e-3)
+            prev_rate = self.rates[line]
+            self.rates[line] = rate if prev_rate is None else prev_rate + self.smoothing * (rate - prev_rate)
+
+        self._reschedule(now)
+
+    def _reschedule(self, now):
+        budget = self.daily_quota / 86400  # calls per second
+        in_service = self.in_service(now)
+
+        fixed = {}
+        for line in self.lines:
+            if not in_service:
+                fixed[line] = self.off_hours_interval
+            elif self.empty_streak[line] >= 2:
+                fixed[line] = self.max_interval
+        active = [line for line in self.lines if line not in fixed]
+
+        intervals = dict(fixed)
+        remaining = budget - sum(1 / iv for iv in fixed.values())
+        weights = {line: max(self.rates[line] or 0.0, self.MIN_RATE) for line in active}
+        # Share calls by change rate; lines hitting min_interval are pinned
+        # there and the rest of the budget is shared again among the others
+        while weights:
+            total_weight = sum(weights.values())
+            capped = [line for line, w in weights.items()
+                      if remaining > 0 and remaining * w / total_weight > 1 / self.min_interval]
+            if not capped:
+                break
+            for line in capped:
+                intervals[line] = self.min_interval
+                remaining -= 1 / self.min_interval
+                del weights[line]
+        total_weight = sum(weights.values())
+        for line, weight in weights.items():
+            share = remaining * weight / total_weight
+            intervals[line] = min(1 / share, self.max_interval) if share > 0 else self.max_interval
+
+        # Pulling slow lines in to max_interval can overshoot the quota;
+        # stretch the active lines evenly so the quota always wins
+        used = sum(1 / iv for iv in intervals.values())
+        if active and used > budget:
+            active_rate = sum(1 / intervals[line] for line in active)
+            spare = budget - (used - active_rate)
+            scale = active_rate / spare if spare > 0 else float("inf")
+            for line in active:
+                intervals[line] = min(intervals[line] * scale, self.off_hours_interval)
+
+        self.intervals = intervals
+        for line in self.lines:
+            last = self.last_poll[line]
+            self.next_poll[line] = now if last is None else last + intervals[line]
+
+    def stats(self):
+        """
+        Current per-line intervals and change rates, changed trains per call
+        and the projected number of calls per day.
+        """
+        return {
+            "calls": self.calls,
+            "changes_per_call": round(self.changes / self.calls, 2) if self.calls else 0.0,
+            "projected_daily_calls": round(sum(86400 / iv for iv in self.intervals.values())),
+            "daily_quota": self.daily_quota,
+            "intervals_sec": {line: round(iv, 1) for line, iv in self.intervals.items()},
+            "change_rates": {line: round(r, 3) for line, r in self.rates.items() if r is not None},
+        }
@@ -0,0 +1,180 @@
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# What to do when a tick arrives while the previous run is still going
+# - skip: drop this tick
+# - coalesce: fold missed ticks into one run started as soon as the current one ends
+# - parallel: start another run alongside the current one
+OVERRUN_POLICIES = ("skip", "coalesce", "parallel")
+
+# Number of recent runs kept for lag/duration statistics
+STATS_WINDOW = 500
+
+class _Job:
+    def __init__(self, name, interval, offset, func, args, kwargs, overrun):
+        self.name = name
+        self.interval = interval
+        self.offset = offset
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.overrun = overrun
+        self.next_due = None
+        self.running = 0
+        # Earliest tick that arrived during a run under the coalesce policy
+        self.pending_due = None
+        self.lags = deque(maxlen=STATS_WINDOW)
+        self.durations = deque(maxlen=STATS_WINDOW)
+        self.counts = {"ticks": 0, "runs": 0, "skipped": 0, "coalesced": 0, "missed": 0, "errors": 0}
+
+    def boundary_after(self, now: float):
+        """First wall-clock boundary after `now` (multiple of interval since the epoch, plus offset)."""
+        return (math.floor((now - self.offset) / self.interval) + 1) * self.interval + self.offset
+
+class TickScheduler:
+    """
+    Collection scheduler firing jobs on wall-clock boundaries.
+
+    Due times are fixed boundaries (every minute at :00, or :00/:15/:30/:45
+    for a 15s interval) rather than "last finish + interval", so a slow run
+    never pushes later ticks back. Jobs run on worker threads, so one slow
+    job does not delay another job's ticks. A tick that arrives while the
+    previous run is still going is handled by the job's overrun policy and
+    counted. stats() reports per-job tick lag (due -> actual start) and run
+    durations.
+    """
+
+    def __init__(self, max_workers: int = 8):
+        self.jobs = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tick")
+
+    def every(self, interval: float, func, *args, name: str = None, offset: float = 0.0,
+              overrun: str = "coalesce", **kwargs):
+        """
+        Run func(*args, **kwargs) every `interval` seconds on boundaries.
+        Sub-minute intervals are allowed. `offset` shifts the boundary
+        (interval=3600, offset=300 runs at five past every hour); `overrun`
+        is one of OVERRUN_POLICIES.
+        """
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        if overrun not in OVERRUN_POLICIES:
+            raise ValueError(f"unknown overrun policy {overrun!r} (expected one of {', '.join(OVERRUN_POLICIES)})")
+        job = _Job(name or getattr(func, "__name__", "job"), interval, offset % interval, func, args, kwargs, overrun)
+        job.next_due = job.boundary_after(time.time())
+        with self._lock:
+            self.jobs.append(job)
+        return job
+
+    def run_pending(self, now: float = None):
+        """
+        Hand every due job to a worker thread.
+        Returns the number of seconds until the next due time.
+        """
+        now = time.time() if now is None else now
+        for job in list(self.jobs):
+            # Re-anchor after the wall clock jumped backwards
+            if job.next_due - now > job.interval + 1:
+                job.next_due = job.boundary_after(now)
+            if now < job.next_due:
+                continue
+
+            scheduled = job.next_due
+            # Whole ticks that passed while the loop itself was blocked
+            missed = int((now - scheduled) // job.interval)
+            job.next_due = scheduled + (missed + 1) * job.interval
+            job.counts["ticks"] += 1
+            job.counts["missed"] += missed
+            self._fire(job, scheduled)
+
+        if not self.jobs:
+            return 1.0
+        return max(0.0, min(job.next_due for job in self.jobs) - time.time())
+
+    def _fire(self, job: _Job, scheduled: float):
+        with self._lock:
+            if job.running and job.overrun != "parallel":
+                if job.overrun == "coalesce":
+                    job.counts["coalesced"] += 1
+                    if job.pending_due is None:
+                        job.pending_due = scheduled
+                else:
+                    job.counts["skipped"] += 1
+                logger.warning(
+                    f"{job.name}: previous run still in progress, "
+                    f"{'coalescing' if job.overrun == 'coalesce' else 'skipping'} this tick"
+                )
+                return
+            job.running += 1
+        self._executor.submit(self._run, job, scheduled)
+
+    def _run(self, job: _Job, scheduled: float):
+        while True:
+            started = time.time()
+            try:
+                job.func(*job.args, **job.kwargs)
+            except Exception as e:
+                job.counts["errors"] += 1
+                logger.exception(f"{job.name} failed: {e}")
+            finished = time.time()
+
+            with self._lock:
+                job.counts["runs"] += 1
+                job.lags.append(started - scheduled)
+                job.durations.append(finished - started)
+                if job.pending_due is not None:
+                    # coalesce: run once more right away for the ticks missed meanwhile
+                    scheduled, job.pending_due = job.pending_due, None
+                    continue
+                job.running -= 1
+                return
+
+    def run_forever(self, duration=None):
+        """
+        Sleep until the next boundary and dispatch, until stop() or Ctrl+C
+        (or for at most `duration` seconds when given).
+        """
+        deadline = None if duration is None else time.time() + duration
+        while not self._stop.is_set():
+            wait = self.run_pending()
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                wait = min(wait, remaining)
+            self._stop.wait(wait)
+
+    def stop(self, wait: bool = True):
+        """Stop the loop; with wait=True also wait for running jobs."""
+        self._stop.set()
+        self._executor.shutdown(wait=wait)
+
+    def stats(self):
+        """
+        Per-job counters plus tick lag and duration statistics in seconds
+        over the last STATS_WINDOW runs.
+        """
+        result = {}
+        with self._lock:
+            for job in self.jobs:
+                lags = sorted(job.lags)
+                durations = list(job.durations)
+                entry = dict(job.counts)
+                entry["interval_sec"] = job.interval
+                entry["overrun"] = job.overrun
+                if lags:
+                    entry["lag_mean_sec"] = round(sum(lags) / len(lags), 3)
+                    entry["lag_p95_sec"] = round(lags[min(len(lags) - 1, int(len(lags) * 0.95))], 3)
+                    entry["lag_max_sec"] = round(lags[-1], 3)
+                    entry["duration_mean_sec"] = round(sum(durations) / len(durations), 3)
+                    entry["duration_max_sec"] = round(max(durations), 3)
+                result[job.name] = entry
+        return result
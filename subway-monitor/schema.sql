@@ -1,22 +1,230 @@
--- Create the table for storing real-time train positions
+-- Create the table for storing real-time train positions.
+-- The table is partitioned by day on created_at (KST midnight boundaries):
+-- recent-window queries only touch the newest partitions, and retention is
+-- a DROP of whole partitions instead of DELETE + VACUUM.
 CREATE TABLE IF NOT EXISTS realtime_train_positions (
-    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY,
     subway_line_id VARCHAR(50),
     subway_line_name VARCHAR(50),
     station_id VARCHAR(50),
     station_name VARCHAR(50),
     train_number VARCHAR(50),
     last_received_at TIMESTAMPTZ,
-    received_at TIMESTAMPTZ,
+    received_at TIMESTAMPTZ, -- recptnDt (KST): event time used for analysis
     up_down_type INTEGER, -- 0: Up/Inner, 1: Down/Outer
     terminal_station_id VARCHAR(50),
     terminal_station_name VARCHAR(50),
     train_status INTEGER, -- 0:Entry, 1:Arrive, 2:Depart, 3:Pre-depart
     is_express INTEGER, -- 0:No, 1:Express, 7:Special
     is_last_train BOOLEAN,
-    created_at TIMESTAMPTZ DEFAULT NOW()
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(), -- partition key
+    PRIMARY KEY (id, created_at) -- must include the partition key
+) PARTITION BY RANGE (created_at);
+
+-- Indexes (created on every partition)
+-- Analysis access pattern: per line/station/direction in event-time order
+CREATE INDEX IF NOT EXISTS idx_train_positions_line_station_dir_time
+    ON realtime_train_positions(subway_line_id, station_id, up_down_type, received_at);
+-- Per train in event-time order (dwell, turnaround)
+CREATE INDEX IF NOT EXISTS idx_train_positions_train_time
+    ON realtime_train_positions(train_number, received_at);
+CREATE INDEX IF NOT EXISTS idx_train_positions_created_at
+    ON realtime_train_positions(created_at);
+
+-- Create daily partitions for every date in [p_from, p_to] that does not exist yet.
+CREATE OR REPLACE FUNCTION create_train_position_partitions(p_from DATE, p_to DATE)
+RETURNS INTEGER LANGUAGE plpgsql AS $$
+DECLARE
+    d DATE := p_from;
+    part TEXT;
+    created INTEGER := 0;
+BEGIN
+    WHILE d <= p_to LOOP
+        part := 'realtime_train_positions_' || to_char(d, 'YYYYMMDD');
+        IF to_regclass(part) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF realtime_train_positions FOR VALUES FROM (%L) TO (%L)',
+                part,
+                (d::timestamp AT TIME ZONE 'Asia/Seoul'),
+                ((d + 1)::timestamp AT TIME ZONE 'Asia/Seoul'));
+            created := created + 1;
+        END IF;
+        d := d + 1;
+    END LOOP;
+    RETURN created;
+END;
+$$;
+
+-- Drop daily partitions older than p_retention_days.
+CREATE OR REPLACE FUNCTION drop_expired_train_position_partitions(p_retention_days INTEGER)
+RETURNS INTEGER LANGUAGE plpgsql AS $$
+DECLARE
+    cutoff DATE := (now() AT TIME ZONE 'Asia/Seoul')::date - p_retention_days;
+    part RECORD;
+    dropped INTEGER := 0;
+BEGIN
+    FOR part IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'realtime_train_positions'::regclass
+          AND c.relname ~ '^realtime_train_positions_[0-9]{8}$'
+    LOOP
+        IF to_date(right(part.relname, 8), 'YYYYMMDD') < cutoff THEN
+            EXECUTE format('DROP TABLE %I', part.relname);
+            dropped := dropped + 1;
+        END IF;
+    END LOOP;
+    RETURN dropped;
+END;
+$$;
+
+-- Periodic job: pre-create the next p_days_ahead days and enforce retention.
+CREATE OR REPLACE FUNCTION maintain_train_position_partitions(p_days_ahead INTEGER DEFAULT 3, p_retention_days INTEGER DEFAULT 30)
+RETURNS JSON LANGUAGE plpgsql AS $$
+DECLARE
+    today DATE := (now() AT TIME ZONE 'Asia/Seoul')::date;
+    created INTEGER;
+    dropped INTEGER;
+BEGIN
+    created := create_train_position_partitions(today - 1, today + p_days_ahead);
+    dropped := drop_expired_train_position_partitions(p_retention_days);
+    RETURN json_build_object('created', created, 'dropped', dropped);
+END;
+$$;
+
+-- Today's partition must exist before the collector's first insert
+SELECT maintain_train_position_partitions();
+
+-- Hourly rollups of headway and dwell, keyed by the event-time hour.
+-- Long-range trend queries read these instead of the raw log, so they keep
+-- working after the raw partitions age out.
+CREATE TABLE IF NOT EXISTS train_headway_hourly (
+    bucket TIMESTAMPTZ NOT NULL,
+    subway_line_id VARCHAR(50) NOT NULL,
+    station_id VARCHAR(50) NOT NULL,
+    up_down_type INTEGER NOT NULL,
+    subway_line_name VARCHAR(50),
+    station_name VARCHAR(50),
+    arrivals INTEGER NOT NULL,
+    headway_mean_sec REAL,
+    headway_max_sec REAL,
+    headway_std_sec REAL,
+    PRIMARY KEY (bucket, subway_line_id, station_id, up_down_type)
 );
 
--- Index for faster analysis
-CREATE INDEX IF NOT EXISTS idx_train_positions_created_at ON realtime_train_positions(created_at);
-CREATE INDEX IF NOT EXISTS idx_train_positions_line_station ON realtime_train_positions(subway_line_id, station_id);
+CREATE TABLE IF NOT EXISTS train_dwell_hourly (
+    bucket TIMESTAMPTZ NOT NULL,
+    subway_line_id VARCHAR(50) NOT NULL,
+    station_id VARCHAR(50) NOT NULL,
+    up_down_type INTEGER NOT NULL,
+    subway_line_name VARCHAR(50),
+    station_name VARCHAR(50),
+    visits INTEGER NOT NULL, -- visits with an observed arrive -> depart
+    dwell_mean_sec REAL,
+    dwell_p50_sec REAL,
+    dwell_p90_sec REAL,
+    dwell_max_sec REAL,
+    PRIMARY KEY (bucket, subway_line_id, station_id, up_down_type)
+);
+
+-- Recompute the rollups for the hours in [p_from, p_to). Idempotent.
+-- One extra hour is read on each side so arrivals/departures straddling
+-- the window boundary are still paired.
+CREATE OR REPLACE FUNCTION refresh_train_hourly_rollups(p_from TIMESTAMPTZ, p_to TIMESTAMPTZ)
+RETURNS JSON LANGUAGE plpgsql AS $$
+DECLARE
+    headway_rows INTEGER;
+    dwell_rows INTEGER;
+BEGIN
+    p_from := date_trunc('hour', p_from);
+    p_to := date_trunc('hour', p_to);
+
+    -- Headway: time since the previous arrival (status 1) at the same
+    -- station/direction. Only the first arrival row of each visit counts,
+    -- so heartbeat rows re-written while a train waits are not arrivals.
+    DELETE FROM train_headway_hourly WHERE bucket >= p_from AND bucket < p_to;
+    INSERT INTO train_headway_hourly
+    SELECT date_trunc('hour', t), subway_line_id, station_id, up_down_type,
+           max(subway_line_name), max(station_name),
+           count(*),
+           avg(headway_sec), max(headway_sec), coalesce(stddev_samp(headway_sec), 0)
+    FROM (
+        SELECT subway_line_id, station_id, up_down_type, subway_line_name, station_name, t,
+               extract(epoch FROM t - lag(t) OVER (PARTITION BY subway_line_id, station_id, up_down_type ORDER BY t)) AS headway_sec
+        FROM (
+            SELECT DISTINCT ON (train_number, visit_id) subway_line_id, station_id, up_down_type, subway_line_name, station_name, t
+            FROM (
+                SELECT *, sum(new_visit) OVER (PARTITION BY train_number ORDER BY t, id) AS visit_id
+                FROM (
+                    SELECT id, train_number, subway_line_id, subway_line_name, station_id, station_name, up_down_type, train_status,
+                           coalesce(received_at, created_at) AS t,
+                           CASE WHEN (station_id, up_down_type) IS NOT DISTINCT FROM
+                                     lag((station_id, up_down_type)) OVER (PARTITION BY train_number ORDER BY coalesce(received_at, created_at), id)
+                                THEN 0 ELSE 1 END AS new_visit
+                    FROM realtime_train_positions
+                    WHERE created_at >= p_from - interval '1 hour' AND created_at < p_to + interval '1 hour'
+                      AND train_status IN (0, 1, 2)
+                ) tagged
+            ) numbered
+            WHERE train_status = 1
+            ORDER BY train_number, visit_id, t, id
+        ) arrivals
+    ) headways
+    WHERE headway_sec IS NOT NULL AND t >= p_from AND t < p_to
+      AND subway_line_id IS NOT NULL AND station_id IS NOT NULL AND up_down_type IS NOT NULL
+    GROUP BY 1, 2, 3, 4;
+    GET DIAGNOSTICS headway_rows = ROW_COUNT;
+
+    -- Dwell: within one visit (consecutive rows of a train at the same
+    -- station/direction), first arrival to the first departure after it
+    DELETE FROM train_dwell_hourly WHERE bucket >= p_from AND bucket < p_to;
+    INSERT INTO train_dwell_hourly
+    SELECT date_trunc('hour', arrived_at), subway_line_id, station_id, up_down_type,
+           max(subway_line_name), max(station_name),
+           count(*),
+           avg(dwell_sec),
+           percentile_cont(0.5) WITHIN GROUP (ORDER BY dwell_sec),
+           percentile_cont(0.9) WITHIN GROUP (ORDER BY dwell_sec),
+           max(dwell_sec)
+    FROM (
+        SELECT visit_id, train_number,
+               max(subway_line_id) AS subway_line_id, max(station_id) AS station_id, max(up_down_type) AS up_down_type,
+               max(subway_line_name) AS subway_line_name, max(station_name) AS station_name,
+               max(arrived_at) AS arrived_at,
+               extract(epoch FROM min(t) FILTER (WHERE train_status = 2 AND t >= arrived_at) - max(arrived_at)) AS dwell_sec
+        FROM (
+            SELECT *, min(t) FILTER (WHERE train_status = 1) OVER (PARTITION BY train_number, visit_id) AS arrived_at
+            FROM (
+                SELECT *, sum(new_visit) OVER (PARTITION BY train_number ORDER BY t, id) AS visit_id
+                FROM (
+                    SELECT id, train_number, subway_line_id, subway_line_name, station_id, station_name, up_down_type, train_status,
+                           coalesce(received_at, created_at) AS t,
+                           CASE WHEN (station_id, up_down_type) IS NOT DISTINCT FROM
+                                     lag((station_id, up_down_type)) OVER (PARTITION BY train_number ORDER BY coalesce(received_at, created_at), id)
+                                THEN 0 ELSE 1 END AS new_visit
+                    FROM realtime_train_positions
+                    WHERE created_at >= p_from - interval '1 hour' AND created_at < p_to + interval '1 hour'
+                      AND train_status IN (0, 1, 2)
+                ) tagged
+            ) numbered
+        ) visits
+        GROUP BY visit_id, train_number
+    ) dwells
+    WHERE dwell_sec IS NOT NULL AND arrived_at >= p_from AND arrived_at < p_to
+      AND subway_line_id IS NOT NULL AND station_id IS NOT NULL AND up_down_type IS NOT NULL
+    GROUP BY 1, 2, 3, 4;
+    GET DIAGNOSTICS dwell_rows = ROW_COUNT;
+
+    RETURN json_build_object('headway_rows', headway_rows, 'dwell_rows', dwell_rows);
+END;
+$$;
+
+-- Migrating from the old unpartitioned table (run once, by hand):
+-- ALTER TABLE realtime_train_positions RENAME TO realtime_train_positions_legacy;  -- before this script
+-- (run this script)
+-- SELECT create_train_position_partitions((SELECT (min(created_at) AT TIME ZONE 'Asia/Seoul')::date FROM realtime_train_positions_legacy),
+--                                         (now() AT TIME ZONE 'Asia/Seoul')::date);
+-- INSERT INTO realtime_train_positions SELECT * FROM realtime_train_positions_legacy;
+-- SELECT setval(pg_get_serial_sequence('realtime_train_positions', 'id'), (SELECT max(id) FROM realtime_train_positions));
+-- DROP TABLE realtime_train_positions_legacy;
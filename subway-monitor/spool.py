@@ -0,0 +1,228 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class WriteSpool:
+    """
+    Durable local append-only buffer for collected records (SQLite in WAL mode).
+
+    The collection loop only writes to local disk, so a slow or unavailable
+    database never blocks a tick. Rows are deleted only after the database
+    acknowledged them, so pending data survives restarts. Rows the database
+    refused are moved to a `dead` table for inspection instead of dropped.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # One connection shared by the collector and the flusher thread
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode NORMAL is still safe against process crashes
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS spool (id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dead (id INTEGER PRIMARY KEY, payload TEXT NOT NULL, failed_at REAL NOT NULL)"
+        )
+
+    def append(self, records):
+        """
+        Append records in a single transaction. Returns the number written.
+        """
+        if not records:
+            return 0
+        payloads = [(json.dumps(r, ensure_ascii=False),) for r in records]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT INTO spool (payload) VALUES (?)", payloads)
+            self._conn.execute("COMMIT")
+        return len(payloads)
+
+    def peek(self, limit):
+        """
+        Return up to `limit` oldest (id, record) pairs without removing them.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, payload FROM spool ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+        return [(row_id, json.loads(payload)) for row_id, payload in rows]
+
+    def ack(self, last_id):
+        """
+        Remove every row up to and including `last_id`.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM spool WHERE id <= ?", (last_id,))
+
+    def bury(self, ids):
+        """
+        Move rows that cannot be stored to the dead table.
+        """
+        if not ids:
+            return
+        now = time.time()
+        params = [(i,) for i in ids]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO dead (id, payload, failed_at) SELECT id, payload, {now!r} FROM spool WHERE id = ?",
+                params,
+            )
+            self._conn.executemany("DELETE FROM spool WHERE id = ?", params)
+            self._conn.execute("COMMIT")
+
+    def pending(self):
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM spool").fetchone()[0]
+
+    def dead_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM dead").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SpoolFlusher:
+    """
+    Background thread draining a WriteSpool to the database in large batches.
+
+    `sink(records)` stores what it can and returns the records it rejected
+    as (record, reason) pairs (bulk_insert isolates them); those rows move
+    to the dead table and the rest of the batch is acknowledged. The sink
+    must raise when nothing was stored; the batch is then kept and retried
+    with exponential backoff (capped at `max_backoff` seconds).
+
+    An error with a `rejected` attribute (ingest.BatchRejected) means the
+    database refused every row. That usually is a missing partition or a
+    schema change, so nothing is buried at first; only when the same batch
+    is refused `max_reject_retries` times in a row are the rows that failed
+    on their own moved to the dead table, so the spool cannot stall.
+    """
+
+    def __init__(self, spool, sink, batch_size=5000, interval=2.0, max_backoff=60.0, max_reject_retries=5):
+        self.spool = spool
+        self.sink = sink
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.max_reject_retries = max_reject_retries
+        # Batch refused as a whole: (first row id, consecutive refusals)
+        self._suspect = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._backoff = 0.0
+        self.stats = {"flushed": 0, "batches": 0, "failures": 0, "dead": 0}
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="spool-flusher", daemon=True)
+            self._thread.start()
+
+    def notify(self):
+        """
+        Wake the flusher after new records were appended.
+
+        Ignored while backing off; waking on every poll would retry the
+        database each tick and defeat `max_backoff`.
+        """
+        if not self._backoff:
+            self._wake.set()
+
+    def stop(self, timeout=10.0):
+        """
+        Stop the thread after one last drain attempt (skipped while backing off).
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self._backoff or self.interval)
+            self._wake.clear()
+            stopping = self._stop.is_set()
+            if not (stopping and self._backoff):
+                self.flush()
+            if stopping:
+                break
+
+    def flush(self):
+        """
+        Drain the spool batch by batch until it is empty or a batch fails.
+        Returns the number of records flushed.
+        """
+        flushed = 0
+        while True:
+            batch = self.spool.peek(self.batch_size)
+            if not batch:
+                break
+            try:
+                rejected = self.sink([record for _, record in batch]) or []
+            except Exception as e:
+                refused = getattr(e, "rejected", None)
+                if refused and self._give_up(batch[0][0]):
+                    self._bury(batch, refused)
+                    continue
+                self.stats["failures"] += 1
+                self._backoff = min(max(self._backoff * 2, self.interval), self.max_backoff)
+                logger.error(
+                    f"Spool flush failed ({e}); retrying in {self._backoff:.0f}s "
+                    f"with {self.spool.pending()} records pending"
+                )
+                break
+            self._suspect = None
+            buried = self._bury(batch, rejected)
+            self.spool.ack(batch[-1][0])
+            self._backoff = 0.0
+            self.stats["flushed"] += len(batch) - buried
+            self.stats["batches"] += 1
+            flushed += len(batch) - buried
+            if len(batch) < self.batch_size:
+                break
+        return flushed
+
+    def _bury(self, batch, rejected):
+        """
+        Move the spool rows of rejected (record, reason) pairs to the dead
+        table. Returns the number of rows moved.
+        """
+        row_ids = {id(record): row_id for row_id, record in batch}
+        ids = [row_ids[id(record)] for record, _ in rejected if id(record) in row_ids]
+        if ids:
+            logger.warning(f"Moving {len(ids)} records the database cannot store to the dead table (ids {ids[:10]})")
+            self.spool.bury(ids)
+            self.stats["dead"] += len(ids)
+        return len(ids)
+
+    def _give_up(self, head_id):
+        """
+        Count consecutive refusals of the batch starting at `head_id`; True
+        once it reached `max_reject_retries`.
+        """
+        retries = self._suspect[1] + 1 if self._suspect and self._suspect[0] == head_id else 1
+        self._suspect = (head_id, retries)
+        if retries < self.max_reject_retries:
+            return False
+        logger.error(f"Batch refused {retries} times in a row; moving the rows that failed on their own aside")
+        self._suspect = None
+        return True
+
+    def report(self):
+        stats = dict(self.stats)
+        stats["pending"] = self.spool.pending()
+        return stats
@@ -0,0 +1,59 @@
+import pytest
+
+import collector
+
+
+def train(no, station="S1"):
+    return {"trainNo": str(no), "statnId": station}
+
+
+def page(trains, total=None):
+    data = {"realtimePositionList": trains}
+    if total is not None:
+        data["errorMessage"] = {"status": 200, "code": "INFO-000", "total": total}
+    return data
+
+
+# Answer for a page past the end of the list
+NO_DATA = {"status": 200, "code": "INFO-200", "message": "No data", "total": 0}
+
+
+@pytest.fixture(autouse=True)
+def page_size(monkeypatch):
+    monkeypatch.setattr(collector, "PAGE_SIZE", 100)
+    monkeypatch.setattr(collector, "_page_hints", {})
+
+
+def test_merge_pages_keeps_first_row_per_train_across_boundaries():
+    # Page ranges are inclusive, so the boundary train can come back twice;
+    # a train that moved between page requests shows up on both pages too
+    first = page([train(i) for i in range(101)], total=230)
+    second = page([train(100)] + [train(i, "S2") for i in range(101, 202)] + [train(5, "S9")])
+    third = page([train(i) for i in range(201, 230)])
+
+    merged = collector.merge_pages([first, second, third], "Line2")
+
+    assert [t["trainNo"] for t in merged] == [str(i) for i in range(230)]
+    assert next(t for t in merged if t["trainNo"] == "5")["statnId"] == "S1"
+
+
+def test_merge_pages_single_page_is_returned_as_is():
+    first = page([train(1), train(2)], total=2)
+    assert collector.merge_pages([first], "Line2") is first["realtimePositionList"]
+
+
+def test_merge_pages_ignores_no_data_pages_past_the_end(caplog):
+    first = page([train(i) for i in range(50)], total=50)
+    merged = collector.merge_pages([first, NO_DATA, NO_DATA], "Line2")
+    assert len(merged) == 50
+    assert not caplog.records
+
+
+def test_plan_pages_requests_missing_pages_and_remembers_headroom():
+    first = page([train(i) for i in range(101)], total=195)
+    assert collector.plan_pages("Line2", [first]) == [1]
+    # 195 trains plus 10% headroom span three pages next time
+    assert collector._page_hints["Line2"] == 3
+
+    assert collector.plan_pages("Line2", [first, page([])]) == []
+    assert collector.plan_pages("Line3", [{"realtimePositionList": []}]) == []
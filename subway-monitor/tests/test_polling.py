@@ -0,0 +1,75 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from polling import AdaptivePoller
+
+KST = timezone(timedelta(hours=9))
+# Inside service hours (noon KST) and outside them (3am KST)
+NOON = datetime(2026, 1, 1, 12, 0, tzinfo=KST).timestamp()
+NIGHT = datetime(2026, 1, 1, 3, 0, tzinfo=KST).timestamp()
+
+
+def daily_calls(poller):
+    return sum(86400 / iv for iv in poller.intervals.values())
+
+
+def make_poller(rates, **kwargs):
+    poller = AdaptivePoller(list(rates), **kwargs)
+    for line, rate in rates.items():
+        poller.rates[line] = rate
+        poller.last_poll[line] = NOON - 10
+    return poller
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_reschedule_stays_within_daily_quota(seed):
+    rng = random.Random(seed)
+    rates = {f"Line{i}": rng.choice([0.0, rng.uniform(0, 0.05), rng.uniform(0.5, 3.0)])
+             for i in range(rng.randint(1, 20))}
+    # 20 lines at off_hours_interval (600s) already use 2880 calls a day,
+    # so the quota can only be honoured above that
+    quota = rng.uniform(3000, 50000)
+    poller = make_poller(rates, daily_quota=quota)
+    poller._reschedule(NOON)
+
+    assert daily_calls(poller) <= quota * (1 + 1e-9)
+    assert all(poller.min_interval <= iv <= poller.off_hours_interval for iv in poller.intervals.values())
+
+
+def test_busy_line_is_polled_more_often_than_quiet_line():
+    poller = make_poller({"Line2": 2.0, "UiSinseol": 0.01}, daily_quota=5000)
+    poller._reschedule(NOON)
+    assert poller.intervals["Line2"] < poller.intervals["UiSinseol"]
+    assert daily_calls(poller) <= 5000 * (1 + 1e-9)
+
+
+def test_quota_wins_over_max_interval():
+    # Polling 20 lines at max_interval (120s) would take 14400 calls a day
+    poller = make_poller({f"Line{i}": 0.0 for i in range(20)}, daily_quota=10000)
+    poller._reschedule(NOON)
+    assert daily_calls(poller) <= 10000 * (1 + 1e-9)
+    assert all(iv > poller.max_interval for iv in poller.intervals.values())
+
+
+def test_off_hours_and_empty_lines_use_fixed_intervals():
+    poller = make_poller({"Line1": 1.0, "Line2": 1.0}, daily_quota=20000)
+    poller._reschedule(NIGHT)
+    assert poller.intervals == {"Line1": 600, "Line2": 600}
+
+    poller.empty_streak["Line1"] = 2
+    poller._reschedule(NOON)
+    assert poller.intervals["Line1"] == poller.max_interval
+    assert daily_calls(poller) <= 20000 * (1 + 1e-9)
+
+
+def test_observe_measures_change_rate_between_polls():
+    poller = AdaptivePoller(["Line2"], daily_quota=10000)
+    trains = [{"trainNo": str(i), "statnId": "A", "trainSttus": "1", "updnLine": "0"} for i in range(10)]
+    poller.observe({"Line2": trains}, now=NOON)
+    moved = [dict(t, statnId="B") if i < 5 else t for i, t in enumerate(trains)]
+    poller.observe({"Line2": moved}, now=NOON + 10)
+
+    assert poller.rates["Line2"] == pytest.approx(0.5)
+    assert poller.next_poll["Line2"] == NOON + 10 + poller.intervals["Line2"]
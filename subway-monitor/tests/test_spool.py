@@ -0,0 +1,132 @@
+import pytest
+
+import ingest
+from spool import WriteSpool, SpoolFlusher
+
+
+class FakeCursor:
+    """
+    Stands in for a psycopg2 cursor: COPY is always refused and
+    execute_values fails with IntegrityError when a chunk holds a bad
+    train number (or any row at all when `down`).
+    """
+
+    def __init__(self, bad=(), down=False):
+        self.bad = {str(b) for b in bad}
+        self.down = down
+        self.round_trips = 0
+        self.committed = []
+        self.pending = []
+        self._savepoint = 0
+
+    def execute(self, sql, *args):
+        self.round_trips += 1
+        if sql.startswith("SAVEPOINT"):
+            self._savepoint = len(self.pending)
+        elif sql.startswith("ROLLBACK TO"):
+            del self.pending[self._savepoint:]
+
+    def copy_expert(self, sql, buf):
+        self.round_trips += 1
+        raise ingest.psycopg2.IntegrityError("COPY refused")
+
+    def insert(self, rows):
+        if self.down or any(row[4] in self.bad for row in rows):
+            raise ingest.psycopg2.IntegrityError("new row violates check constraint")
+        self.pending += [row[4] for row in rows]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConn:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        self._cursor.committed += self._cursor.pending
+        self._cursor.pending = []
+
+    def rollback(self):
+        self._cursor.pending = []
+
+
+@pytest.fixture(autouse=True)
+def fake_execute_values(monkeypatch):
+    monkeypatch.setattr(ingest, "execute_values", lambda cursor, sql, rows, page_size: cursor.insert(rows))
+
+
+def trains(n):
+    return [{"trainNo": str(i), "subwayId": "1002", "recptnDt": "2026-10-18 08:00:00",
+             "lastRecptnDt": "20261018"} for i in range(n)]
+
+
+def make_flusher(tmp_path, n, cursor, **kwargs):
+    spool = WriteSpool(str(tmp_path / "spool.db"))
+    spool.append(trains(n))
+    sink = lambda records: ingest.bulk_insert(FakeConn(cursor), records).rejected
+    return spool, SpoolFlusher(spool, sink, **kwargs)
+
+
+@pytest.mark.parametrize("bad", [{0}, {999}, {0, 1, 999}, {0, 500, 999}])
+def test_refused_rows_move_to_dead_table(tmp_path, bad):
+    cursor = FakeCursor(bad)
+    spool, flusher = make_flusher(tmp_path, 1000, cursor)
+    assert flusher.flush() == 1000 - len(bad)
+    assert spool.pending() == 0
+    assert spool.dead_count() == len(bad)
+    assert sorted(cursor.committed) == sorted(str(i) for i in range(1000) if i not in bad)
+
+
+def test_whole_batch_refusal_keeps_the_spool(tmp_path):
+    # e.g. a missing day partition: every row fails the partition check
+    cursor = FakeCursor(down=True)
+    spool, flusher = make_flusher(tmp_path, 1000, cursor)
+    assert flusher.flush() == 0
+    assert spool.pending() == 1000
+    assert spool.dead_count() == 0
+    assert flusher.stats["failures"] == 1
+    assert flusher._backoff > 0
+    # Gives up after O(log n) round trips instead of bisecting every row
+    assert cursor.round_trips < 100
+
+
+def test_repeated_refusal_only_sets_aside_rows_that_failed_alone(tmp_path):
+    cursor = FakeCursor(down=True)
+    spool, flusher = make_flusher(tmp_path, 100, cursor, max_reject_retries=3)
+    flusher.flush()
+    flusher.flush()
+    assert spool.dead_count() == 0
+    flusher.flush()
+    assert spool.dead_count() == 2
+    assert spool.pending() == 98
+
+
+def test_unreachable_database_backs_off(tmp_path):
+    spool = WriteSpool(str(tmp_path / "spool.db"))
+    spool.append(trains(10))
+
+    def sink(records):
+        raise ingest.psycopg2.OperationalError("connection refused")
+
+    flusher = SpoolFlusher(spool, sink)
+    assert flusher.flush() == 0
+    assert spool.pending() == 10
+    assert flusher._backoff == flusher.interval
+
+
+def test_notify_is_ignored_while_backing_off(tmp_path):
+    spool = WriteSpool(str(tmp_path / "spool.db"))
+    flusher = SpoolFlusher(spool, lambda records: [])
+    flusher._backoff = 4.0
+    flusher.notify()
+    assert not flusher._wake.is_set()
+    flusher._backoff = 0.0
+    flusher.notify()
+    assert flusher._wake.is_set()